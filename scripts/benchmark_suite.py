@@ -0,0 +1,528 @@
+"""
+Benchmark Suite - Micro-benchmarks de las rutas calientes con línea base versionada
+Mide throughput y memoria pico de la codificación base64 y el payload de
+AdvancedRAGClient.query, el chunking, el hash SHA-256, el scoring de similitud
+y el formateo de resultados sobre corpus sintéticos fijos (1 KB a 100 MB,
+1k a 1M chunks), los compara con benchmarks/baseline.json y falla si alguno
+empeora más allá de la tolerancia. Todo corre offline, sin n8n ni Azure.
+"""
+
+import contextlib
+import gc
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_ingest import sha256_file
+from context_builder import build_context
+from parallel_extractor import chunk_stream
+from rag_advanced_client import AdvancedRAGClient, build_query_payload, encode_file_input
+from similarity_engine import TemporaryChunkMatrix
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "benchmarks", "baseline.json")
+
+KB = 1024
+MB = 1024 * 1024
+
+# Tamaños por nivel: "quick" corre en CI en menos de un minuto, "full" cubre los extremos
+DOCUMENT_SIZES = {
+    'quick': [1 * KB, 1 * MB, 10 * MB],
+    'full': [1 * KB, 1 * MB, 10 * MB, 100 * MB],
+}
+CHUNK_COUNTS = {
+    'quick': [1_000, 10_000, 100_000],
+    'full': [1_000, 10_000, 100_000, 1_000_000],
+}
+RESULT_COUNTS = {
+    'quick': [1_000, 10_000],
+    'full': [1_000, 10_000, 100_000],
+}
+
+EMBEDDING_DIMENSIONS = 256
+PAGE_CHARS = 3000
+
+
+def _size_label(size: int) -> str:
+    return f"{size // MB}MB" if size >= MB else f"{size // KB}KB"
+
+
+def _count_label(count: int) -> str:
+    return f"{count // 1_000_000}M" if count >= 1_000_000 else f"{count // 1_000}k"
+
+
+def synthetic_text(size: int, seed: int = 7) -> str:
+    """Texto en español de `size` caracteres (bloque de 64 KB repetido)"""
+    rng = random.Random(seed)
+    words = ("cuenta ahorros crédito vivienda tasa interés cliente banco solicitud "
+             "documento requisito plazo cuota contrato firma titular saldo").split()
+    block = ' '.join(rng.choice(words) for _ in range(12_000))[:64 * KB]
+    return (block * (size // len(block) + 1))[:size]
+
+
+def _pages(text: str) -> List[str]:
+    # Páginas del tamaño típico de una extracción de PDF
+    return [text[i:i + PAGE_CHARS] for i in range(0, len(text), PAGE_CHARS)]
+
+
+def synthetic_results(n: int, seed: int = 3) -> List[Dict]:
+    """Resultados de búsqueda con vecinos solapados del mismo documento (como los de Azure AI Search)"""
+    rng = random.Random(seed)
+    text = synthetic_text(600 * 50, seed)
+    results = []
+    for i in range(n):
+        document = i // 20
+        position = i % 20
+        start = position * 450
+        results.append({
+            'chunk_id': f'doc_{document}_chunk_{position}',
+            'document_id': f'doc_{document}',
+            'filename': f'doc_{document}.pdf',
+            'content': text[start:start + 500],
+            'score': rng.random()
+        })
+    return results
+
+
+# ============================================================================
+# CASOS
+# ============================================================================
+
+def build_cases(tier: str, workdir: str) -> List[Dict]:
+    """
+    Casos del nivel: nombre, unidad, setup (no medido) y run (medido)
+
+    `units` es lo que procesa cada run(state): bytes, chunks o resultados.
+    """
+    cases = []
+
+    def file_of(size: int) -> str:
+        path = os.path.join(workdir, f"document_{size}.txt")
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(synthetic_text(size))
+        return path
+
+    for size in DOCUMENT_SIZES[tier]:
+        label = _size_label(size)
+        cases.append({
+            'name': f"base64/{label}",
+            'unit': 'MB/s',
+            'units': size,
+            'setup': lambda size=size: file_of(size),
+            'run': lambda path: encode_file_input(path),
+        })
+        cases.append({
+            'name': f"payload/{label}",
+            'unit': 'MB/s',
+            'units': size,
+            'setup': lambda size=size: [encode_file_input(file_of(size))],
+            # Lo mismo que hace requests con json=payload
+            'run': lambda inputs: json.dumps(
+                build_query_payload("¿Qué dice este documento?", inputs), allow_nan=False
+            ).encode('utf-8'),
+        })
+        cases.append({
+            'name': f"chunking/{label}",
+            'unit': 'MB/s',
+            'units': size,
+            'setup': lambda size=size: _pages(synthetic_text(size)),
+            'run': lambda pages: sum(1 for _ in chunk_stream(iter(pages))),
+        })
+        cases.append({
+            'name': f"sha256/{label}",
+            'unit': 'MB/s',
+            'units': size,
+            'setup': lambda size=size: file_of(size),
+            'run': lambda path: sha256_file(path),
+        })
+
+    for count in CHUNK_COUNTS[tier]:
+        def similarity_setup(count=count):
+            rng = np.random.default_rng(count)
+            embeddings = rng.standard_normal((count, EMBEDDING_DIMENSIONS), dtype=np.float32)
+            chunks = [{'chunk_index': i} for i in range(count)]
+            matrix = TemporaryChunkMatrix(chunks, embeddings)
+            return matrix, rng.standard_normal(EMBEDDING_DIMENSIONS, dtype=np.float32)
+
+        cases.append({
+            'name': f"similarity/{_count_label(count)}",
+            'unit': 'chunks/s',
+            'units': count,
+            'setup': similarity_setup,
+            'run': lambda state: state[0].search(state[1], k=5),
+        })
+
+    for count in RESULT_COUNTS[tier]:
+        cases.append({
+            'name': f"context/{_count_label(count)}",
+            'unit': 'results/s',
+            'units': count,
+            'setup': lambda count=count: synthetic_results(count),
+            'run': lambda results: build_context(results),
+        })
+
+    def print_result_setup():
+        client = AdvancedRAGClient()
+        answer = {
+            'main_response': synthetic_text(1200),
+            'detailed_analysis': synthetic_text(3000, seed=8),
+            'confidence': 87,
+            'sources': [{'type': 'indexed', 'filename': f'doc_{i}.pdf'} for i in range(5)],
+            'follow_up_suggestions': ["¿Cuáles son los costos?", "¿Qué plazo aplica?"],
+            'warnings': ["Verifique la vigencia del documento"],
+        }
+        return client, {'answer': answer}
+
+    def print_result_run(state):
+        with contextlib.redirect_stdout(io.StringIO()):
+            state[0]._print_result(state[1])
+
+    cases.append({
+        'name': "print_result/5_fuentes",
+        'unit': 'results/s',
+        'units': 1,
+        'setup': print_result_setup,
+        'run': print_result_run,
+    })
+    return cases
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+
+def calibrate(repeats: int = 31) -> float:
+    """
+    Segundos de una carga fija (Python puro + hashlib + numpy), mediana de `repeats`
+
+    La relación entre la calibración de la línea base y la actual escala el
+    throughput esperado, para que la suite sea comparable entre máquinas.
+    """
+    data = b'x' * (4 * MB)
+    matrix = np.ones((256, 256), dtype=np.float32)
+    rounds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        sum(i * i for i in range(300_000))
+        hashlib.sha256(data).hexdigest()
+        for _ in range(20):
+            matrix @ matrix
+        rounds.append(time.perf_counter() - start)
+    return statistics.median(rounds)
+
+
+def measure(case: Dict, repeats: int = 15, min_time_s: float = 0.1) -> Dict:
+    """
+    Medir un caso: mediana de `repeats` rondas y memoria pico de una ejecución
+
+    La mediana no depende de una sola ronda con suerte (el mínimo) ni de una
+    ráfaga de carga (el promedio). El tiempo se mide sin tracemalloc (que
+    ralentiza las asignaciones); la memoria pico se mide aparte, solo de lo
+    que asigna run() sin contar setup().
+
+    Returns:
+        {"throughput", "unit", "seconds", "number", "peak_kb"}
+    """
+    state = case['setup']()
+    case['run'](state)  # calentamiento
+
+    start = time.perf_counter()
+    case['run'](state)
+    single = time.perf_counter() - start
+    number = max(1, min(1000, int(min_time_s / max(single, 1e-9))))
+
+    rounds = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            case['run'](state)
+        rounds.append((time.perf_counter() - start) / number)
+    median = statistics.median(rounds)
+
+    gc.collect()
+    tracemalloc.start()
+    case['run'](state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    scale = MB if case['unit'] == 'MB/s' else 1
+    return {
+        'throughput': case['units'] / scale / median,
+        'unit': case['unit'],
+        'seconds': median,
+        'number': number,
+        'peak_kb': peak / KB,
+    }
+
+
+def run_suite(
+    tier: str = 'quick',
+    only: Optional[List[str]] = None,
+    repeats: int = 15,
+    progress: bool = True,
+    calibration_s: Optional[float] = None
+) -> Dict:
+    """
+    Ejecutar todos los casos de un nivel
+
+    Args:
+        tier: "quick" o "full"
+        only: Componentes o casos a ejecutar (ej. ["chunking", "sha256/1MB"])
+        repeats: Rondas de tiempo por caso
+        progress: Imprimir cada caso al terminar
+        calibration_s: Calibración ya medida (se omite calibrate())
+
+    Returns:
+        {"tier", "calibration_s", "cases": {nombre: medición}}
+    """
+    workdir = tempfile.mkdtemp(prefix="rag_bench_")
+    results = {}
+    try:
+        calibration = calibration_s or calibrate()
+        for case in build_cases(tier, workdir):
+            if only and not any(case['name'] == key or case['name'].startswith(key + '/') for key in only):
+                continue
+            results[case['name']] = measure(case, repeats)
+            if progress:
+                r = results[case['name']]
+                print(f"   {case['name']:<26} {r['throughput']:>14,.1f} {r['unit']:<10} "
+                      f"pico {r['peak_kb']:>12,.1f} KB")
+            gc.collect()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'tier': tier, 'calibration_s': calibration, 'cases': results}
+
+
+# ============================================================================
+# LÍNEA BASE
+# ============================================================================
+
+def machine_fingerprint() -> Dict:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def speed_factor(run: Dict, baseline: Dict) -> float:
+    """
+    Velocidad relativa de esta máquina frente a la de la línea base
+
+    En la misma máquina es 1.0: la calibración también tiene ruido y escalar
+    con ella solo lo sumaría. En otra máquina es la relación de calibraciones,
+    limitada a [0.25, 4].
+    """
+    tier = baseline.get('tiers', {}).get(run['tier'], {})
+    if not tier.get('calibration_s') or tier.get('machine') == machine_fingerprint():
+        return 1.0
+    return min(4.0, max(0.25, tier['calibration_s'] / run['calibration_s']))
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict:
+    if not os.path.exists(path):
+        return {'version': 1, 'tiers': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(run: Dict, path: str = BASELINE_PATH) -> Dict:
+    """
+    Guardar la corrida como línea base de su nivel (los demás niveles se conservan)
+
+    Solo se reemplazan los casos medidos, así `--only` actualiza casos sueltos.
+    """
+    baseline = load_baseline(path)
+    tier = baseline['tiers'].setdefault(run['tier'], {'cases': {}})
+    tier['updated'] = datetime.now().isoformat(timespec='seconds')
+    tier['calibration_s'] = round(run['calibration_s'], 5)
+    tier['machine'] = machine_fingerprint()
+    for name, result in run['cases'].items():
+        tier['cases'][name] = {
+            'throughput': round(result['throughput'], 3),
+            'unit': result['unit'],
+            'peak_kb': round(result['peak_kb'], 1),
+        }
+    tier['cases'] = dict(sorted(tier['cases'].items()))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return baseline
+
+
+def compare_to_baseline(
+    run: Dict,
+    baseline: Dict,
+    throughput_tolerance: float = 0.30,
+    memory_tolerance: float = 0.10,
+    memory_slack_kb: float = 64
+) -> List[Dict]:
+    """
+    Comparar una corrida con la línea base de su nivel
+
+    El throughput esperado se escala con speed_factor (máquina más lenta →
+    se espera menos) y se considera regresión si cae más de
+    throughput_tolerance. La memoria pico no depende de la máquina: es
+    regresión si crece más de memory_tolerance y de memory_slack_kb.
+
+    Returns:
+        Filas con name, throughput, expected, delta, peak_kb, baseline_peak_kb y status
+        ('ok', 'slower', 'memory', 'slower+memory' o 'new')
+    """
+    cases = baseline.get('tiers', {}).get(run['tier'], {}).get('cases', {})
+    speed = speed_factor(run, baseline)
+
+    rows = []
+    for name, result in run['cases'].items():
+        reference = cases.get(name)
+        row = {'name': name, 'unit': result['unit'], 'throughput': result['throughput'],
+               'peak_kb': result['peak_kb'], 'expected': None, 'delta': None,
+               'baseline_peak_kb': None, 'status': 'new'}
+        if reference:
+            expected = reference['throughput'] * speed
+            row['expected'] = expected
+            row['delta'] = result['throughput'] / expected - 1
+            row['baseline_peak_kb'] = reference['peak_kb']
+            slower = result['throughput'] < expected * (1 - throughput_tolerance)
+            memory_limit = max(reference['peak_kb'] * (1 + memory_tolerance),
+                               reference['peak_kb'] + memory_slack_kb)
+            heavier = result['peak_kb'] > memory_limit
+            row['status'] = '+'.join(
+                label for label, flag in (('slower', slower), ('memory', heavier)) if flag
+            ) or 'ok'
+        rows.append(row)
+    return rows
+
+
+def confirm_regressions(run: Dict, baseline: Dict, retries: int = 2, **tolerances) -> List[Dict]:
+    """
+    Volver a medir los casos más lentos que la tolerancia y conservar su mejor throughput
+
+    Una ráfaga de carga en la máquina afecta una medición, no tres seguidas;
+    una regresión real sigue ahí en cada repetición.
+
+    Returns:
+        Filas de compare_to_baseline después de las repeticiones
+    """
+    rows = compare_to_baseline(run, baseline, **tolerances)
+    for _ in range(retries):
+        slower = [row['name'] for row in rows if 'slower' in row['status']]
+        if not slower:
+            break
+        print(f"\n🔁 Repitiendo {len(slower)} casos más lentos que la línea base...")
+        retry = run_suite(run['tier'], only=slower, calibration_s=run['calibration_s'])
+        for name in slower:
+            if name in retry['cases']:
+                current = run['cases'][name]
+                current['throughput'] = max(current['throughput'], retry['cases'][name]['throughput'])
+        rows = compare_to_baseline(run, baseline, **tolerances)
+    return rows
+
+
+def print_comparison(rows: List[Dict], run: Dict, baseline: Dict):
+    """Imprimir la comparación contra la línea base"""
+    tier = baseline.get('tiers', {}).get(run['tier'], {})
+    print("\n" + "="*80)
+    print(f"📊 BENCHMARKS ({run['tier']}) vs LÍNEA BASE")
+    print("="*80)
+    if tier.get('machine') == machine_fingerprint():
+        print("🖥️  Misma máquina que la línea base: throughput sin escalar")
+    elif tier.get('calibration_s'):
+        print(f"🖥️  Calibración: {run['calibration_s']*1000:.1f} ms "
+              f"(línea base {tier['calibration_s']*1000:.1f} ms → esperado ×{speed_factor(run, baseline):.2f})")
+    print()
+    icons = {'ok': "✅", 'new': "⚪"}
+    for row in rows:
+        icon = icons.get(row['status'], "❌")
+        line = f"{icon} {row['name']:<26} {row['throughput']:>13,.1f} {row['unit']:<10}"
+        if row['expected'] is not None:
+            line += f" ({row['delta']:+6.1%})  pico {row['peak_kb']:>10,.0f} KB"
+            if row['baseline_peak_kb']:
+                line += f" ({row['peak_kb'] / row['baseline_peak_kb'] - 1:+6.1%})"
+        else:
+            line += f"  pico {row['peak_kb']:>10,.0f} KB (sin línea base)"
+        print(line)
+
+    regressions = [row for row in rows if row['status'] not in ('ok', 'new')]
+    print("\n" + "="*80)
+    if regressions:
+        print(f"❌ {len(regressions)} regresiones:")
+        for row in regressions:
+            reasons = []
+            if 'slower' in row['status']:
+                reasons.append(f"throughput {row['delta']:+.1%}")
+            if 'memory' in row['status']:
+                reasons.append(f"memoria {row['baseline_peak_kb']:,.0f} → {row['peak_kb']:,.0f} KB")
+            print(f"   - {row['name']}: {', '.join(reasons)}")
+    else:
+        print("🎉 Sin regresiones")
+    print("="*80 + "\n")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+def _option(args: List[str], flag: str) -> Optional[str]:
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '--help' in args or '-h' in args:
+        print("\nUso:")
+        print("  python3 scripts/benchmark_suite.py [--tier quick|full] [--only chunking,sha256/1MB]")
+        print("                                     [--tolerance 0.30] [--memory-tolerance 0.10] [--json out.json]")
+        print("  python3 scripts/benchmark_suite.py --update-baseline [--tier full] [--only ...]\n")
+        sys.exit(0)
+
+    tier = _option(args, '--tier') or 'quick'
+    if tier not in DOCUMENT_SIZES:
+        print(f"❌ Nivel desconocido: {tier} (usa quick o full)")
+        sys.exit(2)
+    only = _option(args, '--only')
+
+    print(f"\n⏱️  Ejecutando benchmarks ({tier})...")
+    run = run_suite(tier, only.split(',') if only else None)
+
+    if '--update-baseline' in args:
+        save_baseline(run)
+        print(f"\n💾 Línea base actualizada: {os.path.relpath(BASELINE_PATH)} "
+              f"({len(run['cases'])} casos, nivel {tier})\n")
+        sys.exit(0)
+
+    baseline = load_baseline()
+    rows = confirm_regressions(
+        run, baseline,
+        throughput_tolerance=float(_option(args, '--tolerance') or os.getenv('BENCH_THROUGHPUT_TOLERANCE', 0.30)),
+        memory_tolerance=float(_option(args, '--memory-tolerance') or os.getenv('BENCH_MEMORY_TOLERANCE', 0.10))
+    )
+    print_comparison(rows, run, baseline)
+
+    if _option(args, '--json'):
+        with open(_option(args, '--json'), 'w', encoding='utf-8') as f:
+            json.dump({'tier': tier, 'calibration_s': run['calibration_s'], 'cases': rows},
+                      f, indent=2, ensure_ascii=False)
+
+    sys.exit(1 if any(row['status'] not in ('ok', 'new') for row in rows) else 0)
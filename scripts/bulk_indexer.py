@@ -0,0 +1,433 @@
+"""
+Bulk Indexer - Carga masiva en paralelo al índice de búsqueda y al almacén de metadata
+Agrupa upserts en lotes de tamaño máximo, envía varios lotes a la vez y
+reintenta solo las llaves que fallaron en respuestas parciales
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+# Límites de Azure AI Search para POST docs/index
+MAX_BATCH_DOCS = 1000
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# Códigos por llave que vale la pena reintentar (conflicto, throttling, no disponible)
+RETRIABLE_STATUS = {409, 422, 429, 500, 502, 503, 504}
+
+
+class BulkItem:
+    """Documento pendiente con su llave y su serialización JSON"""
+    __slots__ = ('key', 'doc', 'raw')
+
+    def __init__(self, key: str, doc: Dict, raw: bytes):
+        self.key = key
+        self.doc = doc
+        self.raw = raw
+
+
+class ThroughputCounter:
+    """Contador thread-safe de documentos, bytes y lotes escritos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.docs = 0
+        self.bytes = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+
+    def add(self, docs: int = 0, nbytes: int = 0, batches: int = 0, retries: int = 0, failed: int = 0):
+        with self._lock:
+            self.docs += docs
+            self.bytes += nbytes
+            self.batches += batches
+            self.retries += retries
+            self.failed += failed
+
+    def snapshot(self) -> Dict:
+        """Totales y tasas desde el inicio"""
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            return {
+                'docs': self.docs,
+                'bytes': self.bytes,
+                'batches': self.batches,
+                'retries': self.retries,
+                'failed': self.failed,
+                'elapsed_s': elapsed,
+                'docs_per_s': self.docs / elapsed,
+                'mb_per_s': self.bytes / elapsed / 1024 / 1024
+            }
+
+
+# ============================================================================
+# DESTINOS (SINKS)
+# ============================================================================
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Interpretar un header Retry-After (RFC 9110)
+
+    Args:
+        value: Segundos ("120") o fecha HTTP ("Wed, 21 Oct 2025 07:28:00 GMT")
+
+    Returns:
+        Segundos a esperar, o None si falta o no se puede interpretar
+        (el llamador usa entonces su backoff exponencial)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class SinkError(Exception):
+    """Error que afecta al lote completo (HTTP 429/5xx, conexión)"""
+
+    def __init__(self, message: str, retriable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retriable = retriable
+        self.retry_after = retry_after
+
+
+class AzureSearchSink:
+    """Destino Azure AI Search: POST indexes/{index}/docs/index"""
+
+    max_batch_docs = MAX_BATCH_DOCS
+    max_batch_bytes = MAX_BATCH_BYTES
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        index_name: str,
+        api_version: str = "2023-11-01",
+        action: str = "mergeOrUpload",
+        timeout: int = 120
+    ):
+        self.url = f"{endpoint.rstrip('/')}/indexes/{index_name}/docs/index?api-version={api_version}"
+        self.headers = {'api-key': api_key, 'Content-Type': 'application/json'}
+        self.action = action
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'AzureSearchSink':
+        """Crear el destino a partir de las variables de config_template.env"""
+        options = {
+            'endpoint': os.getenv('AZURE_SEARCH_ENDPOINT', ''),
+            'api_key': os.getenv('AZURE_SEARCH_KEY', ''),
+            'index_name': os.getenv('AZURE_SEARCH_INDEX', 'rag-documents'),
+            'api_version': os.getenv('AZURE_SEARCH_API_VERSION', '2023-11-01')
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def prepare(self, doc: Dict) -> Dict:
+        """Agregar @search.action al documento antes de serializarlo"""
+        return {'@search.action': self.action, **doc}
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, items: List[BulkItem]) -> Dict[str, Tuple[bool, str]]:
+        """
+        Enviar un lote
+
+        Returns:
+            {llave: (reintentable, mensaje)} solo para las llaves que fallaron
+        """
+        body = b'{"value":[' + b','.join(item.raw for item in items) + b']}'
+        try:
+            response = self._session().post(self.url, headers=self.headers, data=body, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise SinkError(str(e))
+
+        if response.status_code in (429, 503) or response.status_code >= 500:
+            raise SinkError(
+                f"HTTP {response.status_code}",
+                retry_after=parse_retry_after(response.headers.get('Retry-After'))
+            )
+        if response.status_code == 413:
+            raise SinkError("HTTP 413: lote demasiado grande", retriable=False)
+        if response.status_code not in (200, 207):
+            raise SinkError(f"HTTP {response.status_code}: {response.text[:200]}", retriable=False)
+
+        failed = {}
+        for result in response.json().get('value', []):
+            if not result.get('status', False):
+                code = result.get('statusCode', 0)
+                failed[result['key']] = (code in RETRIABLE_STATUS, result.get('errorMessage') or f"HTTP {code}")
+        return failed
+
+
+class LocalIndexSink:
+    """Destino en proceso para LocalVectorIndex (pruebas y evaluación offline)"""
+
+    max_batch_docs = MAX_BATCH_DOCS
+    max_batch_bytes = MAX_BATCH_BYTES
+
+    def __init__(self, index, action: str = "mergeOrUpload"):
+        self.index = index
+        self.action = action
+
+    def prepare(self, doc: Dict) -> Dict:
+        return {'@search.action': self.action, **doc}
+
+    def send(self, items: List[BulkItem]) -> Dict[str, Tuple[bool, str]]:
+        result = self.index.index({'value': [item.doc for item in items]})
+        return {
+            r['key']: (True, r.get('errorMessage', 'error'))
+            for r in result['value'] if not r.get('status', False)
+        }
+
+
+class CosmosMetadataSink:
+    """
+    Destino Cosmos DB para la metadata de documentos
+
+    El API de Cosmos no tiene upsert multi-documento entre particiones, así que
+    cada lote se escribe con upserts concurrentes sobre un cliente compartido.
+    Con `partial_update=True` cada documento se aplica con patch_item (operaciones
+    `set` por campo) y el resto del registro se conserva.
+    """
+
+    max_batch_docs = 100
+    max_batch_bytes = 2 * 1024 * 1024
+
+    def __init__(self, container, key_field: str = "id", concurrency: int = 16, partial_update: bool = False):
+        """
+        Args:
+            container: ContainerProxy de azure-cosmos
+            key_field: Campo llave del documento (también es la partition key /id)
+            concurrency: Upserts simultáneos por lote
+            partial_update: Actualizar solo los campos enviados en vez de reemplazar el documento
+        """
+        self.container = container
+        self.key_field = key_field
+        self.partial_update = partial_update
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    @classmethod
+    def from_env(cls, container_name: Optional[str] = None, **kwargs) -> 'CosmosMetadataSink':
+        """Crear el destino con COSMOS_DB_* de config_template.env"""
+        from azure.cosmos import CosmosClient
+
+        client = CosmosClient(os.getenv('COSMOS_DB_ENDPOINT', ''), credential=os.getenv('COSMOS_DB_KEY', ''))
+        database = client.get_database_client(os.getenv('COSMOS_DB_DATABASE', 'rag-system'))
+        container = database.get_container_client(
+            container_name or os.getenv('COSMOS_DB_CONTAINER_METADATA', 'documents_metadata')
+        )
+        return cls(container, **kwargs)
+
+    def prepare(self, doc: Dict) -> Dict:
+        return doc
+
+    def _patch(self, doc: Dict):
+        key = doc[self.key_field]
+        operations = [{'op': 'set', 'path': f'/{field}', 'value': value}
+                      for field, value in doc.items() if field != self.key_field]
+        return self.container.patch_item(item=key, partition_key=key, patch_operations=operations)
+
+    def send(self, items: List[BulkItem]) -> Dict[str, Tuple[bool, str]]:
+        write = self._patch if self.partial_update else self.container.upsert_item
+        futures = {self._executor.submit(write, item.doc): item for item in items}
+        failed = {}
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                code = getattr(error, 'status_code', 0)
+                failed[futures[future].key] = (code in RETRIABLE_STATUS or code == 0, str(error)[:200])
+        return failed
+
+
+# ============================================================================
+# ESCRITOR MASIVO
+# ============================================================================
+
+class BulkWriter:
+    """
+    Escritor masivo con lotes de tamaño máximo y envío concurrente
+
+    Los documentos se consumen en streaming: nunca hay más de
+    `max_concurrency * 2` lotes en memoria.
+    """
+
+    def __init__(
+        self,
+        sink,
+        key_field: str = "chunk_id",
+        max_batch_docs: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 5
+    ):
+        """
+        Inicializar el escritor
+
+        Args:
+            sink: Destino (AzureSearchSink, CosmosMetadataSink, LocalIndexSink)
+            key_field: Campo llave de los documentos
+            max_batch_docs: Documentos por lote (por defecto, el límite del destino)
+            max_batch_bytes: Bytes por lote (por defecto, el límite del destino)
+            max_concurrency: Lotes enviados en paralelo
+            max_retries: Reintentos para llaves con error transitorio
+        """
+        self.sink = sink
+        self.key_field = key_field
+        self.max_batch_docs = max_batch_docs or sink.max_batch_docs
+        self.max_batch_bytes = max_batch_bytes or sink.max_batch_bytes
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.counter = ThroughputCounter()
+
+    def _batches(self, documents: Iterable[Dict]) -> Iterator[List[BulkItem]]:
+        batch: List[BulkItem] = []
+        batch_bytes = 0
+        for doc in documents:
+            prepared = self.sink.prepare(doc)
+            raw = json.dumps(prepared, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            item = BulkItem(doc[self.key_field], prepared, raw)
+            if batch and (
+                len(batch) >= self.max_batch_docs
+                or batch_bytes + len(raw) + 1 > self.max_batch_bytes
+            ):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(item)
+            batch_bytes += len(raw) + 1
+        if batch:
+            yield batch
+
+    def _write_batch(self, batch: List[BulkItem]) -> Dict[str, str]:
+        pending = batch
+        errors: Dict[str, str] = {}
+        for attempt in range(self.max_retries + 1):
+            try:
+                failed = self.sink.send(pending)
+            except SinkError as e:
+                if not e.retriable or attempt == self.max_retries:
+                    errors.update({item.key: str(e) for item in pending})
+                    break
+                self.counter.add(retries=len(pending))
+                time.sleep(e.retry_after or min(30.0, 2 ** attempt + random.random()))
+                continue
+
+            done = [item for item in pending if item.key not in failed]
+            self.counter.add(
+                docs=len(done),
+                nbytes=sum(len(item.raw) for item in done),
+                batches=1
+            )
+            retry = [item for item in pending if failed.get(item.key, (False,))[0]]
+            errors.update({k: msg for k, (retriable, msg) in failed.items() if not retriable})
+            if not retry:
+                break
+            if attempt == self.max_retries:
+                errors.update({item.key: failed[item.key][1] for item in retry})
+                break
+            # Solo se reenvían las llaves que fallaron
+            self.counter.add(retries=len(retry))
+            pending = retry
+            time.sleep(min(30.0, 2 ** attempt + random.random()))
+
+        if errors:
+            self.counter.add(failed=len(errors))
+        return errors
+
+    def write(self, documents: Iterable[Dict], progress: bool = False) -> Dict:
+        """
+        Escribir todos los documentos
+
+        Args:
+            documents: Iterable de documentos (puede ser un generador)
+            progress: Imprimir avance con la tasa de escritura
+
+        Returns:
+            Resumen con totales, tasas y errores por llave
+        """
+        errors: Dict[str, str] = {}
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for batch in self._batches(documents):
+                if len(in_flight) >= self.max_concurrency * 2:
+                    done = next(as_completed(in_flight))
+                    in_flight.remove(done)
+                    errors.update(done.result())
+                    if progress:
+                        self._print_progress()
+                in_flight.add(executor.submit(self._write_batch, batch))
+            for future in as_completed(in_flight):
+                errors.update(future.result())
+
+        summary = self.counter.snapshot()
+        summary['errors'] = errors
+        if progress:
+            self._print_progress(final=True)
+        return summary
+
+    def _print_progress(self, final: bool = False):
+        stats = self.counter.snapshot()
+        line = (f"   └─ {stats['docs']:,} docs | {stats['docs_per_s']:,.0f} docs/s | "
+                f"{stats['mb_per_s']:.1f} MB/s | reintentos {stats['retries']:,} | "
+                f"fallidos {stats['failed']:,}")
+        print(f"\r{line}", end="\n" if final else "", flush=True)
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """Leer documentos de un archivo JSON Lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("\nUso:")
+        print("  python3 scripts/bulk_indexer.py <chunks.jsonl> [concurrencia]")
+        print("\nVariables: AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, AZURE_SEARCH_INDEX\n")
+        sys.exit(1)
+
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    writer = BulkWriter(AzureSearchSink.from_env(), max_concurrency=concurrency)
+
+    print("\n" + "="*80)
+    print(f"📤 CARGA MASIVA AL ÍNDICE: {sys.argv[1]}")
+    print("="*80 + "\n")
+    result = writer.write(read_jsonl(sys.argv[1]), progress=True)
+
+    print(f"\n✅ {result['docs']:,} documentos en {result['elapsed_s']:.1f}s "
+          f"({result['docs_per_s']:,.0f} docs/s)")
+    if result['errors']:
+        print(f"❌ {len(result['errors'])} llaves fallidas:")
+        for key, message in list(result['errors'].items())[:10]:
+            print(f"   └─ {key}: {message}")
+    print("\n" + "="*80 + "\n")
@@ -0,0 +1,361 @@
+"""
+Bulk Ingest - Ingesta masiva y reanudable de directorios al webhook de ingesta RAG
+Registra el avance en un journal append-only: si el proceso se interrumpe
+(caída o Ctrl-C), la siguiente ejecución continúa exactamente donde quedó
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+N8N_URL = os.getenv('N8N_URL', "http://159.203.149.247:5678")
+DEFAULT_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md', '.html', '.png', '.jpg', '.jpeg')
+DEFAULT_JOURNAL = '.ingest_journal.jsonl'
+# Formatos cuyo texto se puede leer sin extractor (para la detección de casi duplicados)
+TEXT_EXTENSIONS = ('.txt', '.md', '.html')
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 de un archivo leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestJournal:
+    """
+    Journal append-only en JSON Lines
+
+    Cada línea es un evento ("done" o "failed") con hash, ruta, tamaño y
+    mtime (y la firma MinHash si se detectan casi duplicados). Al abrirlo se
+    reproduce para saber qué ya se ingirió; las líneas truncadas por una
+    caída se ignoran.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done_hashes = set()
+        self.done_files: Dict[str, tuple] = {}
+        self.signatures: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if event.get('event') == 'done':
+                        self.done_hashes.add(event['hash'])
+                        self.done_files[event['path']] = (event['size'], event['mtime'])
+                        if event.get('minhash'):
+                            self.signatures[event['path']] = event['minhash']
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def is_unchanged(self, path: str, size: int, mtime: float) -> bool:
+        """El archivo ya se ingirió y no cambió (evita recalcular el hash)"""
+        return self.done_files.get(path) == (size, mtime)
+
+    def record(self, event: Dict):
+        """Agregar un evento y forzarlo a disco"""
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if event.get('event') == 'done':
+                self.done_hashes.add(event['hash'])
+                self.done_files[event['path']] = (event['size'], event['mtime'])
+
+    def close(self):
+        self._file.close()
+
+
+class ProgressTracker:
+    """Throughput en vivo (docs/s, MB/s, chunks/s) y ETA"""
+
+    def __init__(self, total_files: int, total_bytes: int):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.failed = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, nbytes: int, chunks: int = 0, failed: bool = False):
+        with self._lock:
+            self.files += 1
+            self.bytes += nbytes
+            self.chunks += chunks
+            self.failed += int(failed)
+
+    def line(self) -> str:
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            mb_s = self.bytes / elapsed / 1024 / 1024
+            remaining = self.total_bytes - self.bytes
+            eta = remaining / (self.bytes / elapsed) if self.bytes else float('inf')
+            eta_text = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta != float('inf') else '--:--:--'
+            return (f"📥 {self.files:,}/{self.total_files:,} docs | "
+                    f"{self.files / elapsed:.1f} docs/s | {mb_s:.2f} MB/s | "
+                    f"{self.chunks / elapsed:.1f} chunks/s | fallidos {self.failed} | ETA {eta_text}")
+
+
+def iter_files(root: Optional[str], manifest: Optional[str], extensions) -> Iterator[Dict]:
+    """
+    Enumerar archivos a ingerir
+
+    Con `manifest` (JSON Lines con "path" y metadata opcional, o una ruta por
+    línea) se usa esa lista; si no, se recorre `root` recursivamente.
+    """
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line) if line.startswith('{') else {'path': line}
+                if not os.path.isabs(entry['path']):
+                    entry['path'] = os.path.join(base, entry['path'])
+                yield entry
+        return
+    for dirpath, dirnames, filenames in os.walk(os.path.abspath(root)):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(extensions):
+                yield {'path': os.path.join(dirpath, name)}
+
+
+def journal_path(root: Optional[str], manifest: Optional[str], journal: Optional[str] = None) -> str:
+    """
+    Ruta absoluta del journal, anclada al origen y no al directorio actual
+
+    Sin `journal` se usa .ingest_journal.jsonl dentro del directorio recorrido
+    (o junto al manifiesto); una ruta relativa se resuelve contra ese mismo
+    directorio, igual que las rutas del manifiesto. Así, reanudar desde otro
+    directorio de trabajo encuentra el mismo journal.
+    """
+    base = os.path.dirname(os.path.abspath(manifest)) if manifest else os.path.abspath(root)
+    return os.path.join(base, journal or DEFAULT_JOURNAL)
+
+
+class BulkIngestor:
+    """Ingesta concurrente de archivos contra el webhook /webhook/rag/ingest"""
+
+    def __init__(
+        self,
+        journal: IngestJournal,
+        webhook_url: str = f"{N8N_URL}/webhook/rag/ingest",
+        parallelism: int = 4,
+        timeout: int = 300,
+        defaults: Optional[Dict] = None,
+        near_duplicates=None
+    ):
+        """
+        Args:
+            journal: Journal de avance
+            webhook_url: URL del webhook de ingesta
+            parallelism: Documentos simultáneos
+            timeout: Timeout HTTP por documento
+            defaults: Metadata por defecto de cada documento
+            near_duplicates: NearDuplicateIndex opcional; los archivos de texto
+                casi idénticos a uno ya ingerido se saltan sin enviarlos
+        """
+        self.journal = journal
+        self.webhook_url = webhook_url
+        self.parallelism = parallelism
+        self.timeout = timeout
+        self.defaults = defaults or {}
+        self.near_duplicates = near_duplicates
+        self._local = threading.local()
+        self._stop = threading.Event()
+        if near_duplicates is not None:
+            # Reconstruir el índice con las firmas de ejecuciones anteriores
+            import numpy as np
+            for path, signature in journal.signatures.items():
+                near_duplicates.add(path, '', np.frombuffer(bytes.fromhex(signature), dtype=np.uint32))
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _ingest_one(self, entry: Dict, size: int, mtime: float, progress: ProgressTracker):
+        path = entry['path']
+        with open(path, 'rb') as f:
+            content = f.read()
+        file_hash = hashlib.sha256(content).hexdigest()
+        event = {'path': path, 'hash': file_hash, 'size': size, 'mtime': mtime, 'ts': time.time()}
+
+        if file_hash in self.journal.done_hashes:
+            # Mismo contenido ya ingerido desde otra ruta
+            self.journal.record({**event, 'event': 'done', 'skipped': 'duplicate'})
+            progress.add(size)
+            return
+
+        signature = None
+        if self.near_duplicates is not None and path.lower().endswith(TEXT_EXTENSIONS):
+            # Copias levemente editadas: se registra antes de enviar para que dos
+            # workers no ingieran a la vez dos versiones del mismo texto
+            text = content.decode('utf-8', errors='ignore')
+            signature = self.near_duplicates.signature(text)
+            matches = self.near_duplicates.check_and_add(path, text, signature)
+            if matches:
+                self.journal.record({
+                    **event,
+                    'event': 'done',
+                    'skipped': 'near_duplicate',
+                    'duplicate_of': matches[0][0],
+                    'similarity': round(matches[0][1], 3)
+                })
+                progress.add(size)
+                return
+            event['minhash'] = signature.tobytes().hex()
+
+        payload = {
+            **self.defaults,
+            **{k: v for k, v in entry.items() if k != 'path'},
+            'filename': os.path.basename(path),
+            'file_base64': base64.b64encode(content).decode('ascii')
+        }
+        try:
+            response = self._session().post(self.webhook_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            if signature is not None:
+                self.near_duplicates.remove(path)
+            self.journal.record({**event, 'event': 'failed', 'error': str(e)[:300]})
+            progress.add(size, failed=True)
+            return
+
+        chunks = int(result.get('chunks_generated') or 0)
+        self.journal.record({
+            **event,
+            'event': 'done',
+            'document_id': result.get('document_id'),
+            'chunks': chunks
+        })
+        progress.add(size, chunks=chunks)
+
+    def run(self, entries: List[Dict], show_progress: bool = True) -> ProgressTracker:
+        """
+        Ingerir las entradas pendientes
+
+        Los archivos sin cambios según el journal se saltan sin leerlos.
+        """
+        pending = []
+        for entry in entries:
+            try:
+                stat = os.stat(entry['path'])
+            except FileNotFoundError:
+                print(f"⚠️  Archivo no encontrado: {entry['path']}")
+                continue
+            if not self.journal.is_unchanged(entry['path'], stat.st_size, stat.st_mtime):
+                pending.append((entry, stat.st_size, stat.st_mtime))
+
+        progress = ProgressTracker(len(pending), sum(size for _, size, _ in pending))
+        if show_progress:
+            print(f"📋 {len(entries) - len(pending):,} ya ingeridos, {len(pending):,} pendientes\n")
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            try:
+                for entry, size, mtime in pending:
+                    if self._stop.is_set():
+                        break
+                    while len(in_flight) >= self.parallelism * 2:
+                        done, in_flight = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                        if show_progress:
+                            print(f"\r{progress.line()}", end="", flush=True)
+                    in_flight.add(executor.submit(self._ingest_one, entry, size, mtime, progress))
+                while in_flight:
+                    done, in_flight = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                    if show_progress:
+                        print(f"\r{progress.line()}", end="", flush=True)
+            except KeyboardInterrupt:
+                # Dejar terminar lo que está en vuelo: el journal queda consistente
+                self._stop.set()
+                print("\n\n⏸️  Interrumpido: esperando documentos en vuelo...")
+                for future in in_flight:
+                    future.cancel()
+                wait(in_flight)
+        if show_progress:
+            print(f"\r{progress.line()}")
+        return progress
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Ingesta masiva y reanudable de documentos RAG")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('directory', nargs='?', help="Directorio a recorrer")
+    source.add_argument('--manifest', help="Archivo con una ruta (o JSON con 'path') por línea")
+    parser.add_argument('--journal', help=f"Ruta del journal, relativa al origen (por defecto {DEFAULT_JOURNAL})")
+    parser.add_argument('--parallel', type=int, default=4, help="Documentos simultáneos")
+    parser.add_argument('--webhook', default=f"{N8N_URL}/webhook/rag/ingest")
+    parser.add_argument('--department', default='general')
+    parser.add_argument('--document-type', default='unknown')
+    parser.add_argument('--uploaded-by', default='bulk_ingest')
+    parser.add_argument('--extensions', default=','.join(DEFAULT_EXTENSIONS))
+    parser.add_argument('--near-duplicates', type=float, nargs='?', const=0.8, metavar='JACCARD',
+                        help="Saltar archivos de texto casi idénticos a uno ya ingerido (umbral, por defecto 0.8)")
+    args = parser.parse_args()
+    args.journal = journal_path(args.directory, args.manifest, args.journal)
+
+    print("\n" + "="*80)
+    print("📚 INGESTA MASIVA DE DOCUMENTOS")
+    print("="*80)
+    print(f"\nOrigen: {args.manifest or args.directory}")
+    print(f"Journal: {args.journal}")
+    print(f"Paralelismo: {args.parallel}\n")
+
+    extensions = tuple(e.strip().lower() for e in args.extensions.split(',') if e.strip())
+    entries = list(iter_files(args.directory, args.manifest, extensions))
+    journal = IngestJournal(args.journal)
+    near_duplicates = None
+    if args.near_duplicates is not None:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from dedup_index import NearDuplicateIndex
+        near_duplicates = NearDuplicateIndex(threshold=args.near_duplicates)
+        print(f"Casi duplicados: Jaccard >= {args.near_duplicates} ({', '.join(TEXT_EXTENSIONS)})\n")
+    ingestor = BulkIngestor(
+        journal,
+        webhook_url=args.webhook,
+        parallelism=args.parallel,
+        defaults={
+            'department': args.department,
+            'document_type': args.document_type,
+            'uploaded_by': args.uploaded_by
+        },
+        near_duplicates=near_duplicates
+    )
+    try:
+        progress = ingestor.run(entries)
+    finally:
+        journal.close()
+
+    print("\n" + "="*80)
+    print(f"✅ Procesados: {progress.files - progress.failed:,} | ❌ Fallidos: {progress.failed:,}")
+    print(f"   └─ Chunks generados: {progress.chunks:,}")
+    if progress.failed:
+        print("   └─ Vuelve a ejecutar el mismo comando para reintentar los fallidos")
+    print("="*80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
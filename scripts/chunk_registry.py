@@ -0,0 +1,322 @@
+"""
+Chunk Registry - Índice inverso document_id → chunk_ids para eliminaciones masivas
+Con los chunk_ids guardados junto a la metadata del documento, eliminar (o
+marcar como eliminado) uno o miles de documentos es un único envío por lotes
+a docs/index, sin búsquedas filtradas previas
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_indexer import BulkWriter, LocalIndexSink
+
+
+class ChunkRegistry:
+    """
+    Índice inverso document_id → chunk_ids
+
+    Se persiste dentro de la metadata del documento (campo "chunk_ids" del
+    contenedor documents_metadata) o, sin Cosmos DB, en un archivo JSON.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Archivo JSON {document_id: [chunk_ids]}; None = solo en memoria
+        """
+        self.path = path
+        self._chunks: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._chunks = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._chunks
+
+    @classmethod
+    def from_metadata(cls, documents: Iterable[Dict], path: Optional[str] = None) -> 'ChunkRegistry':
+        """Reconstruir el índice desde documentos de metadata con "chunk_ids" """
+        registry = cls(path)
+        for doc in documents:
+            chunk_ids = doc.get('chunk_ids')
+            if chunk_ids:
+                registry._chunks[doc.get('document_id') or doc['id']] = list(chunk_ids)
+        return registry
+
+    @classmethod
+    def from_cosmos(cls, container, path: Optional[str] = None) -> 'ChunkRegistry':
+        """Cargar el índice desde el contenedor de metadata de Cosmos DB"""
+        documents = container.query_items(
+            "SELECT c.id, c.document_id, c.chunk_ids FROM c WHERE IS_DEFINED(c.chunk_ids)",
+            enable_cross_partition_query=True
+        )
+        return cls.from_metadata(documents, path)
+
+    def register(self, document_id: str, chunk_ids: Sequence[str]):
+        """Registrar (o reemplazar) los chunks de un documento"""
+        with self._lock:
+            self._chunks[document_id] = list(chunk_ids)
+
+    def register_chunks(self, chunks: Iterable[Dict], key_field: str = "chunk_id"):
+        """
+        Registrar chunks agrupándolos por su document_id
+
+        Los chunks de cada documento reemplazan a los registrados: al reindexar
+        un documento con menos chunks no quedan llaves que ya no existen.
+        """
+        grouped = defaultdict(list)
+        for chunk in chunks:
+            grouped[chunk['document_id']].append(chunk[key_field])
+        with self._lock:
+            self._chunks.update(grouped)
+
+    def chunk_ids(self, document_id: str) -> List[str]:
+        """Chunks de un documento (lista vacía si no está registrado)"""
+        return list(self._chunks.get(document_id, ()))
+
+    def forget(self, document_ids: Iterable[str]):
+        """Eliminar documentos del índice"""
+        with self._lock:
+            for document_id in document_ids:
+                self._chunks.pop(document_id, None)
+
+    def metadata_document(self, document_id: str, **fields) -> Dict:
+        """Documento de metadata con el índice inverso incluido"""
+        chunk_ids = self.chunk_ids(document_id)
+        return {
+            'id': document_id,
+            'document_id': document_id,
+            **fields,
+            'chunk_ids': chunk_ids,
+            'chunk_count': len(chunk_ids)
+        }
+
+    def save(self):
+        """Escribir el índice en disco (reemplazo atómico)"""
+        if not self.path:
+            return
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._chunks, f)
+            os.replace(tmp, self.path)
+
+
+class DocumentDeleter:
+    """
+    Eliminación masiva de documentos por document_id
+
+    Todos los chunks de todos los documentos pedidos se envían a docs/index
+    en lotes de hasta 1.000 acciones, con el paralelismo y los reintentos
+    por llave de BulkWriter.
+    """
+
+    def __init__(
+        self,
+        index_sink,
+        registry: ChunkRegistry,
+        metadata_sink=None,
+        key_field: str = "chunk_id",
+        max_concurrency: int = 4
+    ):
+        """
+        Args:
+            index_sink: Destino del índice (AzureSearchSink, LocalIndexSink)
+            registry: Índice inverso document_id → chunk_ids
+            metadata_sink: Destino de metadata para marcar el estado; debe actualizar
+                solo los campos enviados (CosmosMetadataSink con partial_update=True)
+            key_field: Campo llave de los chunks
+            max_concurrency: Lotes enviados en paralelo
+        """
+        if metadata_sink is not None and not getattr(metadata_sink, 'partial_update', False):
+            raise ValueError("metadata_sink debe actualizar parcialmente (partial_update=True): "
+                             "un reemplazo borraría filename, document_hash y metadata del registro")
+        self.index_sink = index_sink
+        self.registry = registry
+        self.metadata_sink = metadata_sink
+        self.key_field = key_field
+        self.max_concurrency = max_concurrency
+
+    def _actions(self, document_ids: Sequence[str], soft: bool, deleted_at: str) -> Iterable[Dict]:
+        for document_id in document_ids:
+            for chunk_id in self.registry.chunk_ids(document_id):
+                if soft:
+                    # merge: solo cambia los campos de estado, el vector no se reenvía
+                    yield {'@search.action': 'merge', self.key_field: chunk_id,
+                           'is_deleted': True, 'deleted_at': deleted_at}
+                else:
+                    yield {'@search.action': 'delete', self.key_field: chunk_id}
+
+    def delete(self, document_ids: Sequence[str], soft: bool = False, progress: bool = False) -> Dict:
+        """
+        Eliminar (o marcar como eliminados) los chunks de varios documentos
+
+        Args:
+            document_ids: Documentos a eliminar (p. ej. una línea de producto retirada)
+            soft: Marcar is_deleted=true en vez de borrar (reversible con restore)
+            progress: Imprimir avance
+
+        Returns:
+            Resumen con documentos/chunks eliminados, tasas y errores por llave
+        """
+        document_ids = list(dict.fromkeys(document_ids))
+        unknown = [d for d in document_ids if d not in self.registry]
+        known = [d for d in document_ids if d in self.registry]
+        deleted_at = datetime.now(timezone.utc).isoformat()
+
+        writer = BulkWriter(self.index_sink, key_field=self.key_field, max_concurrency=self.max_concurrency)
+        result = writer.write(self._actions(known, soft, deleted_at), progress=progress)
+        errors = result['errors']
+
+        failed_documents = set()
+        if errors:
+            failed_documents = {d for d in known if any(c in errors for c in self.registry.chunk_ids(d))}
+        completed = [d for d in known if d not in failed_documents]
+
+        if completed:
+            # El soft-delete conserva chunk_ids para poder restaurar
+            status = 'soft_deleted' if soft else 'deleted'
+            self._update_metadata(
+                {'id': d, 'status': status, 'deleted_at': deleted_at,
+                 **({} if soft else {'chunk_ids': [], 'chunk_count': 0})}
+                for d in completed
+            )
+        if not soft:
+            self.registry.forget(completed)
+            self.registry.save()
+
+        elapsed = result['elapsed_s']
+        return {
+            'documents': len(completed),
+            'chunks': result['docs'],
+            'soft': soft,
+            'unknown_documents': unknown,
+            'failed_documents': sorted(failed_documents),
+            'elapsed_s': elapsed,
+            'documents_per_s': len(completed) / elapsed,
+            'chunks_per_s': result['docs_per_s'],
+            'batches': result['batches'],
+            'errors': errors
+        }
+
+    def _update_metadata(self, updates: Iterable[Dict]):
+        if self.metadata_sink is not None:
+            BulkWriter(self.metadata_sink, key_field='id', max_concurrency=self.max_concurrency).write(updates)
+
+    def restore(self, document_ids: Sequence[str]) -> Dict:
+        """Revertir un soft-delete (chunks visibles de nuevo y registro en status 'indexed')"""
+        document_ids = [d for d in dict.fromkeys(document_ids) if d in self.registry]
+        writer = BulkWriter(self.index_sink, key_field=self.key_field, max_concurrency=self.max_concurrency)
+        actions = (
+            {'@search.action': 'merge', self.key_field: chunk_id, 'is_deleted': False, 'deleted_at': None}
+            for document_id in document_ids
+            for chunk_id in self.registry.chunk_ids(document_id)
+        )
+        result = writer.write(actions)
+        errors = result['errors']
+        restored = [d for d in document_ids if not any(c in errors for c in self.registry.chunk_ids(d))]
+        self._update_metadata({'id': d, 'status': 'indexed', 'deleted_at': None} for d in restored)
+        return result
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark(n_documents: int = 2_000, chunks_per_document: int = 20, dimensions: int = 64) -> Dict:
+    """Throughput de eliminación: filtro + borrado por chunk vs índice inverso en lotes"""
+    from local_vector_index import LocalVectorIndex
+
+    def build():
+        index = LocalVectorIndex(dimensions=dimensions)
+        registry = ChunkRegistry()
+        rng = np.random.default_rng(2)
+        vectors = rng.standard_normal((n_documents * chunks_per_document, dimensions)).astype(np.float32)
+        chunks = [
+            {'chunk_id': f'doc_{d}_chunk_{c}', 'document_id': f'doc_{d}',
+             'content_vector': vectors[d * chunks_per_document + c]}
+            for d in range(n_documents) for c in range(chunks_per_document)
+        ]
+        index.upload_documents(chunks)
+        registry.register_chunks(chunks)
+        return index, registry
+
+    targets = [f'doc_{d}' for d in range(0, n_documents, 2)]
+
+    # Como el workflow sin índice inverso: buscar los chunks del documento y borrarlos uno a uno
+    index, _ = build()
+    sample = targets[:max(1, len(targets) // 10)]
+    start = time.perf_counter()
+    for document_id in sample:
+        keys = [doc['chunk_id'] for doc in index._docs if doc is not None and doc['document_id'] == document_id]
+        for key in keys:
+            index.index({'value': [{'@search.action': 'delete', 'chunk_id': key}]})
+    naive_docs_per_s = len(sample) / (time.perf_counter() - start)
+
+    index, registry = build()
+    soft = DocumentDeleter(LocalIndexSink(index), registry).delete(targets, soft=True)
+    hard = DocumentDeleter(LocalIndexSink(index), registry).delete(targets)
+
+    return {
+        'documents': len(targets),
+        'chunks': hard['chunks'],
+        'naive_docs_per_s': naive_docs_per_s,
+        'soft_docs_per_s': soft['documents_per_s'],
+        'hard_docs_per_s': hard['documents_per_s'],
+        'hard_chunks_per_s': hard['chunks_per_s'],
+        'remaining_chunks': len(index)
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+        results = benchmark(n_documents=n)
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK ELIMINACIÓN ({results['documents']:,} documentos, {results['chunks']:,} chunks)")
+        print("="*80)
+        print(f"\n🐢 Búsqueda filtrada + borrado por chunk: {results['naive_docs_per_s']:,.0f} docs/s")
+        print(f"🏷️  Soft-delete por lotes: {results['soft_docs_per_s']:,.0f} docs/s")
+        print(f"🗑️  Eliminación por lotes: {results['hard_docs_per_s']:,.0f} docs/s "
+              f"({results['hard_chunks_per_s']:,.0f} chunks/s)")
+        print(f"   └─ Chunks restantes en el índice: {results['remaining_chunks']:,}")
+        print("\n" + "="*80 + "\n")
+    elif len(sys.argv) > 2 and sys.argv[1] == '--delete':
+        from bulk_indexer import AzureSearchSink, CosmosMetadataSink
+
+        soft = '--soft' in sys.argv
+        document_ids = [arg for arg in sys.argv[2:] if not arg.startswith('--')]
+        metadata_sink = CosmosMetadataSink.from_env(partial_update=True)
+        registry = ChunkRegistry.from_cosmos(metadata_sink.container)
+        deleter = DocumentDeleter(AzureSearchSink.from_env(), registry, metadata_sink)
+
+        print(f"\n🗑️  {'Marcando' if soft else 'Eliminando'} {len(document_ids):,} documentos...")
+        summary = deleter.delete(document_ids, soft=soft, progress=True)
+        print(f"\n✅ {summary['documents']:,} documentos / {summary['chunks']:,} chunks en "
+              f"{summary['elapsed_s']:.1f}s ({summary['documents_per_s']:,.0f} docs/s)")
+        if summary['unknown_documents']:
+            print(f"⚠️  Sin chunks registrados: {', '.join(summary['unknown_documents'][:10])}")
+        if summary['failed_documents']:
+            print(f"❌ Con errores: {', '.join(summary['failed_documents'][:10])}")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/chunk_registry.py --benchmark [n_documentos]")
+        print("  python3 scripts/chunk_registry.py --delete <document_id> [...] [--soft]\n")
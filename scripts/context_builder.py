@@ -0,0 +1,322 @@
+"""
+Context Builder - Contexto para el LLM con presupuesto de tokens
+Une chunks adyacentes o solapados del mismo documento, elimina texto repetido y
+empaca los pasajes más relevantes dentro del presupuesto derivado de MAX_TOKENS
+(reemplazo del nodo "📝 Construir Contexto", que concatena todo sin límite)
+"""
+
+import hashlib
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from embedding_scheduler import estimate_tokens
+
+_CHUNK_INDEX_RE = re.compile(r"_chunk_(\d+)$")
+_SENTENCE_END_RE = re.compile(r"[.!?]\s")
+
+# Formato de cada fuente, igual al del workflow de consultas
+SOURCE_TEMPLATE = "[Fuente {n}: {filename}]\n{content}"
+SOURCE_SEPARATOR = "\n\n---\n\n"
+
+
+def context_budget(
+    context_window: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    reserved: int = 600
+) -> int:
+    """
+    Tokens disponibles para el contexto
+
+    context_window - MAX_TOKENS (respuesta) - reserved (prompt de sistema,
+    pregunta e instrucciones).
+
+    Args:
+        context_window: Ventana del modelo (CONTEXT_WINDOW_TOKENS, 8192 para gpt-4)
+        max_tokens: Tokens de la respuesta (MAX_TOKENS de config_template.env)
+        reserved: Tokens reservados para el resto del prompt
+    """
+    if context_window is None:
+        context_window = int(os.getenv('CONTEXT_WINDOW_TOKENS', '8192'))
+    if max_tokens is None:
+        max_tokens = int(os.getenv('MAX_TOKENS', '800'))
+    return max(0, context_window - max_tokens - reserved)
+
+
+def chunk_position(result: Dict) -> Optional[int]:
+    """Posición del chunk en su documento (chunk_index o sufijo _chunk_N del chunk_id)"""
+    if result.get('chunk_index') is not None:
+        return int(result['chunk_index'])
+    match = _CHUNK_INDEX_RE.search(str(result.get('chunk_id', '')))
+    return int(match.group(1)) if match else None
+
+
+def overlap_length(
+    left: str,
+    right: str,
+    max_overlap: int = 200,
+    expected: Optional[int] = None,
+    min_overlap: int = 10
+) -> int:
+    """
+    Longitud del sufijo de `left` que es prefijo de `right`
+
+    Primero se prueba el solapamiento configurado del chunker (CHUNK_OVERLAP);
+    si no coincide se busca el mayor solapamiento hasta max_overlap. En esa
+    búsqueda se exigen al menos min_overlap caracteres: una coincidencia de
+    uno o dos (un espacio, una letra) es casual y recortaría texto real.
+    """
+    if expected is None:
+        expected = int(os.getenv('CHUNK_OVERLAP', '50'))
+    if 0 < expected <= min(len(left), len(right)) and left.endswith(right[:expected]):
+        return expected
+    limit = min(len(left), len(right), max_overlap)
+    for size in range(limit, max(min_overlap, 1) - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _span_key(text: str) -> str:
+    return hashlib.sha1(' '.join(text.lower().split()).encode('utf-8')).hexdigest()
+
+
+class Passage:
+    """Tramo continuo de un documento formado por uno o más chunks"""
+
+    __slots__ = ('document_id', 'filename', 'first', 'last', 'content', 'score', 'chunk_ids')
+
+    def __init__(self, result: Dict, position: Optional[int], score: float):
+        self.document_id = result.get('document_id')
+        self.filename = result.get('filename', '')
+        self.first = position
+        self.last = position
+        self.content = result.get('content') or result.get('chunk_text') or ''
+        self.score = score
+        self.chunk_ids = [result.get('chunk_id')]
+
+    def extend(self, other: 'Passage', max_overlap: int):
+        """Agregar el pasaje siguiente quitando el texto solapado"""
+        cut = overlap_length(self.content, other.content, max_overlap)
+        self.content += other.content[cut:] if cut else "\n" + other.content
+        self.last = other.last
+        self.score = max(self.score, other.score)
+        self.chunk_ids.extend(other.chunk_ids)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.content)
+
+
+def merge_passages(
+    results: Sequence[Dict],
+    score_field: str = "score",
+    max_overlap: int = 200
+) -> List[Passage]:
+    """
+    Unir chunks consecutivos del mismo documento y quitar tramos repetidos
+
+    Returns:
+        Pasajes de mayor a menor puntaje
+    """
+    by_document: Dict[str, List[Tuple[Optional[int], Passage]]] = {}
+    for result in results:
+        score = float(result.get(score_field, result.get('@search.score', 0.0)) or 0.0)
+        position = chunk_position(result)
+        passage = Passage(result, position, score)
+        by_document.setdefault(passage.document_id or passage.filename, []).append((position, passage))
+
+    passages: List[Passage] = []
+    for items in by_document.values():
+        items.sort(key=lambda item: (item[0] is None, item[0] or 0))
+        current: Optional[Passage] = None
+        for position, passage in items:
+            if current is not None and position is not None and current.last is not None:
+                if position == current.last:
+                    # El mismo chunk llegó dos veces (p. ej. temporal + indexado)
+                    current.score = max(current.score, passage.score)
+                    continue
+                if position == current.last + 1:
+                    current.extend(passage, max_overlap)
+                    continue
+            if current is not None:
+                passages.append(current)
+            current = passage
+        if current is not None:
+            passages.append(current)
+
+    # Tramos idénticos o contenidos en otro pasaje (copias del mismo texto en varios documentos)
+    passages.sort(key=lambda p: (-p.score, -len(p.content)))
+    unique: List[Passage] = []
+    seen = set()
+    for passage in passages:
+        key = _span_key(passage.content)
+        if key in seen:
+            continue
+        normalized = ' '.join(passage.content.lower().split())
+        if any(normalized in ' '.join(kept.content.lower().split()) for kept in unique
+               if len(kept.content) >= len(passage.content)):
+            continue
+        seen.add(key)
+        unique.append(passage)
+    return unique
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Recortar al presupuesto terminando en fin de oración si es posible"""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(cut)]
+    if ends and ends[-1] > limit // 2:
+        cut = cut[:ends[-1]]
+    return cut.rstrip() + " …"
+
+
+def build_context(
+    results: Sequence[Dict],
+    budget: Optional[int] = None,
+    score_field: str = "score",
+    min_passage_tokens: int = 40
+) -> Dict:
+    """
+    Construir el contexto del prompt
+
+    Args:
+        results: Resultados de búsqueda (content, document_id, filename, chunk_id/chunk_index, score)
+        budget: Tokens máximos del contexto (por defecto context_budget())
+        score_field: Campo con la relevancia
+        min_passage_tokens: Un pasaje recortado más corto que esto no se incluye
+
+    Returns:
+        {"context", "sources", "context_tokens", "naive_tokens", "tokens_saved",
+         "passages", "truncated"}
+    """
+    budget = context_budget() if budget is None else budget
+    naive = SOURCE_SEPARATOR.join(
+        SOURCE_TEMPLATE.format(n=i + 1, filename=r.get('filename', ''), content=r.get('content', ''))
+        for i, r in enumerate(results)
+    )
+
+    parts: List[str] = []
+    sources: List[Dict] = []
+    used = 0
+    truncated = 0
+    for passage in merge_passages(results, score_field=score_field):
+        header = SOURCE_TEMPLATE.format(n=len(parts) + 1, filename=passage.filename, content='')
+        overhead = estimate_tokens(header + SOURCE_SEPARATOR)
+        remaining = budget - used - overhead
+        if remaining < min_passage_tokens:
+            break
+        content = passage.content
+        if passage.tokens > remaining:
+            content = _truncate(content, remaining)
+            truncated += 1
+        parts.append(SOURCE_TEMPLATE.format(n=len(parts) + 1, filename=passage.filename, content=content))
+        used += estimate_tokens(content) + overhead
+        sources.append({
+            'document_id': passage.document_id,
+            'filename': passage.filename,
+            'score': passage.score,
+            'chunk_ids': passage.chunk_ids
+        })
+
+    context = SOURCE_SEPARATOR.join(parts)
+    context_tokens = estimate_tokens(context) if context else 0
+    naive_tokens = estimate_tokens(naive) if naive else 0
+    return {
+        'context': context,
+        'sources': sources,
+        'context_tokens': context_tokens,
+        'naive_tokens': naive_tokens,
+        'tokens_saved': max(0, naive_tokens - context_tokens),
+        'passages': len(parts),
+        'truncated': truncated
+    }
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark(n_queries: int = 200, results_per_query: int = 10, chunk_size: int = 500, overlap: int = 50) -> Dict:
+    """
+    Tokens de prompt: concatenación ingenua vs contexto empacado
+
+    Simula búsquedas donde varios resultados son vecinos del mismo documento
+    (el caso típico con chunks solapados) y algunos documentos son copias
+    de otros.
+    """
+    import random
+
+    rng = random.Random(4)
+    words = [f"palabra{i}" for i in range(3000)]
+    documents = {}
+    texts = []
+    for d in range(50):
+        # Uno de cada cinco documentos es una copia (plantillas de contrato repetidas)
+        if texts and d % 5 == 4:
+            text = texts[d - 1]
+        else:
+            text = ' '.join(rng.choice(words) for _ in range(1200)) + '.'
+        texts.append(text)
+        chunks, start = [], 0
+        while start < len(text):
+            end = min(start + chunk_size, len(text))
+            chunks.append(text[start:end])
+            if end == len(text):
+                break
+            start = end - overlap
+        documents[f'doc_{d}'] = chunks
+
+    naive_total = packed_total = 0
+    budget = context_budget()
+    for _ in range(n_queries):
+        results = []
+        for _ in range(results_per_query // 3 + 1):
+            document_id = rng.choice(list(documents))
+            chunks = documents[document_id]
+            first = rng.randrange(len(chunks) - 2)
+            for position in range(first, first + 3):
+                results.append({
+                    'chunk_id': f'{document_id}_chunk_{position}',
+                    'document_id': document_id,
+                    'filename': f'{document_id}.pdf',
+                    'content': chunks[position],
+                    'score': rng.random()
+                })
+        results = results[:results_per_query]
+        built = build_context(results, budget=budget)
+        naive_total += built['naive_tokens']
+        packed_total += built['context_tokens']
+
+    return {
+        'queries': n_queries,
+        'budget': budget,
+        'naive_tokens': naive_total / n_queries,
+        'packed_tokens': packed_total / n_queries,
+        'saved_pct': (1 - packed_total / naive_total) * 100 if naive_total else 0.0
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        results = benchmark()
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK CONTEXTO ({results['queries']:,} consultas, presupuesto {results['budget']:,} tokens)")
+        print("="*80)
+        print(f"\n📄 Concatenación de resultados: {results['naive_tokens']:,.0f} tokens/prompt")
+        print(f"📦 Contexto empacado: {results['packed_tokens']:,.0f} tokens/prompt")
+        print(f"   └─ Ahorro: {results['saved_pct']:.1f}%")
+        print("\n" + "="*80 + "\n")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/context_builder.py --benchmark\n")
@@ -0,0 +1,269 @@
+"""
+Embedding Cache - Caché persistente de embeddings por contenido y modelo
+Evita volver a calcular embeddings de cláusulas repetidas, preguntas frecuentes
+y documentos temporales que se suben más de una vez
+"""
+
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+# Formatos de almacenamiento: código struct y bytes por componente
+STORAGE_FORMATS = {
+    'float32': ('f', 4),
+    'float16': ('e', 2)
+}
+
+
+def normalize_text(text: str) -> str:
+    """Normalizar texto para la llave del caché (NFC + espacios colapsados)"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 del texto normalizado"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Caché de embeddings en SQLite con desalojo LRU y límite de tamaño
+
+    La llave es (hash del texto normalizado, deployment, dimensión), de modo
+    que cambiar de modelo nunca devuelve vectores incompatibles. Los vectores
+    se guardan como BLOB en float16 (la mitad de espacio) o float32.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/embeddings.sqlite",
+        max_bytes: int = 512 * 1024 * 1024,
+        storage: str = "float16"
+    ):
+        """
+        Inicializar el caché
+
+        Args:
+            path: Ruta del archivo SQLite (":memory:" para caché volátil)
+            max_bytes: Tamaño máximo de los vectores almacenados
+            storage: Formato de almacenamiento ('float16' o 'float32')
+        """
+        if storage not in STORAGE_FORMATS:
+            raise ValueError(f"Formato no soportado: {storage}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.storage = storage
+        self._code, self._width = STORAGE_FORMATS[storage]
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                text_hash TEXT NOT NULL,
+                deployment TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                storage TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (text_hash, deployment, dimensions)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings(last_access)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings"
+        ).fetchone()[0]
+
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'puts': 0,
+            'evictions': 0,
+            'bytes_saved': 0,
+            'tokens_saved': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Codificación
+    # ------------------------------------------------------------------
+
+    def _encode(self, vector: Sequence[float]) -> bytes:
+        if self._code == 'f':
+            return array('f', vector).tobytes()
+        return struct.pack(f'<{len(vector)}e', *vector)
+
+    @staticmethod
+    def _decode(blob: bytes, storage: str) -> List[float]:
+        code, width = STORAGE_FORMATS[storage]
+        if code == 'f':
+            return array('f', blob).tolist()
+        return list(struct.unpack(f'<{len(blob) // width}e', blob))
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def get(self, text: str, deployment: str, dimensions: int) -> Optional[List[float]]:
+        """
+        Buscar el embedding de un texto
+
+        Returns:
+            Vector como lista de floats, o None si no está en caché
+        """
+        return self.get_many([text], deployment, dimensions)[0]
+
+    def get_many(
+        self,
+        texts: Sequence[str],
+        deployment: str,
+        dimensions: int
+    ) -> List[Optional[List[float]]]:
+        """Buscar varios textos en una sola transacción (None = miss)"""
+        keys = [text_hash(text) for text in texts]
+        now = time.time()
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for key, text in zip(keys, texts):
+                row = self._conn.execute(
+                    "SELECT vector, storage FROM embeddings "
+                    "WHERE text_hash = ? AND deployment = ? AND dimensions = ?",
+                    (key, deployment, dimensions)
+                ).fetchone()
+                if row is None:
+                    self._stats['misses'] += 1
+                    results.append(None)
+                    continue
+                self._stats['hits'] += 1
+                # Lo que se habría descargado del API: float32 por componente
+                self._stats['bytes_saved'] += dimensions * 4
+                self._stats['tokens_saved'] += max(1, (len(text) + 3) // 4)
+                results.append(self._decode(row[0], row[1]))
+                self._conn.execute(
+                    "UPDATE embeddings SET last_access = ? "
+                    "WHERE text_hash = ? AND deployment = ? AND dimensions = ?",
+                    (now, key, deployment, dimensions)
+                )
+            self._conn.commit()
+        return results
+
+    def put(self, text: str, deployment: str, vector: Sequence[float], dimensions: Optional[int] = None):
+        """Guardar un embedding"""
+        self.put_many([text], deployment, [vector], dimensions)
+
+    def put_many(
+        self,
+        texts: Sequence[str],
+        deployment: str,
+        vectors: Sequence[Sequence[float]],
+        dimensions: Optional[int] = None
+    ):
+        """
+        Guardar varios embeddings y desalojar por LRU si se excede el límite
+
+        Args:
+            dimensions: Dimensión con la que se consultará (la de get); un vector
+                de otra longitud no se podría volver a encontrar y se rechaza
+        """
+        if dimensions is not None:
+            for vector in vectors:
+                if len(vector) != dimensions:
+                    raise ValueError(f"El vector tiene {len(vector)} dimensiones y se esperaban {dimensions}")
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                blob = self._encode(vector)
+                previous = self._conn.execute(
+                    "SELECT nbytes FROM embeddings "
+                    "WHERE text_hash = ? AND deployment = ? AND dimensions = ?",
+                    (key, deployment, len(vector))
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings "
+                    "(text_hash, deployment, dimensions, storage, vector, nbytes, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, deployment, len(vector), self.storage, blob, len(blob), now)
+                )
+                self._size += len(blob) - (previous[0] if previous else 0)
+                self._stats['puts'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT rowid, nbytes FROM embeddings ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for rowid, nbytes in rows:
+                if self._size <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM embeddings WHERE rowid = ?", (rowid,))
+                self._size -= nbytes
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """Eliminar todas las entradas"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        """Obtener hit rate, bytes ahorrados y ocupación del caché"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+            stats['size_bytes'] = self._size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def print_stats(self):
+        """Imprimir resumen del caché"""
+        stats = self.get_stats()
+        print(f"\n📦 Caché de embeddings ({self.storage})")
+        print(f"   └─ Entradas: {stats['entries']:,} ({stats['size_bytes']/1024/1024:.1f} MB)")
+        print(f"   └─ Hit rate: {stats['hit_rate']*100:.1f}% "
+              f"({stats['hits']:,} hits / {stats['misses']:,} misses)")
+        print(f"   └─ Bytes ahorrados: {stats['bytes_saved']/1024/1024:.1f} MB")
+        print(f"   └─ Tokens ahorrados: {stats['tokens_saved']:,}")
+        print(f"   └─ Desalojos: {stats['evictions']:,}")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--stats':
+        cache_path = sys.argv[2] if len(sys.argv) > 2 else ".cache/embeddings.sqlite"
+        cache = EmbeddingCache(cache_path)
+        cache.print_stats()
+        cache.close()
+    else:
+        print("\nUso:")
+        print("  python3 scripts/embedding_cache.py --stats [ruta_cache.sqlite]\n")
@@ -0,0 +1,698 @@
+"""
+Embedding Scheduler - Agrupación de embeddings con control de rate limits
+Combina textos de múltiples documentos y consultas en lotes máximos para
+Azure OpenAI, respetando los presupuestos de TPM/RPM del deployment
+"""
+
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_indexer import parse_retry_after
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimar tokens de un texto (~4 caracteres por token para cl100k)
+
+    Se usa solo para presupuestar TPM y armar lotes; no necesita ser exacto.
+    """
+    return max(1, (len(text) + 3) // 4)
+
+
+class TokenBucket:
+    """Token bucket thread-safe con capacidad expresada por minuto"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0):
+        """
+        Bloquear hasta que haya `amount` tokens disponibles y consumirlos
+
+        Args:
+            amount: Tokens a consumir (se limita a la capacidad del bucket)
+        """
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self):
+        """Vaciar el bucket (p. ej. después de recibir un 429)"""
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+
+class _PendingText:
+    __slots__ = ('text', 'tokens', 'future')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.future = Future()
+
+
+_FLUSH = object()
+_STOP = object()
+
+
+class EmbeddingScheduler:
+    """
+    Planificador de embeddings con batching y rate limiting
+
+    Los textos enviados con `submit()` o `embed()` desde cualquier hilo se
+    acumulan en una cola y se despachan en lotes tan grandes como permitan
+    `max_batch_size` y `max_batch_tokens`. Cada request consume 1 token del
+    bucket RPM y los tokens estimados del lote en el bucket TPM. Los 429 se
+    reintentan respetando `Retry-After`.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        deployment: str = "text-embedding-ada-002",
+        api_version: str = "2023-05-15",
+        tpm_limit: int = 240_000,
+        rpm_limit: int = 1_440,
+        max_batch_size: int = 16,
+        max_batch_tokens: int = 8_191 * 16,
+        max_in_flight: int = 4,
+        max_retries: int = 6,
+        flush_interval: float = 0.05,
+        timeout: int = 60,
+        dimensions: int = 1536,
+        cache=None
+    ):
+        """
+        Inicializar el planificador
+
+        Args:
+            endpoint: Endpoint de Azure OpenAI (ej: https://<recurso>.openai.azure.com)
+            api_key: API Key de Azure OpenAI
+            deployment: Nombre del deployment de embeddings
+            api_version: Versión del API de Azure OpenAI
+            tpm_limit: Presupuesto de tokens por minuto del deployment
+            rpm_limit: Presupuesto de requests por minuto del deployment
+            max_batch_size: Máximo de textos por request
+            max_batch_tokens: Máximo de tokens estimados por request
+            max_in_flight: Lotes enviados en paralelo
+            max_retries: Reintentos ante 429/5xx antes de fallar
+            flush_interval: Segundos que se espera a completar un lote parcial
+            timeout: Timeout HTTP por request
+            dimensions: Dimensión de los vectores del deployment
+            cache: EmbeddingCache opcional que se consulta antes de encolar
+        """
+        self.url = (
+            f"{endpoint.rstrip('/')}/openai/deployments/{deployment}"
+            f"/embeddings?api-version={api_version}"
+        )
+        self.deployment = deployment
+        self.headers = {
+            'api-key': api_key,
+            'Content-Type': 'application/json'
+        }
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.dimensions = dimensions
+        self.cache = cache
+
+        self._tpm = TokenBucket(tpm_limit)
+        self._rpm = TokenBucket(rpm_limit)
+        self._cooldown_until = 0.0
+        self._cooldown_lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._session = requests.Session()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'texts': 0,
+            'batches': 0,
+            'requests': 0,
+            'tokens': 0,
+            'throttled': 0,
+            'retries': 0,
+            'failed_batches': 0
+        }
+
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'EmbeddingScheduler':
+        """Crear el planificador a partir de las variables de config_template.env"""
+        options = {
+            'endpoint': os.getenv('AZURE_OPENAI_ENDPOINT', ''),
+            'api_key': os.getenv('AZURE_OPENAI_KEY', ''),
+            'deployment': os.getenv('AZURE_OPENAI_EMBEDDING_DEPLOYMENT', 'text-embedding-ada-002'),
+            'api_version': os.getenv('AZURE_OPENAI_API_VERSION', '2023-05-15'),
+            'tpm_limit': int(os.getenv('EMBEDDING_TPM_LIMIT', '240000')),
+            'rpm_limit': int(os.getenv('EMBEDDING_RPM_LIMIT', '1440')),
+            'max_batch_size': int(os.getenv('EMBEDDING_MAX_BATCH_SIZE', '16')),
+            'max_in_flight': int(os.getenv('EMBEDDING_MAX_IN_FLIGHT', '4')),
+            'dimensions': int(os.getenv('EMBEDDING_DIMENSIONS', '1536'))
+        }
+        if os.getenv('EMBEDDING_CACHE_PATH'):
+            sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+            from embedding_cache import EmbeddingCache
+            options['cache'] = EmbeddingCache(
+                os.getenv('EMBEDDING_CACHE_PATH'),
+                max_bytes=int(os.getenv('EMBEDDING_CACHE_MAX_MB', '512')) * 1024 * 1024
+            )
+        options.update(overrides)
+        return cls(**options)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def submit(self, text: str) -> Future:
+        """
+        Encolar un texto para embedding
+
+        Returns:
+            Future que se resuelve con el vector (lista de floats)
+        """
+        if self._closed:
+            raise RuntimeError("El planificador está cerrado")
+        if self.cache is not None:
+            cached = self.cache.get(text, self.deployment, self.dimensions)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                return future
+        pending = _PendingText(text)
+        if self.cache is not None:
+            pending.future.add_done_callback(
+                lambda future, text=text: self._store_in_cache(text, future)
+            )
+        self._queue.put(pending)
+        return pending.future
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Obtener embeddings de una lista de textos, en el mismo orden
+
+        Los textos se agrupan con los de otras llamadas concurrentes.
+        """
+        futures = {text: self.submit(text) for text in dict.fromkeys(texts)}
+        self.flush()
+        return [futures[text].result() for text in texts]
+
+    def _store_in_cache(self, text: str, future: Future):
+        if future.exception() is None:
+            self.cache.put(text, self.deployment, future.result(), self.dimensions)
+
+    def flush(self):
+        """Despachar inmediatamente el lote parcial acumulado"""
+        self._queue.put(_FLUSH)
+
+    def close(self):
+        """Despachar lo pendiente, esperar los lotes en vuelo y cerrar"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_stats(self) -> Dict:
+        """Obtener contadores de uso del planificador"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['avg_batch_size'] = (
+            stats['texts'] / stats['batches'] if stats['batches'] else 0.0
+        )
+        return stats
+
+    # ------------------------------------------------------------------
+    # Despacho
+    # ------------------------------------------------------------------
+
+    def _dispatch_loop(self):
+        batch: List[_PendingText] = []
+        batch_tokens = 0
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+
+            if item is _STOP:
+                if batch:
+                    self._dispatch(batch)
+                return
+
+            if item is _FLUSH:
+                if batch:
+                    self._dispatch(batch)
+                batch, batch_tokens, deadline = [], 0, None
+                continue
+
+            if batch and (
+                len(batch) >= self.max_batch_size
+                or batch_tokens + item.tokens > self.max_batch_tokens
+            ):
+                self._dispatch(batch)
+                batch, batch_tokens, deadline = [], 0, None
+
+            batch.append(item)
+            batch_tokens += item.tokens
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _dispatch(self, batch: List[_PendingText]):
+        # Bloquear aquí aplica backpressure: mientras no haya cupo, los
+        # textos nuevos siguen acumulándose en la cola y forman lotes llenos
+        self._slots.acquire()
+        future = self._executor.submit(self._send_batch, batch)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _wait_budget(self, tokens: int):
+        while True:
+            with self._cooldown_lock:
+                wait = self._cooldown_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self._rpm.acquire(1)
+        self._tpm.acquire(tokens)
+
+    def _set_cooldown(self, seconds: float):
+        with self._cooldown_lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+    @staticmethod
+    def _retry_after(response: requests.Response, attempt: int) -> float:
+        header_ms = response.headers.get('retry-after-ms')
+        if header_ms:
+            try:
+                return float(header_ms) / 1000.0
+            except ValueError:
+                pass
+        wait = parse_retry_after(response.headers.get('Retry-After'))
+        if wait is not None:
+            return wait
+        return min(60.0, (2 ** attempt) + random.random())
+
+    def _send_batch(self, batch: List[_PendingText]):
+        tokens = sum(item.tokens for item in batch)
+        payload = {'input': [item.text for item in batch]}
+
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['texts'] += len(batch)
+            self._stats['tokens'] += tokens
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._wait_budget(tokens)
+                with self._stats_lock:
+                    self._stats['requests'] += 1
+
+                try:
+                    response = self._session.post(
+                        self.url,
+                        headers=self.headers,
+                        json=payload,
+                        timeout=self.timeout
+                    )
+                except requests.exceptions.RequestException:
+                    if attempt == self.max_retries:
+                        raise
+                    with self._stats_lock:
+                        self._stats['retries'] += 1
+                    time.sleep(min(60.0, (2 ** attempt) + random.random()))
+                    continue
+
+                if response.status_code == 429 or response.status_code >= 500:
+                    if attempt == self.max_retries:
+                        response.raise_for_status()
+                    wait = self._retry_after(response, attempt)
+                    with self._stats_lock:
+                        self._stats['retries'] += 1
+                        if response.status_code == 429:
+                            self._stats['throttled'] += 1
+                    if response.status_code == 429:
+                        # El servidor ya agotó la cuota: pausar a todos los workers
+                        self._set_cooldown(wait)
+                        self._tpm.drain()
+                    time.sleep(wait)
+                    continue
+
+                response.raise_for_status()
+                rows = {row['index']: row['embedding'] for row in response.json()['data']}
+                for position, item in enumerate(batch):
+                    embedding = rows.get(position)
+                    if embedding is None:
+                        # Sin esto el future nunca se resuelve y embed() queda colgado
+                        item.future.set_exception(ValueError(
+                            f"El deployment devolvió {len(rows)} embeddings para "
+                            f"un lote de {len(batch)} textos"
+                        ))
+                    elif len(embedding) != self.dimensions:
+                        # Vectores de otra dimensión romperían el índice y la caché
+                        item.future.set_exception(ValueError(
+                            f"El deployment devolvió {len(embedding)} dimensiones y se "
+                            f"esperaban {self.dimensions} (EMBEDDING_DIMENSIONS)"
+                        ))
+                    else:
+                        item.future.set_result(embedding)
+                return
+
+        except Exception as e:
+            with self._stats_lock:
+                self._stats['failed_batches'] += 1
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+
+# ============================================================================
+# SERVIDOR FAKE DE EMBEDDINGS (pruebas locales)
+# ============================================================================
+
+def fake_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """Embedding determinístico y normalizado derivado del hash del texto"""
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeEmbeddingServer:
+    """
+    Servidor HTTP local que imita el endpoint de embeddings de Azure OpenAI
+
+    Permite simular throttling: cada `throttle_every` requests responde 429
+    con `Retry-After`. Registra el tamaño de cada lote recibido.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: float = 0.1,
+        max_batch_size: int = 2048
+    ):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.max_batch_size = max_batch_size
+        self.batch_sizes: List[int] = []
+        self.throttled = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+        path_re = re.compile(r'^/openai/deployments/[^/]+/embeddings')
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: Dict, headers: Optional[Dict] = None):
+                raw = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_POST(self):
+                if not path_re.match(self.path):
+                    self._reply(404, {'error': {'message': 'not found'}})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                texts = body.get('input', [])
+                if isinstance(texts, str):
+                    texts = [texts]
+
+                with server._lock:
+                    server._count += 1
+                    throttle = server.throttle_every and server._count % server.throttle_every == 0
+                    if throttle:
+                        server.throttled += 1
+                if throttle:
+                    self._reply(
+                        429,
+                        {'error': {'code': '429', 'message': 'Rate limit exceeded'}},
+                        {'Retry-After': str(server.retry_after)}
+                    )
+                    return
+                if len(texts) > server.max_batch_size:
+                    self._reply(400, {'error': {'message': 'Too many inputs'}})
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    server.batch_sizes.append(len(texts))
+
+                data = [
+                    {'object': 'embedding', 'index': i,
+                     'embedding': fake_embedding(text, server.dimensions)}
+                    for i, text in enumerate(texts)
+                ]
+                tokens = sum(estimate_tokens(text) for text in texts)
+                self._reply(200, {
+                    'object': 'list',
+                    'data': data,
+                    'model': 'text-embedding-ada-002',
+                    'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+                })
+
+        return Handler
+
+    def start(self) -> 'FakeEmbeddingServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def serve(scheduler: EmbeddingScheduler, host: str = "127.0.0.1", port: int = 8766) -> ThreadingHTTPServer:
+    """
+    Exponer el planificador (con su caché) con la ruta de embeddings de Azure OpenAI
+
+    - POST /openai/deployments/{deployment}/embeddings
+    - GET /stats: contadores del planificador y hit rate / bytes ahorrados del caché
+
+    Los workflows de n8n usan EMBEDDING_PROXY_URL en lugar de AZURE_OPENAI_ENDPOINT
+    cuando está definida, así que la ingesta, las consultas y los documentos
+    temporales pasan por el mismo caché y los mismos presupuestos TPM/RPM. Se
+    exige el mismo api-key que el deployment real.
+    """
+    route = re.compile(r'^/openai/deployments/([^/?]+)/embeddings')
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: Dict):
+            raw = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path != '/stats':
+                self._reply(404, {'error': {'message': 'Ruta no encontrada'}})
+                return
+            stats = {'scheduler': scheduler.get_stats()}
+            if scheduler.cache is not None:
+                stats['cache'] = scheduler.cache.get_stats()
+            self._reply(200, stats)
+
+        def do_POST(self):
+            match = route.match(self.path)
+            length = int(self.headers.get('Content-Length', 0))
+            payload = self.rfile.read(length)
+            if not match or match.group(1) != scheduler.deployment:
+                self._reply(404, {'error': {'message': f"Deployment no servido: {scheduler.deployment}"}})
+                return
+            if self.headers.get('api-key') != scheduler.headers['api-key']:
+                self._reply(401, {'error': {'code': '401', 'message': 'api-key inválida'}})
+                return
+            try:
+                texts = json.loads(payload or b'{}').get('input', [])
+                texts = [texts] if isinstance(texts, str) else list(texts)
+                vectors = scheduler.embed(texts)
+            except ValueError as e:
+                self._reply(400, {'error': {'message': str(e)}})
+                return
+            except Exception as e:
+                self._reply(502, {'error': {'message': f"Azure OpenAI: {e}"[:500]}})
+                return
+            tokens = sum(estimate_tokens(text) for text in texts)
+            self._reply(200, {
+                'object': 'list',
+                'data': [{'object': 'embedding', 'index': i, 'embedding': vector}
+                         for i, vector in enumerate(vectors)],
+                'model': scheduler.deployment,
+                'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+            })
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == '--embed':
+        # Embeber un archivo (un texto por línea) con la configuración real y
+        # el caché de EMBEDDING_CACHE_PATH; salida JSON Lines {"text", "embedding"}
+        if len(args) < 2:
+            print("\nUso: python3 scripts/embedding_scheduler.py --embed <textos.txt> [salida.jsonl]\n")
+            sys.exit(1)
+        with open(args[1], 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        start = time.time()
+        with EmbeddingScheduler.from_env() as scheduler:
+            vectors = scheduler.embed(texts)
+        elapsed = time.time() - start
+        if len(args) > 2:
+            with open(args[2], 'w', encoding='utf-8') as f:
+                for text, vector in zip(texts, vectors):
+                    f.write(json.dumps({'text': text, 'embedding': vector}, ensure_ascii=False) + '\n')
+        stats = scheduler.get_stats()
+        print(f"\n✅ {len(vectors)} embeddings en {elapsed:.2f}s "
+              f"({stats['requests']} requests, {stats['texts']} textos enviados al API)")
+        if scheduler.cache is not None:
+            scheduler.cache.print_stats()
+            scheduler.cache.close()
+        print()
+        sys.exit(0)
+
+    if args and args[0] == '--serve':
+        # Proxy con caché para los workflows de n8n (EMBEDDING_PROXY_URL)
+        port = int(args[1]) if len(args) > 1 else 8766
+        os.environ.setdefault('EMBEDDING_CACHE_PATH', '.cache/embeddings.sqlite')
+        scheduler = EmbeddingScheduler.from_env()
+        host = os.getenv('EMBEDDING_PROXY_HOST', '127.0.0.1')
+        srv = serve(scheduler, host=host, port=port)
+        print(f"🧮 Proxy de embeddings ({scheduler.deployment}) en http://{host}:{port}")
+        print(f"   Caché: {scheduler.cache.path}")
+        print("   Apunta EMBEDDING_PROXY_URL a esa URL. Ctrl-C para salir.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.shutdown()
+            scheduler.close()
+            stats = scheduler.get_stats()
+            print(f"\n✅ {stats['requests']} requests al API ({stats['texts']} textos)")
+            scheduler.cache.print_stats()
+            scheduler.cache.close()
+            print()
+        sys.exit(0)
+
+    from embedding_cache import EmbeddingCache
+
+    print("\n" + "="*80)
+    print("🧮 DEMO DEL PLANIFICADOR DE EMBEDDINGS (servidor fake local)")
+    print("="*80)
+
+    texts = [f"Cláusula {i}: condiciones del producto CDT número {i}" for i in range(500)]
+
+    with FakeEmbeddingServer(dimensions=64, latency=0.02, throttle_every=7) as server:
+        cache = EmbeddingCache(":memory:")
+        for label in ("Primera pasada", "Segunda pasada (desde caché)"):
+            scheduler = EmbeddingScheduler(
+                endpoint=server.url,
+                api_key="fake",
+                max_batch_size=64,
+                max_in_flight=4,
+                rpm_limit=6_000,
+                dimensions=64,
+                cache=cache
+            )
+            start = time.time()
+            with scheduler:
+                vectors = scheduler.embed(texts)
+            elapsed = time.time() - start
+
+            stats = scheduler.get_stats()
+            print(f"\n✅ {label}: {len(vectors)} embeddings en {elapsed:.2f}s")
+            print(f"   └─ Lotes: {stats['batches']} (promedio {stats['avg_batch_size']:.1f} textos)")
+            print(f"   └─ Requests: {stats['requests']}")
+            print(f"   └─ 429 reintentados: {stats['throttled']}")
+            print(f"   └─ Tokens estimados: {stats['tokens']:,}")
+        cache.print_stats()
+    print("\n" + "="*80 + "\n")
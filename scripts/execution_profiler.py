@@ -0,0 +1,342 @@
+"""
+Execution Profiler - Perfil de tiempos por nodo de las ejecuciones de n8n
+Descarga las ejecuciones de un workflow en una ventana de tiempo (con runData),
+calcula la distribución de duración, items y tamaño de salida de cada nodo,
+identifica la ruta crítica y exporta el perfil a JSON para comparar despliegues
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from n8n_manager import N8nManager, _parse_timestamp
+
+PROFILE_VERSION = 1
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _run_data(execution: Dict) -> Dict[str, List[Dict]]:
+    return ((execution.get('data') or {}).get('resultData') or {}).get('runData') or {}
+
+
+def _output_items(run: Dict) -> int:
+    outputs = (run.get('data') or {}).get('main') or []
+    return sum(len(output or []) for output in outputs)
+
+
+def _payload_bytes(run: Dict) -> int:
+    data = run.get('data')
+    if not data:
+        return 0
+    return len(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def critical_path(run_data: Dict[str, List[Dict]]) -> List[str]:
+    """
+    Cadena de nodos que determina la duración de la ejecución
+
+    Parte del nodo que terminó último y retrocede por `source.previousNode`
+    eligiendo siempre el predecesor que terminó más tarde. Si n8n no registró
+    los predecesores, la ejecución fue secuencial y la ruta son todos los nodos
+    en orden de inicio.
+    """
+    finish: Dict[str, float] = {}
+    predecessors: Dict[str, set] = {}
+    for name, runs in run_data.items():
+        finish[name] = max((r.get('startTime', 0) + r.get('executionTime', 0)) for r in runs) if runs else 0
+        predecessors[name] = {
+            source.get('previousNode')
+            for run in runs
+            for source in (run.get('source') or [])
+            if source and source.get('previousNode') in run_data
+        }
+    if not finish:
+        return []
+    if not any(predecessors.values()):
+        return sorted(run_data, key=lambda name: min(r.get('startTime', 0) for r in run_data[name]) if run_data[name] else 0)
+
+    path = [max(finish, key=finish.get)]
+    visited = set(path)
+    while True:
+        candidates = predecessors[path[-1]] - visited
+        if not candidates:
+            break
+        previous = max(candidates, key=finish.get)
+        path.append(previous)
+        visited.add(previous)
+    path.reverse()
+    return path
+
+
+def profile_executions(
+    manager: N8nManager,
+    workflow_id: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 200,
+    status: Optional[str] = None
+) -> Dict:
+    """
+    Perfil por nodo de las ejecuciones de un workflow
+
+    Args:
+        manager: Cliente de n8n
+        workflow_id: Workflow a perfilar
+        since / until: Ventana de tiempo (ISO-8601)
+        limit: Máximo de ejecuciones a analizar (las más recientes)
+        status: Filtrar por estado ('success', 'error')
+
+    Returns:
+        Ver build_profile
+    """
+    executions = []
+    # Con includeData cada ejecución pesa decenas de KB: páginas más chicas
+    for execution in manager.iter_executions(
+        workflow_id=workflow_id, status=status, since=since, until=until,
+        include_data=True, page_size=50
+    ):
+        executions.append(execution)
+        if len(executions) >= limit:
+            break
+    profile = build_profile(executions)
+    profile['workflow_id'] = workflow_id
+    profile['window'] = {'since': since, 'until': until}
+    return profile
+
+
+def build_profile(executions: Sequence[Dict]) -> Dict:
+    """
+    Agregar el runData de varias ejecuciones
+
+    Returns:
+        {"version", "generated_at", "executions", "total_ms": {...},
+         "nodes": {nombre: {"runs", "errors", "p50_ms", "p95_ms", "max_ms", "mean_ms",
+                            "items_mean", "bytes_mean", "critical_share", "critical_pct"}},
+         "critical_path": [nombres de la ruta crítica más frecuente]}
+    """
+    samples: Dict[str, Dict[str, list]] = {}
+    totals: List[float] = []
+    paths: Dict[Tuple[str, ...], int] = {}
+    critical_ms: Dict[str, float] = {}
+    order: Dict[str, float] = {}
+    analyzed = 0
+
+    for execution in executions:
+        run_data = _run_data(execution)
+        if not run_data:
+            continue
+        analyzed += 1
+        if execution.get('startedAt') and execution.get('stoppedAt'):
+            elapsed = _parse_timestamp(execution['stoppedAt']) - _parse_timestamp(execution['startedAt'])
+            totals.append(elapsed.total_seconds() * 1000)
+
+        first_start = min((r.get('startTime', 0) for runs in run_data.values() for r in runs), default=0)
+        durations: Dict[str, float] = {}
+        for name, runs in run_data.items():
+            node = samples.setdefault(name, {'duration': [], 'items': [], 'bytes': [], 'errors': []})
+            # Un nodo dentro de un loop corre varias veces por ejecución
+            durations[name] = sum(r.get('executionTime', 0) for r in runs)
+            node['duration'].append(durations[name])
+            node['items'].append(sum(_output_items(r) for r in runs))
+            node['bytes'].append(sum(_payload_bytes(r) for r in runs))
+            node['errors'].append(any(r.get('error') or r.get('executionStatus') == 'error' for r in runs))
+            if runs:
+                order.setdefault(name, min(r.get('startTime', 0) for r in runs) - first_start)
+
+        path = tuple(critical_path(run_data))
+        paths[path] = paths.get(path, 0) + 1
+        for name in path:
+            critical_ms[name] = critical_ms.get(name, 0.0) + durations.get(name, 0)
+
+    critical_total = sum(critical_ms.values())
+    nodes = {}
+    for name in sorted(samples, key=lambda n: order.get(n, 0)):
+        node = samples[name]
+        runs = len(node['duration'])
+        nodes[name] = {
+            'runs': runs,
+            'errors': sum(node['errors']),
+            'p50_ms': percentile(node['duration'], 50),
+            'p95_ms': percentile(node['duration'], 95),
+            'max_ms': max(node['duration']),
+            'mean_ms': sum(node['duration']) / runs,
+            'items_mean': sum(node['items']) / runs,
+            'bytes_mean': sum(node['bytes']) / runs,
+            # Fracción de las ejecuciones en que el nodo estuvo en la ruta crítica
+            'critical_share': sum(count for path, count in paths.items() if name in path) / analyzed,
+            # Fracción del tiempo de la ruta crítica que aporta el nodo
+            'critical_pct': critical_ms.get(name, 0.0) / critical_total * 100 if critical_total else 0.0
+        }
+
+    return {
+        'version': PROFILE_VERSION,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'executions': analyzed,
+        'total_ms': {
+            'p50': percentile(totals, 50),
+            'p95': percentile(totals, 95),
+            'max': max(totals) if totals else 0.0
+        },
+        'nodes': nodes,
+        'critical_path': list(max(paths, key=paths.get)) if paths else []
+    }
+
+
+def print_profile(profile: Dict, width: int = 30):
+    """Tabla por nodo con barra proporcional a su peso en la ruta crítica"""
+    print("\n" + "="*80)
+    print(f"⏱️  PERFIL DE EJECUCIONES ({profile['executions']:,} ejecuciones"
+          f"{', workflow ' + str(profile['workflow_id']) if profile.get('workflow_id') else ''})")
+    print("="*80)
+    if not profile['nodes']:
+        print("\n⚠️  No hay ejecuciones con datos de nodos en la ventana")
+        print("   (revisa que el workflow guarde los datos de ejecución)\n")
+        return
+    total = profile['total_ms']
+    print(f"\n🕐 Ejecución completa: p50 {total['p50']:,.0f} ms | p95 {total['p95']:,.0f} ms | "
+          f"máx {total['max']:,.0f} ms")
+
+    name_width = max(len(name) for name in profile['nodes'])
+    print(f"\n{'Nodo':<{name_width}} {'p50':>8} {'p95':>8} {'máx':>8} {'items':>6} {'KB':>7}  ruta crítica")
+    print("-" * (name_width + 45 + width))
+    critical = set(profile['critical_path'])
+    for name, node in profile['nodes'].items():
+        bar = "█" * round(node['critical_pct'] / 100 * width)
+        marker = "🔥" if name in critical and node['critical_pct'] >= 25 else "  "
+        errors = f" ❌{node['errors']}" if node['errors'] else ""
+        print(f"{name:<{name_width}} {node['p50_ms']:>6,.0f}ms {node['p95_ms']:>6,.0f}ms "
+              f"{node['max_ms']:>6,.0f}ms {node['items_mean']:>6.1f} {node['bytes_mean']/1024:>7.1f}  "
+              f"{marker}{bar} {node['critical_pct']:.0f}%{errors}")
+
+    print(f"\n🔥 Ruta crítica más frecuente:")
+    print("   " + " → ".join(profile['critical_path']))
+    slowest = max(profile['nodes'].items(), key=lambda item: item[1]['critical_pct'])
+    print(f"   └─ Cuello de botella: {slowest[0]} ({slowest[1]['critical_pct']:.0f}% del tiempo crítico)")
+
+
+def export_profile(profile: Dict, filepath: str):
+    """Guardar el perfil para compararlo con otro despliegue"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+    print(f"✅ Perfil exportado: {filepath}")
+
+
+def load_profile(filepath: str) -> Dict:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_profiles(baseline: Dict, current: Dict) -> Dict:
+    """
+    Diferencias por nodo entre dos perfiles
+
+    Returns:
+        {"total": {...}, "nodes": {nombre: {"p50_ms", "p95_ms", "p50_delta_pct",
+         "p95_delta_pct", "status": "new" | "removed" | "changed"}}}
+    """
+    def delta(before: float, after: float) -> Optional[float]:
+        return (after - before) / before * 100 if before else None
+
+    nodes = {}
+    for name in list(baseline['nodes']) + [n for n in current['nodes'] if n not in baseline['nodes']]:
+        before = baseline['nodes'].get(name)
+        after = current['nodes'].get(name)
+        if before is None:
+            nodes[name] = {'status': 'new', 'p50_ms': after['p50_ms'], 'p95_ms': after['p95_ms']}
+        elif after is None:
+            nodes[name] = {'status': 'removed', 'p50_ms': before['p50_ms'], 'p95_ms': before['p95_ms']}
+        else:
+            nodes[name] = {
+                'status': 'changed',
+                'p50_ms': after['p50_ms'],
+                'p95_ms': after['p95_ms'],
+                'p50_delta_pct': delta(before['p50_ms'], after['p50_ms']),
+                'p95_delta_pct': delta(before['p95_ms'], after['p95_ms'])
+            }
+    return {
+        'total': {
+            'p50_delta_pct': delta(baseline['total_ms']['p50'], current['total_ms']['p50']),
+            'p95_delta_pct': delta(baseline['total_ms']['p95'], current['total_ms']['p95'])
+        },
+        'nodes': nodes
+    }
+
+
+def print_comparison(comparison: Dict, threshold_pct: float = 10.0):
+    """Imprimir la comparación marcando cambios mayores a threshold_pct"""
+    def fmt(value: Optional[float]) -> str:
+        if value is None:
+            return "   n/a"
+        icon = "🔺" if value > threshold_pct else "🔻" if value < -threshold_pct else "  "
+        return f"{icon}{value:+.0f}%".strip()
+
+    print(f"\n📊 Comparación con el perfil base")
+    print(f"   └─ Ejecución completa: p50 {fmt(comparison['total']['p50_delta_pct'])} | "
+          f"p95 {fmt(comparison['total']['p95_delta_pct'])}")
+    for name, node in comparison['nodes'].items():
+        if node['status'] == 'new':
+            print(f"   🆕 {name}: p50 {node['p50_ms']:,.0f} ms")
+        elif node['status'] == 'removed':
+            print(f"   🗑️  {name}: ya no se ejecuta")
+        else:
+            print(f"   {name}: p50 {node['p50_ms']:,.0f} ms {fmt(node['p50_delta_pct'])} | "
+                  f"p95 {node['p95_ms']:,.0f} ms {fmt(node['p95_delta_pct'])}")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+def _option(args: List[str], flag: str) -> Optional[str]:
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == '--diff':
+        print_comparison(compare_profiles(load_profile(args[1]), load_profile(args[2])))
+        print()
+        sys.exit(0)
+    if not args or args[0].startswith('--'):
+        print("\nUso:")
+        print("  python3 scripts/execution_profiler.py <workflow_id> [--since ISO] [--until ISO]")
+        print("         [--limit N] [--export perfil.json] [--compare base.json]")
+        print("  python3 scripts/execution_profiler.py --diff base.json actual.json\n")
+        sys.exit(1)
+
+    n8n_url = os.getenv('N8N_URL', "http://159.203.149.247:5678")
+    api_key = os.getenv('N8N_API_KEY', '')
+    if not api_key:
+        print("\n❌ Define N8N_API_KEY (y opcionalmente N8N_URL)\n")
+        sys.exit(1)
+
+    manager = N8nManager(n8n_url, api_key)
+    profile = manager.profile_workflow(
+        args[0],
+        since=_option(args, '--since'),
+        until=_option(args, '--until'),
+        limit=int(_option(args, '--limit') or 200)
+    )
+    print_profile(profile)
+    if _option(args, '--compare'):
+        print_comparison(compare_profiles(load_profile(_option(args, '--compare')), profile))
+    if _option(args, '--export'):
+        print()
+        export_profile(profile, _option(args, '--export'))
+    print()
@@ -0,0 +1,441 @@
+"""
+Execution Store - Historial local de ejecuciones de n8n en SQLite
+Sincroniza de forma incremental los resúmenes de /api/v1/executions (solo las
+ejecuciones nuevas desde la última sincronización) y responde consultas
+agregadas (throughput por minuto, percentiles de latencia, tasa de error por
+workflow y hora) sin volver a consultar el API de n8n
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from n8n_manager import N8nManager, _parse_timestamp
+
+# Estados que todavía pueden cambiar: se vuelven a descargar en la próxima sincronización
+PENDING_STATUSES = ('new', 'running', 'waiting')
+
+
+def _epoch(value: Optional[str]) -> Optional[float]:
+    return _parse_timestamp(value).timestamp() if value else None
+
+
+def _iso(epoch: float) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+class ExecutionStore:
+    """
+    Resúmenes de ejecuciones (sin runData) en una tabla SQLite en modo WAL
+
+    n8n devuelve las ejecuciones de la más reciente a la más antigua con ids
+    crecientes; la sincronización se detiene al llegar a la marca de agua
+    (el id más alto ya guardado, o la ejecución pendiente más antigua).
+    """
+
+    def __init__(self, path: str = ".cache/executions.sqlite"):
+        """
+        Args:
+            path: Ruta del archivo SQLite (":memory:" para pruebas)
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS executions (
+                id INTEGER PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                status TEXT,
+                mode TEXT,
+                started_at REAL,
+                stopped_at REAL,
+                duration_ms REAL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_executions_started ON executions(started_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_executions_workflow ON executions(workflow_id, started_at)"
+        )
+        # Los percentiles por workflow recorren este índice en orden (LIMIT 1 OFFSET k)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_executions_duration ON executions(workflow_id, duration_ms)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                scope TEXT PRIMARY KEY,
+                watermark INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'ExecutionStore':
+        """Crear el store a partir de las variables de config_template.env"""
+        options = {'path': os.getenv('EXECUTION_STORE_PATH', '.cache/executions.sqlite')}
+        options.update(overrides)
+        return cls(**options)
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+
+    def _watermark(self, scope: str) -> int:
+        row = self._conn.execute("SELECT watermark FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _row(execution: Dict) -> Tuple:
+        started = _epoch(execution.get('startedAt'))
+        stopped = _epoch(execution.get('stoppedAt'))
+        duration = (stopped - started) * 1000 if started is not None and stopped is not None else None
+        return (
+            int(execution['id']),
+            str(execution.get('workflowId', '')),
+            execution.get('status') or ('success' if execution.get('finished') else None),
+            execution.get('mode'),
+            started,
+            stopped,
+            duration
+        )
+
+    def sync(self, manager: N8nManager, workflow_id: Optional[str] = None, batch_size: int = 1000) -> Dict:
+        """
+        Descargar las ejecuciones nuevas
+
+        Args:
+            manager: Cliente de n8n
+            workflow_id: Sincronizar solo un workflow (por defecto, todos)
+            batch_size: Filas por transacción
+
+        Returns:
+            {"fetched": n, "pending": n, "watermark": id, "elapsed_s": s}
+        """
+        start = time.perf_counter()
+        scope = workflow_id or '*'
+        with self._lock:
+            watermark = self._watermark(scope)
+
+        fetched = pending = 0
+        highest = watermark - 1
+        oldest_pending: Optional[int] = None
+        batch: List[Tuple] = []
+        for execution in manager.iter_executions(workflow_id=workflow_id):
+            execution_id = int(execution['id'])
+            if execution_id < watermark:
+                break
+            row = self._row(execution)
+            batch.append(row)
+            fetched += 1
+            highest = max(highest, execution_id)
+            if row[2] in PENDING_STATUSES or row[5] is None:
+                pending += 1
+                oldest_pending = execution_id if oldest_pending is None else min(oldest_pending, execution_id)
+            if len(batch) >= batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+        new_watermark = oldest_pending if oldest_pending is not None else highest + 1
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (scope, watermark, synced_at) VALUES (?, ?, ?)",
+                (scope, max(new_watermark, 0), time.time())
+            )
+            self._conn.commit()
+        return {
+            'fetched': fetched,
+            'pending': pending,
+            'watermark': new_watermark,
+            'elapsed_s': time.perf_counter() - start
+        }
+
+    def _write(self, rows: Sequence[Tuple]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO executions VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _where(
+        workflow_id: Optional[str],
+        since: Optional[str],
+        until: Optional[str],
+        extra: str = ""
+    ) -> Tuple[str, List]:
+        clauses, params = [], []
+        if workflow_id:
+            clauses.append("workflow_id = ?")
+            params.append(str(workflow_id))
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(_epoch(since))
+        if until:
+            clauses.append("started_at <= ?")
+            params.append(_epoch(until))
+        if extra:
+            clauses.append(extra)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, workflow_id: Optional[str] = None) -> int:
+        where, params = self._where(workflow_id, None, None)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM executions {where}", params).fetchone()[0]
+
+    def throughput(
+        self,
+        workflow_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        bucket_s: int = 60
+    ) -> List[Tuple[str, int]]:
+        """Ejecuciones por intervalo (por defecto, por minuto): [(inicio ISO, cantidad)]"""
+        where, params = self._where(workflow_id, since, until, "started_at IS NOT NULL")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT CAST(started_at / ? AS INTEGER) AS bucket, COUNT(*) FROM executions {where} "
+                "GROUP BY bucket ORDER BY bucket",
+                [bucket_s] + params
+            ).fetchall()
+        return [(_iso(bucket * bucket_s), count) for bucket, count in rows]
+
+    def latency_percentiles(
+        self,
+        workflow_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        percentiles: Sequence[float] = (50, 95, 99),
+        status: Optional[str] = None
+    ) -> Dict:
+        """
+        Percentiles de duración (rango más cercano) calculados en SQLite
+
+        Returns:
+            {"count": n, "p50": ms, "p95": ms, "p99": ms}
+        """
+        extra = "duration_ms IS NOT NULL" + (" AND status = ?" if status else "")
+        where, params = self._where(workflow_id, since, until, extra)
+        if status:
+            params.append(status)
+        result: Dict = {}
+        with self._lock:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM executions {where}", params).fetchone()[0]
+            result['count'] = count
+            for q in percentiles:
+                key = f"p{q:g}"
+                if not count:
+                    result[key] = 0.0
+                    continue
+                offset = max(0, min(count - 1, int(-(-q * count // 100)) - 1))
+                result[key] = self._conn.execute(
+                    f"SELECT duration_ms FROM executions {where} ORDER BY duration_ms LIMIT 1 OFFSET ?",
+                    params + [offset]
+                ).fetchone()[0]
+        return result
+
+    def error_rates(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        workflow_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Tasa de error por workflow y hora"""
+        where, params = self._where(workflow_id, since, until, "started_at IS NOT NULL")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT workflow_id, CAST(started_at / 3600 AS INTEGER) AS hour, COUNT(*), "
+                "SUM(CASE WHEN status IN ('error', 'crashed') THEN 1 ELSE 0 END) "
+                f"FROM executions {where} GROUP BY workflow_id, hour ORDER BY hour, workflow_id",
+                params
+            ).fetchall()
+        return [
+            {
+                'workflow_id': workflow,
+                'hour': _iso(hour * 3600),
+                'executions': total,
+                'errors': errors,
+                'error_rate': errors / total if total else 0.0
+            }
+            for workflow, hour, total, errors in rows
+        ]
+
+    def summary(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Resumen por workflow: ejecuciones, tasa de error, p50/p95 y throughput medio"""
+        where, params = self._where(None, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT workflow_id, COUNT(*), "
+                "SUM(CASE WHEN status IN ('error', 'crashed') THEN 1 ELSE 0 END), "
+                f"MIN(started_at), MAX(started_at) FROM executions {where} "
+                "GROUP BY workflow_id ORDER BY COUNT(*) DESC",
+                params
+            ).fetchall()
+        summary = []
+        for workflow, total, errors, first, last in rows:
+            latency = self.latency_percentiles(workflow, since, until, percentiles=(50, 95))
+            minutes = max((last - first) / 60, 1.0) if first is not None else 1.0
+            summary.append({
+                'workflow_id': workflow,
+                'executions': total,
+                'error_rate': errors / total if total else 0.0,
+                'p50_ms': latency['p50'],
+                'p95_ms': latency['p95'],
+                'per_minute': total / minutes
+            })
+        return summary
+
+    def print_report(self, since: Optional[str] = None, until: Optional[str] = None):
+        """Imprimir el resumen por workflow"""
+        rows = self.summary(since, until)
+        print(f"\n📈 Historial de ejecuciones ({self.count():,} en {self.path})")
+        if not rows:
+            print("   └─ Sin ejecuciones (ejecuta --sync primero)")
+            return
+        print(f"\n{'Workflow':<12} {'Ejecuciones':>11} {'/min':>7} {'p50':>9} {'p95':>9} {'Errores':>8}")
+        print("-" * 60)
+        for row in rows:
+            print(f"{row['workflow_id']:<12} {row['executions']:>11,} {row['per_minute']:>7.2f} "
+                  f"{row['p50_ms']:>7,.0f}ms {row['p95_ms']:>7,.0f}ms {row['error_rate']*100:>7.1f}%")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+class _ListSource:
+    """Fuente de ejecuciones en memoria con la misma paginación que el API"""
+
+    def __init__(self, executions: List[Dict], page_size: int = 250):
+        self.executions = executions
+        self.page_size = page_size
+        self.pages = 0
+
+    def iter_executions(self, workflow_id: Optional[str] = None):
+        for i, execution in enumerate(self.executions):
+            if i % self.page_size == 0:
+                self.pages += 1
+            if workflow_id is None or execution['workflowId'] == workflow_id:
+                yield execution
+
+
+def benchmark(n_executions: int = 200000, n_new: int = 500) -> Dict:
+    """
+    Sincronización completa, sincronización incremental y consultas agregadas
+    sobre un historial simulado
+    """
+    import random
+    from datetime import datetime, timezone
+
+    rng = random.Random(9)
+    base = 1_790_000_000
+
+    def make(i: int) -> Dict:
+        started = base + i * 3
+        duration = rng.lognormvariate(0.3, 0.6)
+        return {
+            'id': str(i + 1),
+            'workflowId': str(1 + i % 4),
+            'status': 'error' if rng.random() < 0.03 else 'success',
+            'mode': 'webhook',
+            'finished': True,
+            'startedAt': _iso(started),
+            'stoppedAt': datetime.fromtimestamp(started + duration, timezone.utc).isoformat().replace('+00:00', 'Z')
+        }
+
+    history = [make(i) for i in range(n_executions)]
+    store = ExecutionStore(":memory:")
+
+    source = _ListSource(list(reversed(history)))
+    full = store.sync(source)
+    full_pages = source.pages
+
+    history.extend(make(i) for i in range(n_executions, n_executions + n_new))
+    source = _ListSource(list(reversed(history)))
+    incremental = store.sync(source)
+
+    timings = {}
+    start = time.perf_counter()
+    store.throughput(bucket_s=60)
+    timings['throughput_ms'] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    store.latency_percentiles(workflow_id='2')
+    timings['percentiles_ms'] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    store.error_rates()
+    timings['error_rates_ms'] = (time.perf_counter() - start) * 1000
+    store.close()
+
+    return {
+        'executions': n_executions,
+        'full_sync_s': full['elapsed_s'],
+        'full_pages': full_pages,
+        'incremental_fetched': incremental['fetched'],
+        'incremental_pages': source.pages,
+        'incremental_sync_s': incremental['elapsed_s'],
+        **timings
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+def _option(args: List[str], flag: str) -> Optional[str]:
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == '--benchmark':
+        results = benchmark()
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK HISTORIAL DE EJECUCIONES ({results['executions']:,} ejecuciones)")
+        print("="*80)
+        print(f"\n⬇️  Sincronización completa: {results['full_sync_s']:.2f}s ({results['full_pages']:,} páginas)")
+        print(f"🔁 Sincronización incremental: {results['incremental_sync_s']*1000:.0f} ms "
+              f"({results['incremental_fetched']:,} nuevas, {results['incremental_pages']} páginas)")
+        print(f"\n⚡ Consultas locales:")
+        print(f"   └─ Throughput por minuto: {results['throughput_ms']:.0f} ms")
+        print(f"   └─ Percentiles de un workflow: {results['percentiles_ms']:.0f} ms")
+        print(f"   └─ Tasa de error por workflow y hora: {results['error_rates_ms']:.0f} ms")
+        print("\n" + "="*80 + "\n")
+    elif args and args[0] in ('--sync', '--report'):
+        store = ExecutionStore.from_env()
+        if args[0] == '--sync':
+            n8n_url = os.getenv('N8N_URL', "http://159.203.149.247:5678")
+            api_key = os.getenv('N8N_API_KEY', '')
+            if not api_key:
+                print("\n❌ Define N8N_API_KEY (y opcionalmente N8N_URL)\n")
+                sys.exit(1)
+            result = store.sync(N8nManager(n8n_url, api_key), workflow_id=_option(args, '--workflow'))
+            print(f"\n🔁 {result['fetched']:,} ejecuciones sincronizadas en {result['elapsed_s']:.2f}s")
+        store.print_report(since=_option(args, '--since'))
+        print()
+    else:
+        print("\nUso:")
+        print("  python3 scripts/execution_store.py --sync [--workflow ID]")
+        print("  python3 scripts/execution_store.py --report [--since ISO]")
+        print("  python3 scripts/execution_store.py --benchmark\n")
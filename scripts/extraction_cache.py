@@ -0,0 +1,236 @@
+"""
+Extraction Cache - Caché comprimido de resultados de extracción (Document Intelligence / OCR)
+Direccionado por contenido: la llave es el hash SHA-256 del documento más el
+extractor y su versión, así re-ingerir, re-chunkear o subir de nuevo el mismo
+archivo nunca vuelve a pasar por OCR
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional
+
+
+def extraction_key(document_hash: str, extractor: str, version: str) -> str:
+    """Llave del caché: hash del documento + extractor@versión"""
+    suffix = hashlib.sha256(f"{extractor}@{version}".encode('utf-8')).hexdigest()[:16]
+    return f"{document_hash}-{suffix}"
+
+
+class ExtractionCache:
+    """
+    Resultados de extracción (texto, páginas, tablas) en archivos JSON
+    comprimidos con zlib, uno por (documento, extractor, versión)
+
+    Los archivos se reparten en subdirectorios por los dos primeros
+    caracteres del hash para no acumular millones en un solo directorio.
+    """
+
+    def __init__(
+        self,
+        root: str = ".cache/extractions",
+        max_bytes: int = 5 * 1024 * 1024 * 1024,
+        compression_level: int = 6
+    ):
+        """
+        Args:
+            root: Directorio del caché
+            max_bytes: Tamaño máximo en disco (se desaloja por último acceso)
+            compression_level: Nivel de zlib (1 = rápido, 9 = más compacto)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'puts': 0,
+            'raw_bytes': 0,
+            'stored_bytes': 0,
+            'extraction_s_saved': 0.0
+        }
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'ExtractionCache':
+        """Crear el caché a partir de las variables de config_template.env"""
+        options = {
+            'root': os.getenv('EXTRACTION_CACHE_DIR', '.cache/extractions'),
+            'max_bytes': int(os.getenv('EXTRACTION_CACHE_MAX_MB', '5120')) * 1024 * 1024
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json.z")
+
+    def get(self, document_hash: str, extractor: str, version: str) -> Optional[Dict]:
+        """
+        Buscar una extracción
+
+        Returns:
+            {"text", "pages", "tables", "metadata", ...} o None
+        """
+        path = self._path(extraction_key(document_hash, extractor, version))
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            result = json.loads(zlib.decompress(blob).decode('utf-8'))
+        except FileNotFoundError:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        except (zlib.error, ValueError):
+            # Archivo corrupto (escritura interrumpida): se trata como miss
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        # El mtime marca el último acceso para el desalojo
+        os.utime(path, None)
+        with self._lock:
+            self._stats['hits'] += 1
+            self._stats['extraction_s_saved'] += result.get('extraction_s', 0.0)
+        return result
+
+    def put(self, document_hash: str, extractor: str, version: str, result: Dict, extraction_s: float = 0.0):
+        """Guardar una extracción (escritura atómica)"""
+        key = extraction_key(document_hash, extractor, version)
+        payload = {
+            **result,
+            'document_hash': document_hash,
+            'extractor': extractor,
+            'extractor_version': version,
+            'extraction_s': extraction_s,
+            'cached_at': time.time()
+        }
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        blob = zlib.compress(raw, self.compression_level)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        with self._lock:
+            self._stats['puts'] += 1
+            self._stats['raw_bytes'] += len(raw)
+            self._stats['stored_bytes'] += len(blob)
+
+    def get_or_extract(
+        self,
+        document_hash: str,
+        extractor: str,
+        version: str,
+        extract: Callable[[], Dict]
+    ) -> Dict:
+        """
+        Devolver la extracción del caché o ejecutarla y guardarla
+
+        Args:
+            document_hash: SHA-256 del documento
+            extractor: Nombre del extractor (p. ej. "prebuilt-layout", "pypdf2")
+            version: Versión del modelo/librería; cambiarla invalida el caché
+            extract: Función sin argumentos que devuelve {"text", "pages", "tables", ...}
+        """
+        result = self.get(document_hash, extractor, version)
+        if result is not None:
+            return result
+        key = extraction_key(document_hash, extractor, version)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if os.path.exists(self._path(key)):
+                result = self.get(document_hash, extractor, version)
+                if result is not None:
+                    return result
+            start = time.perf_counter()
+            result = extract()
+            self.put(document_hash, extractor, version, result, time.perf_counter() - start)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return result
+
+    def invalidate(self, document_hash: str, extractor: str, version: str) -> bool:
+        """Eliminar una extracción"""
+        try:
+            os.remove(self._path(extraction_key(document_hash, extractor, version)))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size_bytes(self) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith('.json.z'):
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        return total
+
+    def prune(self) -> int:
+        """Desalojar las extracciones menos usadas hasta quedar bajo max_bytes"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith('.json.z'):
+                    path = os.path.join(dirpath, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Hit rate, razón de compresión y tiempo de extracción ahorrado"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['compression_ratio'] = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0.0
+        return stats
+
+    def print_stats(self):
+        """Imprimir resumen del caché"""
+        stats = self.get_stats()
+        print(f"\n📦 Caché de extracciones ({self.root})")
+        print(f"   └─ En disco: {self.size_bytes()/1024/1024:.1f} MB")
+        print(f"   └─ Hit rate: {stats['hit_rate']*100:.1f}% "
+              f"({stats['hits']:,} hits / {stats['misses']:,} misses)")
+        print(f"   └─ Compresión: {stats['compression_ratio']:.1f}x")
+        print(f"   └─ Extracción ahorrada: {stats['extraction_s_saved']:.1f}s")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--prune':
+        cache = ExtractionCache.from_env()
+        before = cache.size_bytes()
+        removed = cache.prune()
+        print(f"\n🧹 {removed:,} extracciones eliminadas "
+              f"({before/1024/1024:.1f} MB → {cache.size_bytes()/1024/1024:.1f} MB)\n")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--stats':
+        cache = ExtractionCache.from_env()
+        count = sum(len(files) for _, _, files in os.walk(cache.root))
+        print(f"\n📦 {count:,} extracciones en {cache.root} ({cache.size_bytes()/1024/1024:.1f} MB)\n")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/extraction_cache.py --stats")
+        print("  python3 scripts/extraction_cache.py --prune\n")
@@ -0,0 +1,429 @@
+"""
+Hybrid Search - Recuperación híbrida BM25 + vectorial con Reciprocal Rank Fusion
+Recupera términos exactos (códigos de producto, "CDT", números de artículo) que
+la búsqueda puramente vectorial del workflow de consultas pasa por alto
+"""
+
+import math
+import os
+import pickle
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_vector_index import NOT_DELETED_FILTER, LocalVectorIndex, matches_filter, parse_filter
+
+
+SPANISH_STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde
+donde durante e el ella ellas ellos en entre era es esa esas ese eso esos esta
+estas este esto estos fue fueron ha han hasta hay la las le les lo los mas me
+mi mis mucho muy ni no nos o otra otros para pero por porque que quien se sea
+ser si sin sobre son su sus tambien te tiene tienen todo todos tu un una uno
+unos y ya yo
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+
+def fold_accents(text: str) -> str:
+    """Quitar tildes y diacríticos (información → informacion, ñ → n)"""
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in decomposed if unicodedata.category(c) != 'Mn')
+
+
+_ES_PLURALS = ('les', 'res', 'nes', 'des', 'yes')
+
+
+def _light_stem(token: str) -> str:
+    # Plurales regulares del español: "-es" solo tras l, r, n, d, y
+    # (papeles → papel, mujeres → mujer), "-ces" → "z" (luces → luz) y "-s" en
+    # el resto (clientes → cliente, bases → base, cdts → cdt). Tras vocal + s se
+    # quita "-es" y se vuelve a aplicar, para que el singular llegue a la misma
+    # forma (intereses → interes → inter). Los tokens con dígitos no se tocan
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if len(token) > 4:
+        if token.endswith('ces'):
+            return token[:-3] + 'z'
+        if token.endswith(_ES_PLURALS):
+            return token[:-2]
+        if token.endswith(('eses', 'ises', 'oses', 'uses')):
+            return _light_stem(token[:-2])
+    if token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenizar texto en español para BM25
+
+    Minúsculas, sin tildes, sin stopwords y con plurales simplificados.
+    Conserva códigos como "cdt-180" o "art.15" como un solo token.
+    """
+    tokens = _TOKEN_RE.findall(fold_accents(text.lower()))
+    return [_light_stem(t) for t in tokens if t not in SPANISH_STOPWORDS]
+
+
+# ============================================================================
+# LISTAS DE POSTINGS COMPRIMIDAS (varint + delta)
+# ============================================================================
+
+def _encode_varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(buffer: bytes) -> np.ndarray:
+    """Decodificar una secuencia de varints LEB128 de forma vectorizada"""
+    data = np.frombuffer(bytes(buffer), dtype=np.uint8)
+    if data.size == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts + 1
+    shifts = (np.arange(data.size) - np.repeat(starts, lengths)) * 7
+    parts = (data & 0x7F).astype(np.int64) << shifts.astype(np.int64)
+    return np.add.reduceat(parts, starts)
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 con postings delta-codificados
+
+    Cada posting es una secuencia de pares varint (delta de doc_id, tf). Los
+    documentos nuevos reciben ids crecientes, así que agregar es un append al
+    final de cada posting. Las eliminaciones marcan el documento como muerto
+    y `compact()` reescribe los postings cuando se acumulan.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, decoded_cache_size: int = 1024):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, bytearray] = {}
+        self._last_id: Dict[str, int] = {}
+        self._df: Counter = Counter()
+        self._keys: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._lengths = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._total_length = 0.0
+        self._decoded: OrderedDict = OrderedDict()
+        self._decoded_cache_size = decoded_cache_size
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _grow(self):
+        n = len(self._keys)
+        if n < len(self._lengths):
+            return
+        capacity = max(1024, len(self._lengths) * 2)
+        lengths = np.zeros(capacity, dtype=np.float32)
+        lengths[:n] = self._lengths[:n]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:n] = self._alive[:n]
+        self._lengths, self._alive = lengths, alive
+
+    def add(self, key: str, text: str):
+        """Agregar (o reemplazar) un documento"""
+        if key in self._ids:
+            self.remove(key)
+        tokens = tokenize(text)
+        self._grow()
+        doc_id = len(self._keys)
+        self._keys.append(key)
+        self._ids[key] = doc_id
+        self._lengths[doc_id] = len(tokens)
+        self._alive[doc_id] = True
+        self._total_length += len(tokens)
+
+        for term, tf in Counter(tokens).items():
+            posting = self._postings.setdefault(term, bytearray())
+            _encode_varint(doc_id - self._last_id.get(term, 0), posting)
+            _encode_varint(tf, posting)
+            self._last_id[term] = doc_id
+            self._df[term] += 1
+            self._decoded.pop(term, None)
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]):
+        """Agregar varios (key, texto)"""
+        for key, text in documents:
+            self.add(key, text)
+
+    def remove(self, key: str) -> bool:
+        """Marcar un documento como eliminado"""
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return False
+        self._alive[doc_id] = False
+        self._total_length -= float(self._lengths[doc_id])
+        self._keys[doc_id] = None
+        if len(self._ids) < len(self._keys) * 0.8:
+            self.compact()
+        return True
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._decoded.get(term)
+        if cached is not None:
+            self._decoded.move_to_end(term)
+            return cached
+        values = decode_varints(self._postings[term])
+        doc_ids = np.cumsum(values[0::2])
+        tfs = values[1::2].astype(np.float32)
+        self._decoded[term] = (doc_ids, tfs)
+        if len(self._decoded) > self._decoded_cache_size:
+            self._decoded.popitem(last=False)
+        return doc_ids, tfs
+
+    def compact(self):
+        """Reescribir postings sin documentos eliminados y renumerar ids"""
+        n = len(self._keys)
+        alive = self._alive[:n]
+        new_ids = np.cumsum(alive) - 1
+        postings, last_id, df = {}, {}, Counter()
+        for term in list(self._postings):
+            doc_ids, tfs = self._posting_arrays(term)
+            keep = alive[doc_ids]
+            if not keep.any():
+                continue
+            remapped = new_ids[doc_ids[keep]]
+            deltas = np.diff(remapped, prepend=0)
+            buffer = bytearray()
+            for delta, tf in zip(deltas.tolist(), tfs[keep].astype(np.int64).tolist()):
+                _encode_varint(delta, buffer)
+                _encode_varint(tf, buffer)
+            postings[term] = buffer
+            last_id[term] = int(remapped[-1])
+            df[term] = int(keep.sum())
+
+        rows = np.flatnonzero(alive)
+        self._keys = [self._keys[r] for r in rows]
+        self._ids = {key: i for i, key in enumerate(self._keys)}
+        self._lengths = self._lengths[rows].copy()
+        self._alive = np.ones(len(rows), dtype=bool)
+        self._postings, self._last_id, self._df = postings, last_id, df
+        self._decoded.clear()
+
+    def search(self, query: str, top: int = 10) -> List[Tuple[str, float]]:
+        """
+        Buscar por BM25
+
+        Returns:
+            Lista de (key, puntaje) ordenada de mayor a menor
+        """
+        n_docs = len(self._ids)
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._postings]
+        if not n_docs or not terms:
+            return []
+        avg_length = self._total_length / n_docs or 1.0
+        scores = np.zeros(len(self._keys), dtype=np.float32)
+        for term in terms:
+            doc_ids, tfs = self._posting_arrays(term)
+            df = self._df[term]
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self._lengths[doc_ids] / avg_length)
+            scores[doc_ids] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+        scores[~self._alive[:len(self._keys)]] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top:
+            candidates = candidates[np.argpartition(-scores[candidates], top - 1)[:top]]
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(self._keys[i], float(scores[i])) for i in ranked]
+
+    def size_bytes(self) -> int:
+        """Bytes ocupados por los postings comprimidos"""
+        return sum(len(p) for p in self._postings.values())
+
+    def save(self, path: str):
+        """Guardar el índice en un archivo"""
+        self._decoded.clear()
+        with open(path, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Index':
+        """Cargar un índice guardado con save()"""
+        index = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+
+# ============================================================================
+# FUSIÓN
+# ============================================================================
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Fusionar rankings con Reciprocal Rank Fusion: score = Σ w / (k + rank)
+
+    Args:
+        rankings: Listas de llaves ordenadas de mejor a peor
+        k: Constante de suavizado (60 es el valor estándar)
+        weights: Peso de cada ranking (por defecto 1.0)
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class HybridRetriever:
+    """
+    Etapa de recuperación híbrida: BM25 + índice vectorial local, fusionados con RRF
+
+    Mantiene ambos índices sincronizados al ingerir o eliminar chunks.
+    """
+
+    def __init__(
+        self,
+        vector_index: LocalVectorIndex,
+        bm25: Optional[BM25Index] = None,
+        text_field: str = "content",
+        rrf_k: int = 60
+    ):
+        self.vector_index = vector_index
+        self.bm25 = bm25 or BM25Index()
+        self.text_field = text_field
+        self.rrf_k = rrf_k
+
+    def add_documents(self, documents: Sequence[Dict]):
+        """Indexar chunks (con content y content_vector) en ambos índices"""
+        self.vector_index.upload_documents(documents)
+        key_field = self.vector_index.key_field
+        for doc in documents:
+            self.bm25.add(doc[key_field], doc.get(self.text_field, ''))
+
+    def delete_documents(self, keys: Sequence[str]):
+        """Eliminar chunks de ambos índices"""
+        self.vector_index.delete_documents(keys)
+        for key in keys:
+            self.bm25.remove(key)
+
+    def search(
+        self,
+        query: str,
+        vector: Sequence[float],
+        top: int = 5,
+        candidates: int = 50,
+        weights: Tuple[float, float] = (1.0, 1.0),
+        filter: Optional[str] = NOT_DELETED_FILTER
+    ) -> Dict:
+        """
+        Búsqueda híbrida con la forma de respuesta de Azure AI Search
+
+        Args:
+            query: Texto de la consulta (para BM25)
+            vector: Embedding de la consulta
+            top: Resultados finales
+            candidates: Candidatos que aporta cada recuperador
+            weights: Pesos RRF (bm25, vectorial)
+            filter: Filtro OData de ambos recuperadores (por defecto excluye
+                los chunks con soft-delete); None = sin filtro
+
+        Returns:
+            {"value": [{"@search.score": <puntaje RRF>, <campos del chunk>}]}
+        """
+        docs = self.vector_index._docs
+        positions = self.vector_index._positions
+        key_field = self.vector_index.key_field
+        clauses = parse_filter(filter)
+        lexical = [key for key, _ in self.bm25.search(query, top=candidates)]
+        if clauses:
+            # BM25 no conoce los campos del chunk: filtrar con el documento del índice vectorial
+            lexical = [key for key in lexical
+                       if key in positions and matches_filter(docs[positions[key]], clauses)]
+        hits = self.vector_index.search_vector(vector, k=candidates, filter=filter)
+        semantic = [docs[row][key_field] for row, _ in hits]
+
+        fused = reciprocal_rank_fusion([lexical, semantic], k=self.rrf_k, weights=weights)[:top]
+        value = []
+        for key, score in fused:
+            row = positions.get(key)
+            if row is None:
+                continue
+            value.append({'@search.score': score, **docs[row]})
+        return {'value': value}
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark(n_chunks: int = 50_000, dimensions: int = 256, n_queries: int = 200, top: int = 5) -> Dict:
+    """Comparar latencia de recuperación solo vectorial vs híbrida"""
+    rng = np.random.default_rng(3)
+    vocabulary = [f"termino{i}" for i in range(20_000)] + [
+        "cdt", "credito", "vivienda", "tasa", "interes", "cuenta", "ahorro", "tarjeta"
+    ]
+    vectors = rng.standard_normal((n_chunks, dimensions)).astype(np.float32)
+    chunks = []
+    for i in range(n_chunks):
+        words = rng.choice(len(vocabulary), size=80)
+        text = ' '.join(vocabulary[w] for w in words) + f" producto PRD-{i % 5000}"
+        chunks.append({'chunk_id': f'c{i}', 'content': text, 'content_vector': vectors[i]})
+
+    retriever = HybridRetriever(LocalVectorIndex(dimensions=dimensions))
+    start = time.perf_counter()
+    retriever.add_documents(chunks)
+    build = time.perf_counter() - start
+
+    queries = [(f"tasa del producto PRD-{i * 7 % 5000} cdt", vectors[rng.integers(n_chunks)])
+               for i in range(n_queries)]
+
+    start = time.perf_counter()
+    for _, vector in queries:
+        retriever.vector_index.search_vector(vector, k=top)
+    vector_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    start = time.perf_counter()
+    for text, vector in queries:
+        retriever.search(text, vector, top=top)
+    hybrid_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    return {
+        'n_chunks': n_chunks,
+        'build_s': build,
+        'bm25_mb': retriever.bm25.size_bytes() / 1024 / 1024,
+        'vector_ms': vector_ms,
+        'hybrid_ms': hybrid_ms
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+        results = benchmark(n_chunks=n)
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK RECUPERACIÓN HÍBRIDA ({results['n_chunks']:,} chunks)")
+        print("="*80)
+        print(f"\n⏱️  Indexación: {results['build_s']:.2f}s")
+        print(f"📦 Postings BM25: {results['bm25_mb']:.1f} MB")
+        print(f"🔍 Solo vectorial: {results['vector_ms']:.2f} ms/consulta")
+        print(f"🔀 Híbrida (BM25 + vector + RRF): {results['hybrid_ms']:.2f} ms/consulta")
+        print("\n" + "="*80 + "\n")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/hybrid_search.py --benchmark [n_chunks]\n")
@@ -0,0 +1,836 @@
+"""
+Local Vector Index - Índice vectorial local compatible con Azure AI Search
+Reemplazo del endpoint indexes/{AZURE_SEARCH_INDEX}/docs/search para evaluación
+offline, CI y despliegues edge de baja latencia
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalizar filas a norma L2 unitaria (coseno = producto punto)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índices de los k mayores puntajes, ordenados de mayor a menor
+
+    Usa argpartition (O(n)) y ordena solo los k seleccionados.
+    """
+    n = scores.shape[-1]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def cosine_to_search_score(similarity: np.ndarray) -> np.ndarray:
+    """Convertir similitud coseno al @search.score de Azure AI Search: 1/(1+distancia)"""
+    return 1.0 / (2.0 - similarity)
+
+
+# Formatos de almacenamiento de los vectores del índice
+STORAGE_DTYPES = {
+    'float32': np.float32,
+    'float16': np.float16,
+    'int8': np.int8
+}
+
+# Bytes por bloque al convertir códigos compactos a float32 (cabe en caché L2/L3)
+_SCORE_BLOCK_BYTES = 2 * 1024 * 1024
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cuantización escalar simétrica por vector a int8
+
+    Returns:
+        (códigos int8, escala float32 por fila) con v ≈ códigos * escala
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=-1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[..., None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+_FILTER_CLAUSE = re.compile(r"^\s*(\w+)\s+(eq|ne)\s+(?:'((?:[^']|'')*)'|(true|false|null))\s*$")
+_FILTER_IN = re.compile(r"^\s*search\.in\(\s*(\w+)\s*,\s*'((?:[^']|'')*)'\s*(?:,\s*'([^']*)'\s*)?\)\s*$")
+
+# Filtro de los chunks vigentes: los soft-delete quedan con is_deleted=true y
+# los chunks anteriores al campo no lo tienen (null también pasa)
+NOT_DELETED_FILTER = "is_deleted ne true"
+
+
+def filter_value(value) -> str:
+    """Representación de un campo para compararlo con los literales OData (true/false/null)"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def parse_filter(expression: Optional[str]) -> List[Tuple[str, Tuple[str, ...], bool]]:
+    """
+    Interpretar un filtro OData simple:
+    "campo eq 'valor' and search.in(campo2, 'a|b', '|') and is_deleted ne true"
+
+    Es el subconjunto que usan los workflows (p. ej. filtrar por document_id y
+    excluir los chunks con soft-delete). Cada cláusula se devuelve como
+    (campo, valores, negada): con negada=True el campo no debe estar en valores.
+    """
+    if not expression:
+        return []
+    clauses = []
+    for part in re.split(r"\s+and\s+", expression.strip()):
+        match = _FILTER_CLAUSE.match(part)
+        if match:
+            value = match.group(3).replace("''", "'") if match.group(3) is not None else match.group(4)
+            clauses.append((match.group(1), (value,), match.group(2) == 'ne'))
+            continue
+        match = _FILTER_IN.match(part)
+        if not match:
+            raise ValueError(f"Filtro no soportado: {part}")
+        values = match.group(2).replace("''", "'")
+        delimiter = match.group(3)
+        split = values.split(delimiter) if delimiter else re.split(r"[\s,]+", values)
+        clauses.append((match.group(1), tuple(v for v in split if v), False))
+    return clauses
+
+
+def matches_filter(doc: Dict, clauses: List[Tuple[str, Tuple[str, ...], bool]]) -> bool:
+    """¿Cumple el documento todas las cláusulas de parse_filter?"""
+    return all((filter_value(doc.get(field)) in values) != negated for field, values, negated in clauses)
+
+
+class LocalVectorIndex:
+    """
+    Índice vectorial en memoria con la misma forma de request/response que
+    Azure AI Search
+
+    - Corpus pequeños: búsqueda exacta con una multiplicación de matrices y
+      `argpartition`.
+    - Corpus grandes: índice IVF (k-means) que solo evalúa las `nprobe`
+      listas más cercanas a la consulta.
+
+    Con `storage='float16'` o `'int8'` la búsqueda corre sobre los códigos
+    compactos y los `k * rescore_factor` mejores candidatos se vuelven a
+    puntuar con la copia float32 (que puede vivir en disco vía memmap).
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        key_field: str = "chunk_id",
+        vector_field: str = "content_vector",
+        ivf_threshold: Optional[int] = 50_000,
+        storage: str = "float32",
+        keep_full_precision: bool = True,
+        rescore_factor: int = 4
+    ):
+        """
+        Inicializar el índice
+
+        Args:
+            dimensions: Dimensión de los embeddings
+            key_field: Campo llave de los documentos
+            vector_field: Campo que contiene el vector
+            ivf_threshold: A partir de cuántos documentos se construye (y usa) el
+                IVF automáticamente; None = solo el IVF construido con build_ivf()
+            storage: Formato de los vectores en memoria ('float32', 'float16', 'int8')
+            keep_full_precision: Conservar copia float32 para re-puntuar
+            rescore_factor: Candidatos re-puntuados por cada resultado pedido
+        """
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"Formato no soportado: {storage}")
+        self.dimensions = dimensions
+        self.key_field = key_field
+        self.vector_field = vector_field
+        self.ivf_threshold = ivf_threshold
+        self.storage = storage
+        self.rescore_factor = rescore_factor
+
+        self._vectors = np.empty((0, dimensions), dtype=STORAGE_DTYPES[storage])
+        self._scales = np.empty(0, dtype=np.float32)
+        self._full = (
+            np.empty((0, dimensions), dtype=np.float32)
+            if keep_full_precision and storage != 'float32' else None
+        )
+        self._size = 0
+        self._docs: List[Optional[Dict]] = []
+        self._alive = np.empty(0, dtype=bool)
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        # Máscaras por filtro: los de recuperación se repiten en cada consulta
+        # (is_deleted ne true); cualquier escritura las invalida
+        self._filter_masks: Dict[Tuple, np.ndarray] = {}
+
+        # Estado IVF
+        self._centroids: Optional[np.ndarray] = None
+        self._ivf_order: Optional[np.ndarray] = None
+        self._ivf_offsets: Optional[np.ndarray] = None
+        self._ivf_rows = 0
+        self.nprobe = 8
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    # ------------------------------------------------------------------
+    # Escritura (equivalente a docs/index)
+    # ------------------------------------------------------------------
+
+    def _grow(self, extra: int):
+        needed = self._size + extra
+        if needed <= self._vectors.shape[0]:
+            return
+        capacity = max(needed, self._vectors.shape[0] * 2, 1024)
+
+        def grown(array: np.ndarray) -> np.ndarray:
+            result = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            result[:self._size] = array[:self._size]
+            return result
+
+        self._vectors = grown(self._vectors)
+        self._alive = grown(self._alive)
+        if self.storage == 'int8':
+            self._scales = grown(self._scales)
+        if self._full is not None:
+            self._full = grown(self._full)
+
+    def _store_rows(self, start: int, vectors: np.ndarray):
+        end = start + len(vectors)
+        if self.storage == 'int8':
+            self._vectors[start:end], self._scales[start:end] = quantize_int8(vectors)
+        else:
+            self._vectors[start:end] = vectors
+        if self._full is not None:
+            self._full[start:end] = vectors
+
+    def _float_rows(self, rows) -> np.ndarray:
+        """Vectores float32 (exactos si hay copia completa) de las filas pedidas"""
+        if self.storage == 'float32':
+            return self._vectors[rows]
+        if self._full is not None:
+            return np.asarray(self._full[rows], dtype=np.float32)
+        vectors = self._vectors[rows].astype(np.float32)
+        if self.storage == 'int8':
+            vectors *= self._scales[rows][..., None]
+        return vectors
+
+    def memory_bytes(self) -> int:
+        """Bytes en RAM de los vectores (la copia float32 en memmap no cuenta)"""
+        total = self._vectors[:self._size].nbytes
+        if self.storage == 'int8':
+            total += self._scales[:self._size].nbytes
+        if self._full is not None and not isinstance(self._full, np.memmap):
+            total += self._full[:self._size].nbytes
+        return total
+
+    def upload_documents(self, documents: Sequence[Dict]) -> List[Dict]:
+        """
+        Insertar o reemplazar documentos (acción mergeOrUpload)
+
+        Returns:
+            Lista de resultados por llave, como en docs/index
+        """
+        with self._lock:
+            self._filter_masks.clear()
+            self._grow(len(documents))
+            vectors = normalize_rows(
+                np.array([doc[self.vector_field] for doc in documents], dtype=np.float32)
+                .reshape(len(documents), self.dimensions)
+            )
+            self._store_rows(self._size, vectors)
+            results = []
+            for doc in documents:
+                key = doc[self.key_field]
+                previous = self._positions.get(key)
+                if previous is not None:
+                    self._alive[previous] = False
+                    self._docs[previous] = None
+                row = self._size
+                self._alive[row] = True
+                self._docs.append({k: v for k, v in doc.items() if k != self.vector_field})
+                self._positions[key] = row
+                self._size += 1
+                results.append({'key': key, 'status': True, 'statusCode': 201 if previous is None else 200})
+            self._maybe_build_ivf()
+            return results
+
+    def delete_documents(self, keys: Sequence[str]) -> List[Dict]:
+        """Eliminar documentos por llave (acción delete)"""
+        with self._lock:
+            self._filter_masks.clear()
+            results = []
+            for key in keys:
+                row = self._positions.pop(key, None)
+                if row is not None:
+                    self._alive[row] = False
+                    self._docs[row] = None
+                results.append({'key': key, 'status': True, 'statusCode': 200})
+            if self._size and len(self._positions) < self._size * 0.75:
+                self.compact()
+            return results
+
+    def merge_documents(self, documents: Sequence[Dict]) -> List[Dict]:
+        """Actualizar campos de documentos existentes sin tocar el vector (acción merge)"""
+        with self._lock:
+            self._filter_masks.clear()
+            results = []
+            for doc in documents:
+                key = doc[self.key_field]
+                row = self._positions.get(key)
+                if row is None:
+                    results.append({'key': key, 'status': False, 'statusCode': 404,
+                                    'errorMessage': 'Document not found.'})
+                    continue
+                self._docs[row].update({k: v for k, v in doc.items() if k != self.vector_field})
+                results.append({'key': key, 'status': True, 'statusCode': 200})
+            return results
+
+    def index(self, body: Dict) -> Dict:
+        """
+        Aplicar un lote con el formato de POST docs/index
+
+        Args:
+            body: {"value": [{"@search.action": "mergeOrUpload"|"upload"|"merge"|"delete", ...}]}
+        """
+        uploads, merges, deletes = [], [], []
+        for action in body.get('value', []):
+            kind = action.get('@search.action', 'mergeOrUpload')
+            doc = {k: v for k, v in action.items() if k != '@search.action'}
+            if kind == 'delete':
+                deletes.append(doc[self.key_field])
+            elif kind == 'merge':
+                merges.append(doc)
+            else:
+                uploads.append(doc)
+        results = []
+        if uploads:
+            results.extend(self.upload_documents(uploads))
+        if merges:
+            results.extend(self.merge_documents(merges))
+        if deletes:
+            results.extend(self.delete_documents(deletes))
+        return {'value': results}
+
+    def compact(self):
+        """Reescribir la matriz sin las filas eliminadas"""
+        with self._lock:
+            self._filter_masks.clear()
+            rows = np.flatnonzero(self._alive[:self._size])
+            self._vectors = self._vectors[rows].copy()
+            if self.storage == 'int8':
+                self._scales = self._scales[rows].copy()
+            if self._full is not None:
+                self._full = np.asarray(self._full[rows], dtype=np.float32)
+            self._alive = np.ones(len(rows), dtype=bool)
+            self._docs = [self._docs[r] for r in rows]
+            self._positions = {doc[self.key_field]: i for i, doc in enumerate(self._docs)}
+            self._size = len(rows)
+            if self._centroids is not None:
+                self.build_ivf(nlist=len(self._centroids), nprobe=self.nprobe)
+
+    # ------------------------------------------------------------------
+    # IVF
+    # ------------------------------------------------------------------
+
+    def build_ivf(self, nlist: Optional[int] = None, nprobe: int = 8, iterations: int = 10, seed: int = 0):
+        """
+        Construir el índice IVF con k-means esférico
+
+        Args:
+            nlist: Número de listas (por defecto ~sqrt(n))
+            nprobe: Listas que se evalúan por consulta
+            iterations: Iteraciones de k-means
+        """
+        with self._lock:
+            n = self._size
+            if n == 0:
+                # Sin filas no hay listas: dejar que _maybe_build_ivf lo reconstruya
+                self._reset_ivf()
+                return
+            nlist = min(nlist or max(1, int(np.sqrt(n))), n)
+            rng = np.random.default_rng(seed)
+
+            sample = self._float_rows(np.sort(rng.choice(n, size=min(n, nlist * 64), replace=False)))
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, sample)
+                empty = np.bincount(assign, minlength=nlist) == 0
+                sums[empty] = centroids[empty]
+                centroids = normalize_rows(sums)
+
+            assign = np.empty(n, dtype=np.int64)
+            for start in range(0, n, 65_536):
+                block = self._float_rows(slice(start, min(n, start + 65_536)))
+                assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+            self._centroids = centroids
+            self._ivf_order = np.argsort(assign, kind='stable')
+            self._ivf_offsets = np.searchsorted(assign[self._ivf_order], np.arange(nlist + 1))
+            self._ivf_rows = n
+            self.nprobe = nprobe
+
+    def _reset_ivf(self):
+        self._centroids = None
+        self._ivf_order = None
+        self._ivf_offsets = None
+        self._ivf_rows = 0
+
+    def _maybe_build_ivf(self):
+        # Construir el IVF al cruzar ivf_threshold y reconstruirlo cuando las filas
+        # agregadas después (que se evalúan siempre) superan a las indexadas.
+        # Un IVF con más filas que la matriz apunta a posiciones que ya no existen
+        if self._ivf_rows > self._size:
+            self._reset_ivf()
+        if self.ivf_threshold is None or len(self) < self.ivf_threshold:
+            return
+        if self._centroids is None or self._size - self._ivf_rows > self._ivf_rows:
+            self.build_ivf(nprobe=self.nprobe)
+
+    def _ivf_candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = top_k_indices(self._centroids @ query, nprobe)
+        parts = [self._ivf_order[self._ivf_offsets[p]:self._ivf_offsets[p + 1]] for p in probes]
+        # Filas agregadas después de construir el IVF se evalúan siempre
+        if self._size > self._ivf_rows:
+            parts.append(np.arange(self._ivf_rows, self._size))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Búsqueda (equivalente a docs/search)
+    # ------------------------------------------------------------------
+
+    def _filter_mask(self, clauses: List[Tuple[str, Tuple[str, ...], bool]]) -> np.ndarray:
+        key = tuple(clauses)
+        mask = self._filter_masks.get(key)
+        if mask is None:
+            mask = self._alive[:self._size].copy()
+            for row in np.flatnonzero(mask):
+                if not matches_filter(self._docs[row], clauses):
+                    mask[row] = False
+            self._filter_masks[key] = mask
+        return mask
+
+    def search_vector(
+        self,
+        vector: Sequence[float],
+        k: int = 5,
+        filter: Optional[str] = None,
+        exhaustive: Optional[bool] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Buscar los k vecinos más cercanos
+
+        Returns:
+            Lista de (fila, similitud coseno) ordenada de mayor a menor
+        """
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            if self._size == 0:
+                return []
+            clauses = parse_filter(filter)
+            use_ivf = (
+                not exhaustive
+                and self._centroids is not None
+                and (self.ivf_threshold is None or self._size >= self.ivf_threshold)
+            )
+            rows = None
+            if use_ivf:
+                rows = self._ivf_candidates(query, nprobe or self.nprobe)
+                rows = rows[self._alive[rows]]
+                # El filtro se aplica a los candidatos; si es tan selectivo que
+                # no alcanzan k resultados se cae a la búsqueda exacta filtrada
+                if clauses:
+                    rows = rows[self._filter_mask(clauses)[rows]]
+                    if len(rows) < k:
+                        use_ivf = False
+            if not use_ivf:
+                mask = self._filter_mask(clauses) if clauses else self._alive[:self._size]
+                rows = None if mask.all() else np.flatnonzero(mask)
+
+            scores = self._approx_scores(slice(0, self._size) if rows is None else rows, query)
+
+            if self.storage == 'float32' or self._full is None:
+                best = top_k_indices(scores, k)
+                if rows is not None:
+                    return [(int(rows[i]), float(scores[i])) for i in best]
+                return [(int(i), float(scores[i])) for i in best]
+
+            # Re-puntuar con precisión completa solo los mejores candidatos
+            candidates = top_k_indices(scores, k * self.rescore_factor)
+            if rows is not None:
+                candidates = rows[candidates]
+            candidates.sort()
+            exact = np.asarray(self._full[candidates], dtype=np.float32) @ query
+            best = top_k_indices(exact, k)
+            return [(int(candidates[i]), float(exact[i])) for i in best]
+
+    def _approx_scores(self, rows, query: np.ndarray) -> np.ndarray:
+        """Similitud sobre los vectores almacenados (códigos compactos si aplica)"""
+        codes = self._vectors[rows]
+        if self.storage == 'float32':
+            return codes @ query
+        # numpy no tiene BLAS para float16/int8: convertir por bloques acotados
+        step = max(1, _SCORE_BLOCK_BYTES // (4 * self.dimensions))
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), step):
+            block = codes[start:start + step].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.storage == 'int8':
+            scores *= self._scales[rows]
+        return scores
+
+    def _filter_documents(self, filter: str, fields: Optional[List[str]], top: int, skip: int) -> List[Dict]:
+        clauses = parse_filter(filter)
+        with self._lock:
+            rows = np.flatnonzero(self._filter_mask(clauses))[skip:skip + top]
+            docs = [self._docs[row] for row in rows]
+        return [{'@search.score': 1.0, **({f: doc.get(f) for f in fields} if fields else doc)} for doc in docs]
+
+    def search(self, body: Dict) -> Dict:
+        """
+        Ejecutar un request con el formato de POST docs/search
+
+        Args:
+            body: {"search": "*", "vectorQueries": [{"kind": "vector", "vector": [...],
+                   "fields": "content_vector", "k": 5}], "top": 5, "filter": "...",
+                   "select": "chunk_id,content"}
+
+        Sin vectorQueries solo se aplica el filtro (paginado con top/skip), como
+        un docs/search con search="*" para listar los chunks de un documento.
+        Si el select incluye el campo vectorial se devuelve el vector guardado
+        (campo retrievable en Azure), que es lo que usa el MMR del workflow.
+
+        Returns:
+            {"value": [{"@search.score": ..., <campos del documento>}]}
+        """
+        vector_queries = body.get('vectorQueries') or []
+        select = body.get('select')
+        fields = [f.strip() for f in select.split(',')] if select else None
+        if not vector_queries:
+            if not body.get('filter'):
+                raise ValueError("Se requiere al menos un vectorQuery o un filter")
+            return {'value': self._filter_documents(body['filter'], fields,
+                                                    top=int(body.get('top') or 50), skip=int(body.get('skip') or 0))}
+        top = int(body.get('top') or vector_queries[0].get('k', 5))
+
+        # Con varias vectorQueries se conserva el mejor puntaje por documento
+        best: Dict[int, float] = {}
+        for vq in vector_queries:
+            hits = self.search_vector(
+                vq['vector'],
+                k=int(vq.get('k', top)),
+                filter=body.get('filter'),
+                exhaustive=vq.get('exhaustive')
+            )
+            for row, similarity in hits:
+                best[row] = max(best.get(row, -1.0), similarity)
+
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:top]
+        value = []
+        with self._lock:
+            for row, similarity in ranked:
+                doc = self._docs[row]
+                if doc is None:
+                    continue
+                if fields:
+                    doc = {f: doc.get(f) for f in fields}
+                    if self.vector_field in fields:
+                        doc[self.vector_field] = self._float_rows(row).tolist()
+                value.append({'@search.score': float(cosine_to_search_score(similarity)), **doc})
+        return {'value': value}
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    def save(self, path: str):
+        """
+        Guardar el índice en un directorio
+
+        vectors.npy (códigos), scales.npy (int8), full.npy (copia float32
+        para re-puntuar) y docs.json (documentos y configuración).
+        """
+        self.compact()
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'vectors.npy'), self._vectors[:self._size])
+        if self.storage == 'int8':
+            np.save(os.path.join(path, 'scales.npy'), self._scales[:self._size])
+        if self._full is not None:
+            np.save(os.path.join(path, 'full.npy'), self._full[:self._size])
+        with open(os.path.join(path, 'docs.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'dimensions': self.dimensions,
+                'key_field': self.key_field,
+                'vector_field': self.vector_field,
+                'storage': self.storage,
+                'docs': self._docs
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False, **kwargs) -> 'LocalVectorIndex':
+        """
+        Cargar un índice guardado con save()
+
+        La copia float32 de re-puntuación siempre se abre como memmap: solo se
+        leen del disco las filas candidatas.
+        """
+        with open(os.path.join(path, 'docs.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls(
+            dimensions=meta['dimensions'],
+            key_field=meta['key_field'],
+            vector_field=meta['vector_field'],
+            storage=meta.get('storage', 'float32'),
+            **kwargs
+        )
+        vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r' if mmap else None)
+        index._vectors = vectors if mmap else np.ascontiguousarray(vectors)
+        if index.storage == 'int8':
+            index._scales = np.load(os.path.join(path, 'scales.npy'))
+        full_path = os.path.join(path, 'full.npy')
+        if index._full is not None:
+            index._full = np.load(full_path, mmap_mode='r') if os.path.exists(full_path) else None
+        index._docs = meta['docs']
+        index._size = len(index._docs)
+        index._alive = np.ones(index._size, dtype=bool)
+        index._positions = {doc[index.key_field]: i for i, doc in enumerate(index._docs)}
+        index._maybe_build_ivf()
+        return index
+
+
+# ============================================================================
+# SERVIDOR HTTP (drop-in para el nodo "Búsqueda Vectorial")
+# ============================================================================
+
+def serve(index: LocalVectorIndex, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Exponer el índice con las rutas de Azure AI Search
+
+    - POST /indexes/{nombre}/docs/search
+    - POST /indexes/{nombre}/docs/index
+
+    Basta con apuntar AZURE_SEARCH_ENDPOINT a http://host:port.
+    """
+    route = re.compile(r'^/indexes/[^/]+/docs/(search|index)')
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            match = route.match(self.path)
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not match:
+                    status, result = 404, {'error': {'message': 'Ruta no encontrada'}}
+                elif match.group(1) == 'search':
+                    status, result = 200, index.search(body)
+                else:
+                    status, result = 200, index.index(body)
+            except (ValueError, KeyError) as e:
+                status, result = 400, {'error': {'message': str(e)}}
+            raw = json.dumps(result, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def synthetic_corpus(n: int, dimensions: int, clusters: int = 256, seed: int = 42) -> np.ndarray:
+    """Corpus sintético con estructura de clusters (similar a embeddings reales)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dimensions)).astype(np.float32) * 2.0
+    return normalize_rows(centers[labels] + noise)
+
+
+def benchmark(n_docs: int = 100_000, dimensions: int = 256, n_queries: int = 200, k: int = 10) -> Dict:
+    """
+    Medir QPS de búsqueda exacta e IVF, y recall@k del IVF contra la exacta
+
+    Returns:
+        Diccionario con los resultados
+    """
+    corpus = synthetic_corpus(n_docs + n_queries, dimensions)
+    vectors, queries = corpus[:n_docs], corpus[n_docs:]
+
+    index = LocalVectorIndex(dimensions=dimensions, ivf_threshold=None)
+    start = time.perf_counter()
+    for offset in range(0, n_docs, 10_000):
+        block = vectors[offset:offset + 10_000]
+        index.upload_documents([
+            {'chunk_id': f'c{offset + i}', 'content_vector': v} for i, v in enumerate(block)
+        ])
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact = [[r for r, _ in index.search_vector(q, k, exhaustive=True)] for q in queries]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.build_ivf()
+    build_time = time.perf_counter() - start
+
+    results = {
+        'n_docs': n_docs,
+        'dimensions': dimensions,
+        'k': k,
+        'load_s': load_time,
+        'exact_qps': n_queries / exact_time,
+        'ivf_build_s': build_time,
+        'ivf': []
+    }
+    for nprobe in (4, 8, 16, 32):
+        start = time.perf_counter()
+        approx = [[r for r, _ in index.search_vector(q, k, nprobe=nprobe)] for q in queries]
+        elapsed = time.perf_counter() - start
+        recall = np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)])
+        results['ivf'].append({'nprobe': nprobe, 'qps': n_queries / elapsed, 'recall': float(recall)})
+    return results
+
+
+def print_benchmark(results: Dict):
+    """Imprimir resultados del benchmark"""
+    print("\n" + "="*80)
+    print(f"📊 BENCHMARK ÍNDICE VECTORIAL LOCAL "
+          f"({results['n_docs']:,} docs × {results['dimensions']} dims, k={results['k']})")
+    print("="*80)
+    print(f"\n⏱️  Carga: {results['load_s']:.2f}s | Construcción IVF: {results['ivf_build_s']:.2f}s")
+    print(f"\n{'Modo':<20}{'QPS':>12}{'Recall@k':>12}")
+    print("─"*44)
+    print(f"{'Exacto':<20}{results['exact_qps']:>12.1f}{1.0:>12.3f}")
+    for row in results['ivf']:
+        print(f"{'IVF nprobe=' + str(row['nprobe']):<20}{row['qps']:>12.1f}{row['recall']:>12.3f}")
+    print("\n" + "="*80 + "\n")
+
+
+def benchmark_quantization(
+    vectors: Optional[np.ndarray] = None,
+    n_docs: int = 20_000,
+    dimensions: int = 1536,
+    n_queries: int = 100,
+    k: int = 10
+) -> Dict:
+    """
+    Comparar memoria, QPS y recall@k de float32, float16 e int8 (con y sin re-puntuación)
+
+    Args:
+        vectors: Corpus real (n × dims); si es None se genera uno sintético
+    """
+    rng = np.random.default_rng(7)
+    if vectors is None:
+        corpus = synthetic_corpus(n_docs + n_queries, dimensions)
+        vectors, queries = corpus[:n_docs], corpus[n_docs:]
+    else:
+        vectors = normalize_rows(vectors)
+        picks = vectors[rng.choice(len(vectors), size=n_queries, replace=False)]
+        queries = normalize_rows(picks + rng.standard_normal(picks.shape).astype(np.float32) * 0.05)
+    docs = [{'chunk_id': f'c{i}', 'content_vector': v} for i, v in enumerate(vectors)]
+
+    rows = []
+    truth = None
+    for storage, rescore in (('float32', False), ('float16', False), ('float16', True),
+                             ('int8', False), ('int8', True)):
+        index = LocalVectorIndex(
+            dimensions=vectors.shape[1],
+            storage=storage,
+            keep_full_precision=rescore
+        )
+        index.upload_documents(docs)
+        start = time.perf_counter()
+        found = [[r for r, _ in index.search_vector(q, k, exhaustive=True)] for q in queries]
+        elapsed = time.perf_counter() - start
+        if truth is None:
+            truth = found
+        recall = np.mean([len(set(a) & set(t)) / k for a, t in zip(found, truth)])
+        rows.append({
+            'storage': storage,
+            'rescore': rescore,
+            'memory_mb': index.memory_bytes() / 1024 / 1024,
+            'codes_mb': index._vectors[:index._size].nbytes / 1024 / 1024,
+            'qps': n_queries / elapsed,
+            'recall': float(recall)
+        })
+    return {'n_docs': len(vectors), 'dimensions': vectors.shape[1], 'k': k, 'modes': rows}
+
+
+def print_quantization_benchmark(results: Dict):
+    """Imprimir la comparación de formatos de almacenamiento"""
+    print("\n" + "="*80)
+    print(f"📊 CUANTIZACIÓN DE EMBEDDINGS "
+          f"({results['n_docs']:,} docs × {results['dimensions']} dims, k={results['k']})")
+    print("="*80)
+    print(f"\n{'Formato':<22}{'Códigos MB':>12}{'RAM MB':>10}{'QPS':>10}{'Recall@k':>11}")
+    print("─"*65)
+    for row in results['modes']:
+        label = row['storage'] + (' + rescore' if row['rescore'] else '')
+        print(f"{label:<22}{row['codes_mb']:>12.1f}{row['memory_mb']:>10.1f}"
+              f"{row['qps']:>10.1f}{row['recall']:>11.3f}")
+    print("\n💡 La copia float32 para re-puntuar puede quedarse en disco (load() la abre con memmap)")
+    print("\n" + "="*80 + "\n")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        print_benchmark(benchmark(n_docs=n))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--benchmark-quant':
+        corpus_vectors = None
+        if len(sys.argv) > 2:
+            saved = LocalVectorIndex.load(sys.argv[2])
+            corpus_vectors = saved._float_rows(slice(0, saved._size))
+        print_quantization_benchmark(benchmark_quantization(corpus_vectors))
+    elif len(sys.argv) > 2 and sys.argv[1] == '--serve':
+        idx = LocalVectorIndex.load(sys.argv[2])
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+        srv = serve(idx, port=port)
+        print(f"🔍 Índice local ({len(idx):,} docs) en http://127.0.0.1:{port}")
+        print("   Apunta AZURE_SEARCH_ENDPOINT a esa URL. Ctrl-C para salir.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.shutdown()
+    else:
+        print("\nUso:")
+        print("  python3 scripts/local_vector_index.py --benchmark [n_docs]")
+        print("  python3 scripts/local_vector_index.py --benchmark-quant [directorio_indice]")
+        print("  python3 scripts/local_vector_index.py --serve <directorio_indice> [puerto]\n")
@@ -6,43 +6,148 @@ Fecha: 2025-10-21
 
 import requests
 import json
-from typing import Dict, List, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime, timezone
+
+# Máximo de elementos por página que acepta el API público de n8n
+MAX_PAGE_SIZE = 250
+
+# Segundos máximos de espera por llamada al API (conexión + lectura)
+DEFAULT_TIMEOUT = 30
+
+# Campos que acepta PUT /workflows/{id}; el resto (id, active, versionId...) es de solo lectura
+WRITABLE_WORKFLOW_FIELDS = ('name', 'nodes', 'connections', 'settings', 'staticData')
 
 class N8nManager:
     """Clase para gestionar workflows en n8n"""
     
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, timeout: float = DEFAULT_TIMEOUT):
         """
         Inicializar el gestor de n8n
         
         Args:
             base_url: URL base del servidor n8n (ej: http://159.203.149.247:5678)
             api_key: API Key de n8n
+            timeout: Segundos máximos por llamada al API
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
+        self.timeout = timeout
         self.headers = {
             'X-N8N-API-KEY': api_key,
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         }
+        # Conexión reutilizada entre páginas (keep-alive)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
     
-    def list_workflows(self) -> List[Dict]:
-        """Listar todos los workflows"""
-        response = requests.get(
-            f"{self.base_url}/api/v1/workflows",
-            headers=self.headers
-        )
+    def _get_page(self, path: str, params: Dict) -> Dict:
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
         response.raise_for_status()
-        return response.json()['data']
+        return response.json()
+    
+    def _paginate(self, path: str, params: Dict, prefetch: bool = True) -> Iterator[Dict]:
+        """
+        Recorrer un listado paginado siguiendo nextCursor
+        
+        Con prefetch, la página siguiente se descarga en segundo plano mientras
+        se consumen los elementos de la actual. Solo hay una o dos páginas en
+        memoria a la vez.
+        """
+        params = {k: v for k, v in params.items() if v is not None}
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = self._get_page(path, params)
+            while True:
+                cursor = page.get('nextCursor')
+                upcoming = None
+                if cursor and executor:
+                    upcoming = executor.submit(self._get_page, path, {**params, 'cursor': cursor})
+                yield from page.get('data', [])
+                if not cursor:
+                    return
+                page = upcoming.result() if upcoming else self._get_page(path, {**params, 'cursor': cursor})
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def iter_workflows(
+        self,
+        active: Optional[bool] = None,
+        tags: Optional[str] = None,
+        name: Optional[str] = None,
+        page_size: int = MAX_PAGE_SIZE,
+        prefetch: bool = True
+    ) -> Iterator[Dict]:
+        """
+        Iterar todos los workflows página por página
+        
+        Args:
+            active: Filtrar por estado (filtro del servidor)
+            tags: Tags separados por coma (filtro del servidor)
+            name: Nombre exacto (filtro del servidor)
+            page_size: Elementos por página (máximo 250)
+            prefetch: Descargar la página siguiente en segundo plano
+        """
+        params = {
+            'limit': min(page_size, MAX_PAGE_SIZE),
+            'active': None if active is None else str(active).lower(),
+            'tags': tags,
+            'name': name
+        }
+        return self._paginate("/api/v1/workflows", params, prefetch)
+    
+    def iter_executions(
+        self,
+        workflow_id: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        include_data: bool = False,
+        page_size: int = MAX_PAGE_SIZE,
+        prefetch: bool = True
+    ) -> Iterator[Dict]:
+        """
+        Iterar ejecuciones de la más reciente a la más antigua
+        
+        Args:
+            workflow_id: Filtrar por workflow (filtro del servidor)
+            status: 'success', 'error' o 'waiting' (filtro del servidor)
+            since: ISO-8601; la iteración se detiene al llegar a ejecuciones
+                anteriores (el API no filtra por fecha, pero sí ordena)
+            until: ISO-8601; se omiten las ejecuciones posteriores
+            include_data: Incluir los datos de ejecución de cada nodo
+            page_size: Elementos por página (máximo 250)
+            prefetch: Descargar la página siguiente en segundo plano
+        """
+        params = {
+            'limit': min(page_size, MAX_PAGE_SIZE),
+            'workflowId': workflow_id,
+            'status': status,
+            'includeData': 'true' if include_data else None
+        }
+        since_dt = _parse_timestamp(since) if since else None
+        until_dt = _parse_timestamp(until) if until else None
+        for execution in self._paginate("/api/v1/executions", params, prefetch):
+            started = execution.get('startedAt')
+            if started and (since_dt or until_dt):
+                started_dt = _parse_timestamp(started)
+                if since_dt and started_dt < since_dt:
+                    return
+                if until_dt and started_dt > until_dt:
+                    continue
+            yield execution
+    
+    def list_workflows(self) -> List[Dict]:
+        """Listar todos los workflows (todas las páginas)"""
+        return list(self.iter_workflows())
     
     def get_workflow(self, workflow_id: str) -> Dict:
         """Obtener un workflow específico"""
-        response = requests.get(
-            f"{self.base_url}/api/v1/workflows/{workflow_id}",
-            headers=self.headers
-        )
+        response = self.session.get(f"{self.base_url}/api/v1/workflows/{workflow_id}", timeout=self.timeout)
         response.raise_for_status()
         return response.json()
     
@@ -53,44 +158,45 @@ class N8nManager:
         Args:
             workflow_data: Definición del workflow en formato JSON
         """
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/v1/workflows",
-            headers=self.headers,
-            json=workflow_data
+            json=workflow_data,
+            timeout=self.timeout
         )
         response.raise_for_status()
         return response.json()
     
     def update_workflow(self, workflow_id: str, workflow_data: Dict) -> Dict:
-        """Actualizar un workflow existente"""
-        response = requests.patch(
+        """Actualizar un workflow existente (solo se envían los campos editables)"""
+        payload = {k: v for k, v in workflow_data.items() if k in WRITABLE_WORKFLOW_FIELDS}
+        response = self.session.put(
             f"{self.base_url}/api/v1/workflows/{workflow_id}",
-            headers=self.headers,
-            json=workflow_data
+            json=payload,
+            timeout=self.timeout
         )
         response.raise_for_status()
         return response.json()
     
     def delete_workflow(self, workflow_id: str) -> bool:
         """Eliminar un workflow"""
-        response = requests.delete(
+        response = self.session.delete(
             f"{self.base_url}/api/v1/workflows/{workflow_id}",
-            headers=self.headers
+            timeout=self.timeout
         )
         response.raise_for_status()
         return True
     
     def activate_workflow(self, workflow_id: str) -> Dict:
-        """Activar un workflow"""
-        workflow = self.get_workflow(workflow_id)
-        workflow['active'] = True
-        return self.update_workflow(workflow_id, workflow)
+        """Activar un workflow (una sola llamada, sin reenviar la definición)"""
+        response = self.session.post(f"{self.base_url}/api/v1/workflows/{workflow_id}/activate", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
     
     def deactivate_workflow(self, workflow_id: str) -> Dict:
         """Desactivar un workflow"""
-        workflow = self.get_workflow(workflow_id)
-        workflow['active'] = False
-        return self.update_workflow(workflow_id, workflow)
+        response = self.session.post(f"{self.base_url}/api/v1/workflows/{workflow_id}/deactivate", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
     
     def execute_workflow(self, workflow_id: str, input_data: Optional[Dict] = None) -> Dict:
         """
@@ -104,36 +210,54 @@ class N8nManager:
         if input_data:
             payload['data'] = input_data
             
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/v1/executions",
-            headers=self.headers,
-            json=payload
+            json=payload,
+            timeout=self.timeout
         )
         response.raise_for_status()
         return response.json()
     
-    def get_execution(self, execution_id: str) -> Dict:
-        """Obtener detalles de una ejecución"""
-        response = requests.get(
+    def get_execution(self, execution_id: str, include_data: bool = False) -> Dict:
+        """
+        Obtener detalles de una ejecución
+        
+        Args:
+            execution_id: ID de la ejecución
+            include_data: Incluir runData por nodo (tiempos, items, salidas)
+        """
+        response = self.session.get(
             f"{self.base_url}/api/v1/executions/{execution_id}",
-            headers=self.headers
+            params={'includeData': 'true'} if include_data else None,
+            timeout=self.timeout
         )
         response.raise_for_status()
         return response.json()
     
     def list_executions(self, workflow_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
-        """Listar ejecuciones"""
-        params = {'limit': limit}
-        if workflow_id:
-            params['workflowId'] = workflow_id
-            
-        response = requests.get(
-            f"{self.base_url}/api/v1/executions",
-            headers=self.headers,
-            params=params
+        """Listar las `limit` ejecuciones más recientes (sigue el cursor si limit > 250)"""
+        executions = self.iter_executions(
+            workflow_id=workflow_id,
+            page_size=limit,
+            prefetch=limit > MAX_PAGE_SIZE
         )
-        response.raise_for_status()
-        return response.json()['data']
+        return list(islice(executions, limit))
+    
+    def profile_workflow(
+        self,
+        workflow_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 200
+    ) -> Dict:
+        """
+        Perfil de tiempos por nodo de las ejecuciones de un workflow
+        
+        Ver execution_profiler.profile_executions.
+        """
+        from execution_profiler import profile_executions
+        
+        return profile_executions(self, workflow_id, since=since, until=until, limit=limit)
     
     def export_workflow(self, workflow_id: str, filepath: str):
         """Exportar un workflow a un archivo JSON"""
@@ -178,6 +302,14 @@ class N8nManager:
 # FUNCIONES AUXILIARES
 # ============================================================================
 
+def _parse_timestamp(value: str) -> datetime:
+    """Interpretar un timestamp ISO-8601 de n8n (con 'Z' o con offset)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
 def create_rag_ingestion_workflow() -> Dict:
     """
     Crear definición del workflow de ingesta de documentos RAG
@@ -204,7 +336,7 @@ def create_rag_ingestion_workflow() -> Dict:
             },
             {
                 "parameters": {
-                    "jsCode": "// Calcular hash del documento para detectar duplicados\nconst crypto = require('crypto');\n\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  let hash = '';\n  \n  // Si viene como binary data\n  if (item.binary && item.binary.data) {\n    const buffer = Buffer.from(item.binary.data.data);\n    hash = crypto.createHash('sha256').update(buffer).digest('hex');\n  } \n  // Si viene como base64 string\n  else if (item.json.file_base64) {\n    const buffer = Buffer.from(item.json.file_base64, 'base64');\n    hash = crypto.createHash('sha256').update(buffer).digest('hex');\n  }\n  \n  output.push({\n    json: {\n      ...item.json,\n      document_hash: hash,\n      document_id: `doc_${hash.substring(0, 12)}`,\n      timestamp: new Date().toISOString()\n    },\n    binary: item.binary\n  });\n}\n\nreturn output;"
+                    "jsCode": "// Calcular hash del documento para detectar duplicados\nconst crypto = require('crypto');\n\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  // El archivo no se guarda en Cosmos DB: solo viaja hasta aquí\n  const { file_base64, ...fields } = item.json;\n  let hash = '';\n  \n  // Si viene como binary data\n  if (item.binary && item.binary.data) {\n    const buffer = Buffer.from(item.binary.data.data);\n    hash = crypto.createHash('sha256').update(buffer).digest('hex');\n  } \n  // Si viene como base64 string\n  else if (file_base64) {\n    const buffer = Buffer.from(file_base64, 'base64');\n    hash = crypto.createHash('sha256').update(buffer).digest('hex');\n  }\n  \n  output.push({\n    json: {\n      ...fields,\n      document_hash: hash,\n      document_id: `doc_${hash.substring(0, 12)}`,\n      timestamp: new Date().toISOString()\n    },\n    binary: item.binary\n  });\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -218,7 +350,7 @@ def create_rag_ingestion_workflow() -> Dict:
                     "url": "={{ $env.COSMOS_DB_ENDPOINT }}/dbs/{{ $env.COSMOS_DB_DATABASE }}/colls/documents_metadata/docs",
                     "authentication": "genericCredentialType",
                     "genericAuthType": "httpHeaderAuth",
-                    "sendHeaders": true,
+                    "sendHeaders": True,
                     "headerParameters": {
                         "parameters": [
                             {
@@ -231,7 +363,7 @@ def create_rag_ingestion_workflow() -> Dict:
                             }
                         ]
                     },
-                    "sendBody": true,
+                    "sendBody": True,
                     "bodyParameters": {
                         "parameters": [
                             {
@@ -256,7 +388,7 @@ def create_rag_ingestion_workflow() -> Dict:
                             }
                         ]
                     },
-                    "options": {}
+                    "options": {"timeout": 30000}
                 },
                 "type": "n8n-nodes-base.httpRequest",
                 "typeVersion": 4.2,
@@ -289,7 +421,8 @@ def create_rag_ingestion_workflow() -> Dict:
         },
         "active": False,
         "settings": {
-            "executionOrder": "v1"
+            "executionOrder": "v1",
+            "executionTimeout": 300
         }
     }
 
@@ -318,7 +451,7 @@ def create_rag_query_workflow() -> Dict:
                     "url": "={{ $env.AZURE_OPENAI_ENDPOINT }}/openai/deployments/{{ $env.AZURE_OPENAI_EMBEDDING_DEPLOYMENT }}/embeddings?api-version=2023-05-15",
                     "authentication": "genericCredentialType",
                     "genericAuthType": "httpHeaderAuth",
-                    "sendBody": true,
+                    "sendBody": True,
                     "bodyParameters": {
                         "parameters": [
                             {
@@ -327,7 +460,7 @@ def create_rag_query_workflow() -> Dict:
                             }
                         ]
                     },
-                    "options": {}
+                    "options": {"timeout": 30000}
                 },
                 "type": "n8n-nodes-base.httpRequest",
                 "typeVersion": 4.2,
@@ -341,7 +474,7 @@ def create_rag_query_workflow() -> Dict:
                     "url": "={{ $env.AZURE_SEARCH_ENDPOINT }}/indexes/{{ $env.AZURE_SEARCH_INDEX }}/docs/search?api-version=2023-11-01",
                     "authentication": "genericCredentialType",
                     "genericAuthType": "httpHeaderAuth",
-                    "sendBody": true,
+                    "sendBody": True,
                     "bodyParameters": {
                         "parameters": [
                             {
@@ -358,7 +491,7 @@ def create_rag_query_workflow() -> Dict:
                             }
                         ]
                     },
-                    "options": {}
+                    "options": {"timeout": 30000}
                 },
                 "type": "n8n-nodes-base.httpRequest",
                 "typeVersion": 4.2,
@@ -391,7 +524,8 @@ def create_rag_query_workflow() -> Dict:
         },
         "active": False,
         "settings": {
-            "executionOrder": "v1"
+            "executionOrder": "v1",
+            "executionTimeout": 60
         }
     }
 
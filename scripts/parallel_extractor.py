@@ -0,0 +1,335 @@
+"""
+Parallel Extractor - Extracción por rangos de páginas en paralelo para PDFs grandes
+Divide el documento en rangos, los extrae a la vez (pool de procesos con PyPDF2
+o llamadas paralelas a Document Intelligence) y entrega las páginas en orden
+apenas están listas, para que el chunking empiece sin esperar al documento completo
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from extraction_cache import ExtractionCache
+
+# Extractor de un rango: (ruta, primera página, página final exclusiva) → textos por página
+RangeExtractor = Callable[[str, int, int], List[str]]
+
+
+def page_ranges(n_pages: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    """Rangos [inicio, fin) de como máximo pages_per_range páginas"""
+    return [(start, min(start + pages_per_range, n_pages)) for start in range(0, n_pages, pages_per_range)]
+
+
+def count_pdf_pages(path: str) -> int:
+    """Número de páginas de un PDF"""
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def pypdf2_extract_range(path: str, start: int, end: int) -> List[str]:
+    """
+    Extraer texto de las páginas [start, end) con PyPDF2
+
+    Es una función de módulo para poder ejecutarse en un ProcessPoolExecutor;
+    cada proceso abre su propio lector.
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or '') for i in range(start, end)]
+
+
+class DocumentIntelligenceExtractor:
+    """
+    Extractor de rangos contra Azure Document Intelligence (Form Recognizer)
+
+    Usa el parámetro `pages` del análisis para pedir solo el rango; cada
+    rango es una operación independiente y pueden ir varias en paralelo.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        model: str = "prebuilt-read",
+        api_version: str = "2023-07-31",
+        poll_interval: float = 1.0,
+        timeout: int = 300
+    ):
+        self.url = (f"{endpoint.rstrip('/')}/formrecognizer/documentModels/{model}:analyze"
+                    f"?api-version={api_version}")
+        self.headers = {'Ocp-Apim-Subscription-Key': api_key, 'Content-Type': 'application/pdf'}
+        self.poll_headers = {'Ocp-Apim-Subscription-Key': api_key}
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.version = f"{model}@{api_version}"
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'DocumentIntelligenceExtractor':
+        """Crear el extractor con AZURE_FORM_RECOGNIZER_* de config_template.env"""
+        options = {
+            'endpoint': os.getenv('AZURE_FORM_RECOGNIZER_ENDPOINT', ''),
+            'api_key': os.getenv('AZURE_FORM_RECOGNIZER_KEY', '')
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def __call__(self, path: str, start: int, end: int) -> List[str]:
+        with open(path, 'rb') as f:
+            content = f.read()
+        response = requests.post(
+            f"{self.url}&pages={start + 1}-{end}",
+            headers=self.headers,
+            data=content,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        operation = response.headers['Operation-Location']
+
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            time.sleep(self.poll_interval)
+            result = requests.get(operation, headers=self.poll_headers, timeout=30).json()
+            status = result.get('status')
+            if status == 'succeeded':
+                pages = {p['pageNumber']: '\n'.join(line['content'] for line in p.get('lines', []))
+                         for p in result['analyzeResult'].get('pages', [])}
+                return [pages.get(number, '') for number in range(start + 1, end + 1)]
+            if status == 'failed':
+                raise RuntimeError(f"Análisis fallido páginas {start + 1}-{end}: {result.get('error')}")
+        raise TimeoutError(f"Análisis sin terminar páginas {start + 1}-{end}")
+
+
+def chunk_stream(pages: Iterator[str], chunk_size: int = 500, overlap: int = 50) -> Iterator[str]:
+    """
+    Chunking incremental sobre un flujo de páginas
+
+    Produce los mismos chunks que dividir el texto completo (tamaño fijo con
+    solapamiento), pero emite cada uno en cuanto hay texto suficiente.
+    """
+    buffer = ''
+    for number, page in enumerate(pages):
+        buffer += page if number == 0 else '\n' + page
+        while len(buffer) >= chunk_size + overlap:
+            yield buffer[:chunk_size]
+            buffer = buffer[chunk_size - overlap:]
+    while buffer:
+        yield buffer[:chunk_size]
+        if len(buffer) <= chunk_size:
+            break
+        buffer = buffer[chunk_size - overlap:]
+
+
+class ParallelExtractor:
+    """
+    Extracción concurrente por rangos de páginas con límites por documento y global
+
+    El límite global es el tamaño del pool compartido por todos los
+    documentos; el límite por documento acota cuántos rangos de un mismo
+    archivo están en vuelo, para que un PDF de 300 páginas no acapare el pool.
+    """
+
+    def __init__(
+        self,
+        extractor: RangeExtractor = pypdf2_extract_range,
+        extractor_version: str = "pypdf2-3.0.1",
+        pages_per_range: int = 10,
+        per_document_limit: int = 4,
+        global_limit: Optional[int] = None,
+        use_processes: Optional[bool] = None,
+        cache: Optional[ExtractionCache] = None,
+        page_counter: Callable[[str], int] = count_pdf_pages
+    ):
+        """
+        Args:
+            extractor: Función que extrae un rango de páginas
+            extractor_version: Versión del extractor (llave del caché)
+            pages_per_range: Páginas por rango
+            per_document_limit: Rangos simultáneos de un mismo documento
+            global_limit: Rangos simultáneos en total (por defecto, núcleos de CPU)
+            use_processes: Pool de procesos (extracción local) o de hilos (servicio remoto);
+                por defecto procesos solo para pypdf2_extract_range
+            cache: Caché de extracciones; si el documento ya está, no se extrae
+            page_counter: Función que cuenta las páginas del documento
+        """
+        self.extractor = extractor
+        self.extractor_version = getattr(extractor, 'version', extractor_version)
+        self.extractor_name = getattr(extractor, '__name__', type(extractor).__name__)
+        self.pages_per_range = pages_per_range
+        self.per_document_limit = per_document_limit
+        self.global_limit = global_limit or os.cpu_count() or 4
+        if use_processes is None:
+            use_processes = extractor is pypdf2_extract_range
+        self.cache = cache
+        self.page_counter = page_counter
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=self.global_limit) if use_processes
+            else ThreadPoolExecutor(max_workers=self.global_limit)
+        )
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict] = {}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_pages(self, path: str, document_hash: Optional[str] = None) -> Iterator[str]:
+        """
+        Texto de cada página, en orden, a medida que terminan los rangos
+
+        Con caché y document_hash, un documento ya extraído se entrega desde
+        el caché; uno nuevo se guarda al terminar.
+        """
+        started = time.perf_counter()
+        record = {'pages': 0, 'ranges': 0, 'cached': False, 'first_page_s': None, 'total_s': None}
+        with self._lock:
+            self.stats[path] = record
+
+        if self.cache is not None and document_hash:
+            cached = self.cache.get(document_hash, self.extractor_name, self.extractor_version)
+            if cached is not None:
+                record['cached'] = True
+                for page in cached.get('pages', []):
+                    if record['first_page_s'] is None:
+                        record['first_page_s'] = time.perf_counter() - started
+                    record['pages'] += 1
+                    yield page['text']
+                record['total_s'] = time.perf_counter() - started
+                return
+
+        ranges = page_ranges(self.page_counter(path), self.pages_per_range)
+        record['ranges'] = len(ranges)
+        pending = iter(ranges)
+        in_flight = []
+        extracted: List[str] = []
+
+        def submit_next():
+            rng = next(pending, None)
+            if rng is not None:
+                in_flight.append(self._executor.submit(self.extractor, path, *rng))
+
+        for _ in range(self.per_document_limit):
+            submit_next()
+        try:
+            while in_flight:
+                # Siempre se espera el rango más antiguo: las páginas salen en orden
+                texts = in_flight.pop(0).result()
+                submit_next()
+                for text in texts:
+                    if record['first_page_s'] is None:
+                        record['first_page_s'] = time.perf_counter() - started
+                    record['pages'] += 1
+                    extracted.append(text)
+                    yield text
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+        record['total_s'] = time.perf_counter() - started
+        if self.cache is not None and document_hash:
+            self.cache.put(
+                document_hash, self.extractor_name, self.extractor_version,
+                {'text': '\n'.join(extracted),
+                 'pages': [{'page': i + 1, 'text': t} for i, t in enumerate(extracted)],
+                 'tables': []},
+                record['total_s']
+            )
+
+    def iter_chunks(
+        self,
+        path: str,
+        document_hash: Optional[str] = None,
+        chunk_size: int = 500,
+        overlap: int = 50
+    ) -> Iterator[str]:
+        """Chunks del documento emitidos mientras la extracción sigue en curso"""
+        started = time.perf_counter()
+        record = None
+        for chunk in chunk_stream(self.iter_pages(path, document_hash), chunk_size, overlap):
+            if record is None:
+                record = self.stats[path]
+                record['first_chunk_s'] = time.perf_counter() - started
+            yield chunk
+
+    def extract(self, path: str, document_hash: Optional[str] = None) -> Dict:
+        """Extracción completa: {"text", "pages", "stats"}"""
+        pages = list(self.iter_pages(path, document_hash))
+        return {
+            'text': '\n'.join(pages),
+            'pages': [{'page': i + 1, 'text': t} for i, t in enumerate(pages)],
+            'stats': dict(self.stats[path])
+        }
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+class _SimulatedOCR:
+    """Extractor sintético: latencia fija por página, como un servicio de OCR"""
+
+    version = "simulated-1"
+
+    def __init__(self, seconds_per_page: float):
+        self.seconds_per_page = seconds_per_page
+
+    def __call__(self, path: str, start: int, end: int) -> List[str]:
+        time.sleep(self.seconds_per_page * (end - start))
+        return [f"Página {i + 1} de {path}. " + "Texto escaneado de contrato. " * 60 for i in range(start, end)]
+
+
+def benchmark(n_pages: int = 300, seconds_per_page: float = 0.01, per_document_limit: int = 8) -> Dict:
+    """Tiempo total y tiempo al primer chunk: documento completo vs rangos en paralelo"""
+    ocr = _SimulatedOCR(seconds_per_page)
+    results = {'n_pages': n_pages}
+    for label, pages_per_range, limit in (('serial', n_pages, 1), ('parallel', 10, per_document_limit)):
+        with ParallelExtractor(ocr, pages_per_range=pages_per_range, per_document_limit=limit,
+                               global_limit=limit, page_counter=lambda _: n_pages) as extractor:
+            start = time.perf_counter()
+            chunks = sum(1 for _ in extractor.iter_chunks('contrato.pdf'))
+            results[f'{label}_s'] = time.perf_counter() - start
+            results[f'{label}_first_chunk_s'] = extractor.stats['contrato.pdf']['first_chunk_s']
+            results['chunks'] = chunks
+    return results
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+        results = benchmark(n_pages=n)
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK EXTRACCIÓN POR PÁGINAS ({results['n_pages']} páginas, {results['chunks']:,} chunks)")
+        print("="*80)
+        print(f"\n🐢 Documento completo: {results['serial_s']:.2f}s "
+              f"(primer chunk a los {results['serial_first_chunk_s']:.2f}s)")
+        print(f"⚡ Rangos en paralelo: {results['parallel_s']:.2f}s "
+              f"(primer chunk a los {results['parallel_first_chunk_s']:.2f}s)")
+        print("\n" + "="*80 + "\n")
+    elif len(sys.argv) > 1:
+        path = sys.argv[1]
+        with ParallelExtractor(per_document_limit=int(sys.argv[2]) if len(sys.argv) > 2 else 4) as extractor:
+            chunks = sum(1 for _ in extractor.iter_chunks(path))
+            stats = extractor.stats[path]
+        print(f"\n📄 {path}: {stats['pages']} páginas, {chunks:,} chunks en {stats['total_s']:.2f}s")
+        print(f"   └─ Primer chunk: {stats.get('first_chunk_s', 0):.2f}s\n")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/parallel_extractor.py <documento.pdf> [rangos_por_documento]")
+        print("  python3 scripts/parallel_extractor.py --benchmark [páginas]\n")
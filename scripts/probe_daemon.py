@@ -0,0 +1,685 @@
+"""
+Probe Daemon - Sondas sintéticas continuas contra los webhooks del RAG
+Envía periódicamente consultas representativas (texto, documento, multimodal)
+y feedback, mantiene histogramas de latencia en ventanas móviles con memoria
+acotada, detecta degradaciones con reglas simples (SLO, tasa de error y cambio
+de la mediana respecto a la línea base) y publica el estado en un endpoint
+HTTP local (/metrics en formato Prometheus y /status en JSON)
+"""
+
+import base64
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rag_advanced_client import build_query_payload
+
+# Límites superiores (ms) de los buckets: escala logarítmica de 10 ms a ~4.5 min
+LATENCY_BOUNDS_MS = tuple(round(10 * 1.3 ** i, 1) for i in range(40))
+
+PROBE_QUESTIONS = [
+    "¿Qué es el Banco Caja Social?",
+    "¿Cuáles son los requisitos para abrir una cuenta de ahorros?",
+    "¿Cómo solicito un crédito de vivienda?",
+    "¿Qué documentos necesito para actualizar mis datos?",
+]
+
+PROBE_DOCUMENT = (
+    "Documento sintético de monitoreo. El cliente solicita información sobre "
+    "las condiciones de la cuenta de ahorros y los costos de manejo. "
+) * 20
+
+# PNG de 1x1 píxel: suficiente para ejercitar la rama de imágenes del workflow
+PROBE_IMAGE_BASE64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+class RollingHistogram:
+    """
+    Histograma de latencia sobre una ventana móvil de tiempo
+
+    La ventana se divide en ranuras de `slot_s` segundos, cada una con un
+    conteo por bucket; la memoria es fija (ranuras × buckets) sin importar
+    cuántas muestras se registren. Los percentiles se estiman interpolando
+    dentro del bucket que contiene el rango buscado.
+    """
+
+    def __init__(
+        self,
+        window_s: float = 900,
+        slot_s: float = 10,
+        bounds: Tuple[float, ...] = LATENCY_BOUNDS_MS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            window_s: Duración de la ventana en segundos
+            slot_s: Resolución de la ventana (las muestras expiran por ranura)
+            bounds: Límites superiores de los buckets en ms (el último bucket es +Inf)
+            clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.window_s = window_s
+        self.slot_s = slot_s
+        self.bounds = bounds
+        self.clock = clock
+        self.n_slots = max(1, int(round(window_s / slot_s)))
+        self._counts = [[0] * (len(bounds) + 1) for _ in range(self.n_slots)]
+        self._sums = [0.0] * self.n_slots
+        self._errors = [0] * self.n_slots
+        self._epochs = [-1] * self.n_slots
+        self._lock = threading.Lock()
+
+    def _slot(self, now: float) -> int:
+        epoch = int(now // self.slot_s)
+        index = epoch % self.n_slots
+        if self._epochs[index] != epoch:
+            self._counts[index] = [0] * (len(self.bounds) + 1)
+            self._sums[index] = 0.0
+            self._errors[index] = 0
+            self._epochs[index] = epoch
+        return index
+
+    def _bucket(self, latency_ms: float) -> int:
+        low, high = 0, len(self.bounds)
+        while low < high:
+            mid = (low + high) // 2
+            if latency_ms <= self.bounds[mid]:
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def record(self, latency_ms: Optional[float], ok: bool = True):
+        """
+        Registrar una muestra
+
+        Args:
+            latency_ms: Latencia observada (se ignora si la llamada falló)
+            ok: False cuenta la muestra como error sin afectar la latencia
+        """
+        with self._lock:
+            index = self._slot(self.clock())
+            if not ok:
+                self._errors[index] += 1
+                return
+            self._counts[index][self._bucket(latency_ms)] += 1
+            self._sums[index] += latency_ms
+
+    def merged(self, max_age_s: Optional[float] = None, min_age_s: float = 0) -> Tuple[List[int], int, float]:
+        """
+        Sumar las ranuras cuya edad está entre min_age_s y max_age_s
+
+        Returns:
+            (conteos por bucket, errores, suma de latencias)
+        """
+        max_age_s = self.window_s if max_age_s is None else min(max_age_s, self.window_s)
+        counts = [0] * (len(self.bounds) + 1)
+        errors = 0
+        total = 0.0
+        with self._lock:
+            current = int(self.clock() // self.slot_s)
+            for index in range(self.n_slots):
+                age = (current - self._epochs[index]) * self.slot_s
+                if self._epochs[index] < 0 or age < min_age_s or age >= max_age_s:
+                    continue
+                for bucket, count in enumerate(self._counts[index]):
+                    counts[bucket] += count
+                errors += self._errors[index]
+                total += self._sums[index]
+        return counts, errors, total
+
+    def _percentile(self, counts: List[int], q: float) -> Optional[float]:
+        n = sum(counts)
+        if n == 0:
+            return None
+        rank = q / 100 * n
+        seen = 0
+        for bucket, count in enumerate(counts):
+            if count and seen + count >= rank:
+                low = self.bounds[bucket - 1] if bucket > 0 else 0.0
+                high = self.bounds[bucket] if bucket < len(self.bounds) else self.bounds[-1]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def summary(self, max_age_s: Optional[float] = None, min_age_s: float = 0) -> Dict:
+        """Conteo, errores y percentiles p50/p95/p99 de una parte de la ventana"""
+        counts, errors, total = self.merged(max_age_s, min_age_s)
+        n = sum(counts)
+        return {
+            'count': n,
+            'errors': errors,
+            'error_rate': errors / (n + errors) if n + errors else 0.0,
+            'mean_ms': total / n if n else None,
+            'p50_ms': self._percentile(counts, 50),
+            'p95_ms': self._percentile(counts, 95),
+            'p99_ms': self._percentile(counts, 99),
+            'buckets': counts,
+        }
+
+
+def detect_degradation(
+    histogram: RollingHistogram,
+    short_window_s: float,
+    slo_p95_ms: Optional[float] = None,
+    change_ratio: float = 1.5,
+    max_error_rate: float = 0.2,
+    min_samples: int = 3
+) -> Tuple[str, List[str]]:
+    """
+    Evaluar el estado de una sonda
+
+    Reglas (sobre la ventana corta, con al menos min_samples muestras):
+    - down: todas las llamadas fallaron
+    - degraded: tasa de error > max_error_rate, p95 > SLO, o la mediana
+      supera change_ratio × la mediana de la línea base (el resto de la ventana)
+
+    Returns:
+        (estado 'ok' | 'degraded' | 'down' | 'unknown', motivos)
+    """
+    recent = histogram.summary(short_window_s)
+    attempts = recent['count'] + recent['errors']
+    if attempts < min_samples:
+        return 'unknown', []
+    if recent['count'] == 0:
+        return 'down', [f"{recent['errors']} llamadas fallidas"]
+
+    reasons = []
+    if recent['error_rate'] > max_error_rate:
+        reasons.append(f"tasa de error {recent['error_rate']:.0%} > {max_error_rate:.0%}")
+    if slo_p95_ms is not None and recent['p95_ms'] > slo_p95_ms:
+        reasons.append(f"p95 {recent['p95_ms']:.0f} ms > SLO {slo_p95_ms:.0f} ms")
+
+    baseline = histogram.summary(min_age_s=short_window_s)
+    if baseline['count'] >= min_samples and recent['count'] >= min_samples:
+        if recent['p50_ms'] > change_ratio * baseline['p50_ms']:
+            reasons.append(
+                f"p50 {recent['p50_ms']:.0f} ms vs línea base {baseline['p50_ms']:.0f} ms "
+                f"(×{recent['p50_ms'] / baseline['p50_ms']:.1f})"
+            )
+    return ('degraded' if reasons else 'ok'), reasons
+
+
+# ============================================================================
+# SONDAS
+# ============================================================================
+
+def _document_input() -> Dict:
+    return {
+        "type": "document",
+        "filename": "probe_document.txt",
+        "file_base64": base64.b64encode(PROBE_DOCUMENT.encode('utf-8')).decode('utf-8')
+    }
+
+
+def _image_input() -> Dict:
+    return {"type": "image", "filename": "probe_image.png", "file_base64": PROBE_IMAGE_BASE64}
+
+
+# Sondas disponibles: path del webhook, constructor del payload y SLO p95 por defecto (ms)
+PROBES: Dict[str, Dict] = {
+    'query': {
+        'path': '/webhook/rag/query',
+        'payload': lambda daemon: {"query": random.choice(PROBE_QUESTIONS), "top_k": 3},
+        'slo_p95_ms': 10000,
+    },
+    'advanced_text': {
+        'path': '/webhook/rag/advanced-query',
+        'payload': lambda daemon: build_query_payload(random.choice(PROBE_QUESTIONS), []),
+        'slo_p95_ms': 15000,
+    },
+    'advanced_document': {
+        'path': '/webhook/rag/advanced-query',
+        'payload': lambda daemon: build_query_payload(
+            "¿Qué solicita el cliente en este documento?", [_document_input()]
+        ),
+        'slo_p95_ms': 20000,
+    },
+    'advanced_multimodal': {
+        'path': '/webhook/rag/advanced-query',
+        'payload': lambda daemon: build_query_payload(
+            "¿La imagen corresponde al documento adjunto?", [_document_input(), _image_input()]
+        ),
+        'slo_p95_ms': 30000,
+    },
+    'feedback': {
+        'path': '/webhook/rag/feedback',
+        'payload': lambda daemon: {
+            "query_id": daemon.last_query_id or f"probe-{uuid.uuid4().hex[:12]}",
+            "rating": 5,
+            "was_helpful": True,
+            "comment": "sonda sintética",
+            "user_id": "synthetic_probe",
+            "timestamp": datetime.now().isoformat()
+        },
+        'slo_p95_ms': 5000,
+    },
+}
+
+
+class ProbeDaemon:
+    """
+    Ejecuta las sondas en paralelo cada `interval_s` segundos y mantiene un
+    RollingHistogram y un estado por sonda
+
+    Los cambios de estado (ok → degraded/down y de vuelta) se imprimen una
+    sola vez; el estado completo se consulta con snapshot() o por HTTP.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://159.203.149.247:5678",
+        probes: Optional[List[str]] = None,
+        interval_s: float = 30,
+        timeout_s: float = 60,
+        window_s: float = 900,
+        short_window_s: float = 120,
+        slos: Optional[Dict[str, Optional[float]]] = None,
+        change_ratio: float = 1.5,
+        max_error_rate: float = 0.2,
+        min_samples: int = 3,
+        session: Optional[requests.Session] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            base_url: URL de n8n
+            probes: Sondas a ejecutar (por defecto todas las de PROBES)
+            interval_s: Segundos entre rondas de sondas
+            timeout_s: Timeout de cada llamada
+            window_s: Ventana de los histogramas (línea base + ventana corta)
+            short_window_s: Ventana sobre la que se evalúan las reglas
+            slos: Umbral p95 por sonda; None toma SLO_<SONDA>_P95_MS o el valor por defecto
+            change_ratio: Aumento relativo de la mediana que se considera degradación
+            max_error_rate: Tasa de error máxima en la ventana corta
+            min_samples: Muestras mínimas antes de evaluar las reglas
+            session: Sesión HTTP compartida (keep-alive)
+            clock: Reloj de los histogramas
+        """
+        self.base_url = base_url.rstrip('/')
+        self.probes = probes or list(PROBES)
+        unknown = [name for name in self.probes if name not in PROBES]
+        if unknown:
+            raise ValueError(f"Sondas desconocidas: {', '.join(unknown)}")
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self.short_window_s = short_window_s
+        self.change_ratio = change_ratio
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.session = session or requests.Session()
+        self.slos = {
+            name: (slos or {}).get(name, _env_float(f"SLO_{name.upper()}_P95_MS", PROBES[name]['slo_p95_ms']))
+            for name in self.probes
+        }
+        self.histograms = {
+            name: RollingHistogram(window_s=window_s, slot_s=max(1.0, interval_s / 3), clock=clock)
+            for name in self.probes
+        }
+        self.states: Dict[str, Dict] = {
+            name: {'status': 'unknown', 'reasons': [], 'since': None, 'last_error': None}
+            for name in self.probes
+        }
+        self.last_query_id: Optional[str] = None
+        self.rounds = 0
+        self._executor = ThreadPoolExecutor(max_workers=len(self.probes))
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'ProbeDaemon':
+        """
+        Crear daemon desde N8N_URL y PROBE_INTERVAL_S / PROBE_TIMEOUT_S / PROBE_WINDOW_S / PROBE_SHORT_WINDOW_S
+
+        Los overrides (p. ej. interval_s desde la CLI) reemplazan al entorno
+        antes de construir: los histogramas se dimensionan con interval_s.
+        """
+        options = {
+            'base_url': os.getenv('N8N_URL', "http://159.203.149.247:5678"),
+            'interval_s': _env_float('PROBE_INTERVAL_S', 30),
+            'timeout_s': _env_float('PROBE_TIMEOUT_S', 60),
+            'window_s': _env_float('PROBE_WINDOW_S', 900),
+            'short_window_s': _env_float('PROBE_SHORT_WINDOW_S', 120)
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def probe(self, name: str) -> Dict:
+        """
+        Ejecutar una sonda y registrar el resultado en su histograma
+
+        Returns:
+            Dict con ok, status_code, latency_ms y error
+        """
+        spec = PROBES[name]
+        start = time.perf_counter()
+        status_code, error = None, None
+        try:
+            response = self.session.post(
+                f"{self.base_url}{spec['path']}", json=spec['payload'](self), timeout=self.timeout_s
+            )
+            status_code = response.status_code
+            if status_code == 200:
+                try:
+                    query_id = response.json().get('query_id')
+                except ValueError:
+                    query_id = None
+                if query_id:
+                    self.last_query_id = query_id
+            else:
+                error = f"HTTP {status_code}"
+        except requests.exceptions.Timeout:
+            error = f"timeout ({self.timeout_s:.0f}s)"
+        except Exception as e:
+            error = str(e)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        self.histograms[name].record(latency_ms, ok=error is None)
+        if error:
+            self.states[name]['last_error'] = error
+        return {'probe': name, 'ok': error is None, 'status_code': status_code,
+                'latency_ms': latency_ms, 'error': error}
+
+    def evaluate(self, name: str) -> Dict:
+        """Aplicar las reglas de degradación e informar los cambios de estado"""
+        status, reasons = detect_degradation(
+            self.histograms[name], self.short_window_s, self.slos[name],
+            self.change_ratio, self.max_error_rate, self.min_samples
+        )
+        state = self.states[name]
+        previous = state['status']
+        state['reasons'] = reasons
+        if status != previous:
+            state['status'] = status
+            state['since'] = datetime.now().isoformat(timespec='seconds')
+            if status in ('degraded', 'down'):
+                icon = "🔴" if status == 'down' else "🐢"
+                print(f"{icon} [{state['since']}] {name}: {status.upper()} - {'; '.join(reasons)}")
+            elif previous in ('degraded', 'down') and status == 'ok':
+                print(f"✅ [{state['since']}] {name}: recuperado")
+        return state
+
+    def run_once(self) -> List[Dict]:
+        """Ejecutar una ronda de sondas en paralelo y evaluar cada una"""
+        results = list(self._executor.map(self.probe, self.probes))
+        for name in self.probes:
+            self.evaluate(name)
+        self.rounds += 1
+        return results
+
+    def run_forever(self):
+        """Ejecutar rondas cada interval_s (con jitter de ±10%) hasta stop()"""
+        while not self._stop.is_set():
+            start = time.monotonic()
+            self.run_once()
+            delay = self.interval_s * random.uniform(0.9, 1.1) - (time.monotonic() - start)
+            self._stop.wait(max(0.0, delay))
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict:
+        """Estado y percentiles (ventana corta y completa) de cada sonda"""
+        probes = {}
+        for name in self.probes:
+            histogram = self.histograms[name]
+            windows = {}
+            for label, max_age in (('short', self.short_window_s), ('window', None)):
+                summary = histogram.summary(max_age)
+                summary.pop('buckets')
+                windows[label] = {
+                    key: round(value, 1) if isinstance(value, float) else value
+                    for key, value in summary.items()
+                }
+            probes[name] = {**self.states[name], 'slo_p95_ms': self.slos[name], **windows}
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'base_url': self.base_url,
+            'rounds': self.rounds,
+            'healthy': all(p['status'] in ('ok', 'unknown') for p in probes.values()),
+            'probes': probes,
+        }
+
+    def metrics_text(self) -> str:
+        """Métricas en formato de exposición de Prometheus (gauges sobre la ventana móvil)"""
+        lines = [
+            "# HELP rag_probe_latency_window_bucket Llamadas exitosas por bucket de latencia (ms) en la ventana",
+            "# TYPE rag_probe_latency_window_bucket gauge",
+        ]
+        summaries = {name: self.histograms[name].summary() for name in self.probes}
+        for name, summary in summaries.items():
+            cumulative = 0
+            for bound, count in zip(self.histograms[name].bounds + ('+Inf',), summary['buckets']):
+                cumulative += count
+                lines.append(f'rag_probe_latency_window_bucket{{probe="{name}",le="{bound}"}} {cumulative}')
+
+        gauges = [
+            ('rag_probe_latency_p50_ms', "Mediana de latencia (ms)", 'p50_ms'),
+            ('rag_probe_latency_p95_ms', "Percentil 95 de latencia (ms)", 'p95_ms'),
+            ('rag_probe_success_window', "Llamadas exitosas", 'count'),
+            ('rag_probe_errors_window', "Llamadas fallidas", 'errors'),
+        ]
+        for metric, help_text, key in gauges:
+            lines.append(f"# HELP {metric} {help_text} por sonda y ventana")
+            lines.append(f"# TYPE {metric} gauge")
+            for name in self.probes:
+                for label, max_age in (('short', self.short_window_s), ('window', None)):
+                    value = self.histograms[name].summary(max_age)[key]
+                    if value is not None:
+                        lines.append(f'{metric}{{probe="{name}",window="{label}"}} {value:g}')
+
+        lines.append("# HELP rag_probe_degraded 1 si la sonda está degradada o caída")
+        lines.append("# TYPE rag_probe_degraded gauge")
+        for name in self.probes:
+            degraded = 1 if self.states[name]['status'] in ('degraded', 'down') else 0
+            lines.append(f'rag_probe_degraded{{probe="{name}",status="{self.states[name]["status"]}"}} {degraded}')
+        lines.append("# HELP rag_probe_slo_p95_ms Umbral SLO de p95 (ms)")
+        lines.append("# TYPE rag_probe_slo_p95_ms gauge")
+        for name in self.probes:
+            if self.slos[name] is not None:
+                lines.append(f'rag_probe_slo_p95_ms{{probe="{name}"}} {self.slos[name]:g}')
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int = 9108, host: str = '127.0.0.1') -> str:
+        """
+        Publicar /metrics (Prometheus), /status (JSON) y /healthz en un hilo
+
+        Returns:
+            URL base del servidor
+        """
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: str, content_type: str):
+                raw = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    self._reply(200, daemon.metrics_text(), 'text/plain; version=0.0.4; charset=utf-8')
+                elif path == '/status':
+                    self._reply(200, json.dumps(daemon.snapshot(), ensure_ascii=False, indent=2),
+                                'application/json; charset=utf-8')
+                elif path == '/healthz':
+                    healthy = daemon.snapshot()['healthy']
+                    self._reply(200 if healthy else 503, 'ok\n' if healthy else 'degraded\n', 'text/plain')
+                else:
+                    self._reply(404, 'not found\n', 'text/plain')
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def print_status(self):
+        """Imprimir el estado actual de las sondas"""
+        snapshot = self.snapshot()
+        print("\n" + "="*80)
+        print(f"📡 SONDAS SINTÉTICAS ({snapshot['rounds']} rondas) - {self.base_url}")
+        print("="*80)
+        icons = {'ok': "🟢", 'degraded': "🟡", 'down': "🔴", 'unknown': "⚪"}
+        for name, probe in snapshot['probes'].items():
+            short = probe['short']
+            p50 = f"{short['p50_ms']:.0f}" if short['p50_ms'] is not None else "-"
+            p95 = f"{short['p95_ms']:.0f}" if short['p95_ms'] is not None else "-"
+            slo = f"{probe['slo_p95_ms']:.0f}" if probe['slo_p95_ms'] is not None else "-"
+            print(f"{icons[probe['status']]} {name:<22} p50 {p50:>7} ms | p95 {p95:>7} ms "
+                  f"(SLO {slo}) | errores {short['errors']}")
+            for reason in probe['reasons']:
+                print(f"   └─ {reason}")
+            if probe['status'] == 'down' and probe['last_error']:
+                print(f"   └─ Último error: {probe['last_error']}")
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark(n_samples: int = 1_000_000, interval_s: float = 30) -> Dict:
+    """
+    Costo del histograma frente a una lista de muestras y tiempo de detección
+    de una degradación simulada (latencia ×3 tras 15 minutos estables)
+    """
+    import tracemalloc
+
+    now = [0.0]
+    rng = random.Random(11)
+    samples = [rng.lognormvariate(6.5, 0.4) for _ in range(n_samples)]
+
+    histogram = RollingHistogram(window_s=900, slot_s=10, clock=lambda: now[0])
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i, latency in enumerate(samples):
+        now[0] = i * 900 / n_samples
+        histogram.record(latency)
+    record_s = time.perf_counter() - start
+    histogram_kb = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    summary = histogram.summary()
+    summary_ms = (time.perf_counter() - start) * 1000
+    ordered = sorted(samples)
+    exact_p95 = ordered[int(0.95 * len(ordered))]
+
+    # Detección: una muestra por intervalo, la latencia se triplica en t = 900 s
+    now[0] = 0.0
+    detector = RollingHistogram(window_s=900, slot_s=interval_s / 3, clock=lambda: now[0])
+    detected_after = None
+    t = 0.0
+    while t < 1800:
+        now[0] = t
+        base = rng.lognormvariate(6.5, 0.2)
+        detector.record(base * (3 if t >= 900 else 1))
+        status, _ = detect_degradation(detector, short_window_s=120, slo_p95_ms=None)
+        if t >= 900 and status == 'degraded':
+            detected_after = t - 900
+            break
+        if t < 900 and status == 'degraded':
+            detected_after = -1.0
+            break
+        t += interval_s
+
+    return {
+        'samples': n_samples,
+        'record_per_s': n_samples / record_s,
+        'histogram_kb': histogram_kb,
+        'list_kb': n_samples * 32 / 1024,
+        'summary_ms': summary_ms,
+        'p95_estimate_ms': summary['p95_ms'],
+        'p95_exact_ms': exact_p95,
+        'detected_after_s': detected_after,
+        'interval_s': interval_s,
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+def _option(args: List[str], flag: str) -> Optional[str]:
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == '--benchmark':
+        results = benchmark()
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK SONDAS ({results['samples']:,} muestras)")
+        print("="*80)
+        print(f"\n⚡ Registro: {results['record_per_s']:,.0f} muestras/s")
+        print(f"💾 Memoria del histograma: {results['histogram_kb']:.0f} KB "
+              f"(lista de muestras: ~{results['list_kb']:,.0f} KB)")
+        print(f"📈 Resumen de la ventana: {results['summary_ms']:.1f} ms")
+        print(f"   └─ p95 estimado {results['p95_estimate_ms']:.0f} ms vs exacto {results['p95_exact_ms']:.0f} ms")
+        if results['detected_after_s'] is None:
+            print("\n❌ Degradación no detectada")
+        elif results['detected_after_s'] < 0:
+            print("\n❌ Falso positivo antes de la degradación")
+        else:
+            print(f"\n🐢 Degradación ×3 detectada tras {results['detected_after_s']:.0f}s "
+                  f"(sondas cada {results['interval_s']:.0f}s)")
+        print("\n" + "="*80 + "\n")
+    elif args and args[0] in ('--run', '--once'):
+        probes = _option(args, '--probes')
+        overrides = {'probes': probes.split(',') if probes else None}
+        if _option(args, '--interval'):
+            overrides['interval_s'] = float(_option(args, '--interval'))
+        daemon = ProbeDaemon.from_env(**overrides)
+        if args[0] == '--once':
+            for result in daemon.run_once():
+                icon = "✅" if result['ok'] else "❌"
+                print(f"{icon} {result['probe']:<22} {result['latency_ms']:>8.0f} ms"
+                      f"{'  ' + result['error'] if result['error'] else ''}")
+            daemon.stop()
+        else:
+            port = int(_option(args, '--port') or os.getenv('PROBE_METRICS_PORT', 9108))
+            url = daemon.serve_metrics(port)
+            print(f"\n📡 Sondas cada {daemon.interval_s:.0f}s contra {daemon.base_url}")
+            print(f"   └─ Métricas: {url}/metrics | Estado: {url}/status")
+            try:
+                daemon.run_forever()
+            except KeyboardInterrupt:
+                daemon.print_status()
+                daemon.stop()
+                print()
+    else:
+        print("\nUso:")
+        print("  python3 scripts/probe_daemon.py --run [--interval S] [--port P] [--probes query,feedback,...]")
+        print("  python3 scripts/probe_daemon.py --once [--probes ...]")
+        print("  python3 scripts/probe_daemon.py --benchmark\n")
+        print(f"Sondas: {', '.join(PROBES)}\n")
@@ -5,6 +5,7 @@ Incluye sistema de feedback y complementación automática
 """
 
 import base64
+import hashlib
 import requests
 import json
 from typing import List, Dict, Optional, Union
@@ -12,6 +13,50 @@ from pathlib import Path
 from datetime import datetime
 import time
 
+def encode_file_input(path: str, input_type: str = "document") -> Dict:
+    """
+    Leer un archivo y armar la entrada en base64 del payload de consulta
+    
+    Args:
+        path: Ruta del archivo
+        input_type: "document" o "image"
+    
+    Returns:
+        {"type", "filename", "file_base64", "document_hash"}; el hash (SHA-256 del
+        archivo) es la llave del servicio de documentos temporales
+        (temp_document_cache.py --serve)
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    
+    return {
+        "type": input_type,
+        "filename": Path(path).name,
+        "file_base64": base64.b64encode(content).decode('ascii'),
+        "document_hash": hashlib.sha256(content).hexdigest()
+    }
+
+def build_query_payload(
+    question: str,
+    inputs: List[Dict],
+    use_indexed: bool = True,
+    require_high_confidence: bool = False,
+    max_sources: int = 5,
+    diversity: float = 0.7
+) -> Dict:
+    """Payload del webhook rag/advanced-query (ver AdvancedRAGClient.query)"""
+    return {
+        "query": question,
+        "inputs": inputs,
+        "options": {
+            "use_indexed_docs": use_indexed,
+            "require_high_confidence": require_high_confidence,
+            "enable_feedback": True,
+            "max_sources": max_sources,
+            "mmr_lambda": diversity
+        }
+    }
+
 class AdvancedRAGClient:
     """Cliente avanzado para sistema RAG con feedback"""
     
@@ -31,6 +76,8 @@ class AdvancedRAGClient:
         additional_text: str = None,
         use_indexed: bool = True,
         require_high_confidence: bool = False,
+        max_sources: int = 5,
+        diversity: float = 0.7,
         verbose: bool = True
     ) -> Dict:
         """
@@ -43,6 +90,8 @@ class AdvancedRAGClient:
             additional_text: Texto adicional de contexto
             use_indexed: Buscar también en documentos indexados
             require_high_confidence: Solo responder si confianza >80%
+            max_sources: Fuentes a usar en la respuesta
+            diversity: Lambda de MMR (1.0 = solo relevancia, menor = fuentes más variadas)
             verbose: Imprimir detalles
         
         Returns:
@@ -74,17 +123,9 @@ class AdvancedRAGClient:
                     print(f"⚠️  Archivo no encontrado: {doc_path}")
                     continue
                 
-                with open(doc_path, 'rb') as f:
-                    file_content = base64.b64encode(f.read()).decode('utf-8')
-                
+                inputs.append(encode_file_input(doc_path, "document"))
                 file_size = Path(doc_path).stat().st_size
                 
-                inputs.append({
-                    "type": "document",
-                    "filename": Path(doc_path).name,
-                    "file_base64": file_content
-                })
-                
                 if verbose:
                     print(f"📎 Documento: {Path(doc_path).name} ({file_size/1024:.1f} KB)")
         
@@ -95,31 +136,16 @@ class AdvancedRAGClient:
                     print(f"⚠️  Imagen no encontrada: {img_path}")
                     continue
                 
-                with open(img_path, 'rb') as f:
-                    file_content = base64.b64encode(f.read()).decode('utf-8')
-                
+                inputs.append(encode_file_input(img_path, "image"))
                 file_size = Path(img_path).stat().st_size
                 
-                inputs.append({
-                    "type": "image",
-                    "filename": Path(img_path).name,
-                    "file_base64": file_content
-                })
-                
                 if verbose:
                     print(f"🖼️  Imagen: {Path(img_path).name} ({file_size/1024:.1f} KB)")
         
         # Preparar payload
-        payload = {
-            "query": question,
-            "inputs": inputs,
-            "options": {
-                "use_indexed_docs": use_indexed,
-                "require_high_confidence": require_high_confidence,
-                "enable_feedback": True,
-                "max_sources": 5
-            }
-        }
+        payload = build_query_payload(
+            question, inputs, use_indexed, require_high_confidence, max_sources, diversity
+        )
         
         if verbose:
             print(f"\n🚀 Enviando consulta...")
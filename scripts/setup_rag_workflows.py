@@ -12,6 +12,81 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from n8n_manager import N8nManager, create_rag_ingestion_workflow, create_rag_query_workflow
+from workflow_sync import WorkflowSync, print_sync_summary
+
+
+# Cliente del registro de metadata en Cosmos DB que comparten los nodos Code de
+# ingesta y eliminación (se antepone a su jsCode)
+COSMOS_METADATA_JS = r"""// Registro de metadata por documento en Cosmos DB (API REST, firma HMAC con la
+// llave maestra). El registro (id = document_id) es la fuente de verdad de
+// document_hash, status y chunk_ids para la ingesta y la eliminación
+const crypto = require('crypto');
+let cosmosEndpoint = null;
+let cosmosKey = null;
+let cosmosDatabase = 'rag-system';
+let cosmosContainer = 'documents_metadata';
+try {
+  cosmosEndpoint = $env.COSMOS_DB_ENDPOINT;
+  cosmosKey = $env.COSMOS_DB_KEY;
+  cosmosDatabase = $env.COSMOS_DB_DATABASE || cosmosDatabase;
+  cosmosContainer = $env.COSMOS_DB_CONTAINER_METADATA || cosmosContainer;
+} catch (e) {
+  // Acceso a variables de entorno bloqueado
+}
+if (!cosmosEndpoint || !cosmosKey) {
+  throw new Error('COSMOS_DB_ENDPOINT y COSMOS_DB_KEY son requeridos para la metadata de documentos');
+}
+const collectionLink = `dbs/${cosmosDatabase}/colls/${cosmosContainer}`;
+
+async function cosmosRequest(helpers, method, documentId, body, headers = {}) {
+  const resourceLink = documentId ? `${collectionLink}/docs/${documentId}` : collectionLink;
+  const date = new Date().toUTCString();
+  const payload = `${method.toLowerCase()}\ndocs\n${resourceLink}\n${date.toLowerCase()}\n\n`;
+  const signature = crypto.createHmac('sha256', Buffer.from(cosmosKey, 'base64')).update(payload).digest('base64');
+  const response = await helpers.httpRequest({
+    method: method,
+    url: `${cosmosEndpoint.replace(/\/$/, '')}/${documentId ? resourceLink : collectionLink + '/docs'}`,
+    headers: {
+      'Authorization': encodeURIComponent(`type=master&ver=1.0&sig=${signature}`),
+      'x-ms-date': date,
+      'x-ms-version': '2018-12-31',
+      ...(documentId ? { 'x-ms-documentdb-partitionkey': JSON.stringify([documentId]) } : {}),
+      ...headers
+    },
+    body: body,
+    json: true,
+    returnFullResponse: true,
+    ignoreHttpStatusErrors: true
+  });
+  if (response.statusCode >= 400 && response.statusCode !== 404 && response.statusCode !== 412) {
+    throw new Error(`Cosmos DB HTTP ${response.statusCode}: ${JSON.stringify(response.body).substring(0, 200)}`);
+  }
+  return response;
+}
+
+// Registros de varios documentos con una sola consulta (sigue x-ms-continuation)
+async function cosmosRecords(helpers, documentIds) {
+  const records = {};
+  let continuation = null;
+  while (true) {
+    const response = await cosmosRequest(helpers, 'POST', null, {
+      query: 'SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)',
+      parameters: [{ name: '@ids', value: documentIds }]
+    }, {
+      'Content-Type': 'application/query+json',
+      'x-ms-documentdb-isquery': 'True',
+      'x-ms-documentdb-query-enablecrosspartition': 'True',
+      'x-ms-max-item-count': '1000',
+      ...(continuation ? { 'x-ms-continuation': continuation } : {})
+    });
+    for (const record of response.body.Documents || []) records[record.id] = record;
+    continuation = response.headers['x-ms-continuation'];
+    if (!continuation) break;
+  }
+  return records;
+}
+
+"""
 
 
 def create_complete_rag_ingestion_workflow():
@@ -60,10 +135,10 @@ def create_complete_rag_ingestion_workflow():
                 "name": "🔐 Calcular Hash"
             },
             
-            # 4. Verificar duplicados (placeholder - requiere Cosmos DB)
+            # 4. Verificar duplicados contra el registro de metadata en Cosmos DB
             {
                 "parameters": {
-                    "jsCode": "// En producción, aquí se consulta Cosmos DB para verificar duplicados\n// Por ahora, asumimos que no hay duplicados\nconst items = $input.all();\nreturn items.map(item => ({\n  json: {\n    ...item.json,\n    is_duplicate: false,\n    checked_duplicates: true\n  },\n  binary: item.binary\n}));"
+                    "jsCode": COSMOS_METADATA_JS + "// Duplicados exactos con el registro de metadata del documento: el id se deriva\n// del hash y document_hash solo se escribe cuando la indexación terminó, así que\n// una ingesta fallida o un documento eliminado no cuentan como duplicados\nconst items = $input.all();\nconst records = await cosmosRecords(this.helpers, [...new Set(items.map(item => item.json.document_id))]);\n\nreturn items.map(item => {\n  const record = records[item.json.document_id];\n  const isDuplicate = Boolean(record) && record.status === 'indexed'\n    && record.document_hash === item.json.document_hash && !item.json.force_reprocess;\n  return {\n    json: {\n      ...item.json,\n      is_duplicate: isDuplicate,\n      duplicate_of: isDuplicate ? record.id : null,\n      checked_duplicates: true\n    },\n    binary: item.binary\n  };\n});"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -75,7 +150,7 @@ def create_complete_rag_ingestion_workflow():
             # 5. Extraer texto del documento
             {
                 "parameters": {
-                    "jsCode": "// Extracción de texto - en producción usar Azure Document Intelligence\n// Este es un placeholder que simula la extracción\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  // Simular extracción de texto\n  const extractedText = `Texto extraído del documento ${item.json.filename}.\\n\\nEste es un contenido de ejemplo que en producción vendría de Azure Document Intelligence (Form Recognizer) o de una librería de procesamiento de PDFs.\\n\\nEl documento contiene información importante que será indexada en el sistema RAG.`;\n  \n  output.push({\n    json: {\n      ...item.json,\n      extracted_text: extractedText,\n      extraction_method: 'placeholder',\n      extraction_timestamp: new Date().toISOString(),\n      char_count: extractedText.length\n    },\n    binary: item.binary\n  });\n}\n\nreturn output;"
+                    "jsCode": "// Extracción de texto - en producción usar Azure Document Intelligence\n// Este es un placeholder que simula la extracción\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  // El archivo solo se necesita hasta aquí: no se reenvía a los nodos siguientes\n  const { file_base64, ...fields } = item.json;\n\n  if (item.json.is_duplicate) {\n    // Documento ya ingerido: no se extrae ni se vuelve a embeber\n    output.push({ json: { ...fields, extracted_text: '', extraction_method: 'skipped_duplicate' } });\n    continue;\n  }\n\n  // En producción este contenido se envía a Document Intelligence\n  const source = item.binary?.data?.data ?? file_base64;\n  if (!source) throw new Error('No se encontró el archivo');\n\n  // Simular extracción de texto\n  const extractedText = `Texto extraído del documento ${item.json.filename}.\\n\\nEste es un contenido de ejemplo que en producción vendría de Azure Document Intelligence (Form Recognizer) o de una librería de procesamiento de PDFs.\\n\\nEl documento contiene información importante que será indexada en el sistema RAG.`;\n  \n  output.push({\n    json: {\n      ...fields,\n      extracted_text: extractedText,\n      extraction_method: 'placeholder',\n      extraction_timestamp: new Date().toISOString(),\n      char_count: extractedText.length\n    }\n  });\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -87,7 +162,7 @@ def create_complete_rag_ingestion_workflow():
             # 6. Dividir en chunks
             {
                 "parameters": {
-                    "jsCode": "// Dividir texto en chunks con overlap\nconst items = $input.all();\nconst output = [];\n\nconst CHUNK_SIZE = 500; // caracteres\nconst OVERLAP = 50;\n\nfor (const item of items) {\n  const text = item.json.extracted_text;\n  const chunks = [];\n  \n  let start = 0;\n  let chunkIndex = 0;\n  \n  while (start < text.length) {\n    const end = Math.min(start + CHUNK_SIZE, text.length);\n    const chunkText = text.substring(start, end);\n    \n    // Crear un chunk por cada fragmento\n    output.push({\n      json: {\n        document_id: item.json.document_id,\n        chunk_id: `${item.json.document_id}_chunk_${chunkIndex}`,\n        chunk_index: chunkIndex,\n        chunk_text: chunkText,\n        filename: item.json.filename,\n        metadata: item.json.metadata,\n        document_hash: item.json.document_hash,\n        total_chunks: Math.ceil(text.length / (CHUNK_SIZE - OVERLAP))\n      }\n    });\n    \n    start = end - OVERLAP;\n    chunkIndex++;\n  }\n}\n\nreturn output;"
+                    "jsCode": "// Dividir texto en chunks con overlap\nconst items = $input.all();\nconst output = [];\n\nconst CHUNK_SIZE = 500; // caracteres\nconst OVERLAP = 50;\n\nfor (const item of items) {\n  if (item.json.is_duplicate) {\n    // Un único item marcador para que el resumen reporte el duplicado\n    output.push({\n      json: {\n        document_id: item.json.document_id,\n        filename: item.json.filename,\n        is_duplicate: true,\n        duplicate_of: item.json.duplicate_of\n      }\n    });\n    continue;\n  }\n\n  const text = item.json.extracted_text;\n  const chunks = [];\n  \n  let start = 0;\n  let chunkIndex = 0;\n  \n  while (start < text.length) {\n    const end = Math.min(start + CHUNK_SIZE, text.length);\n    const chunkText = text.substring(start, end);\n    \n    // Crear un chunk por cada fragmento\n    output.push({\n      json: {\n        document_id: item.json.document_id,\n        chunk_id: `${item.json.document_id}_chunk_${chunkIndex}`,\n        chunk_index: chunkIndex,\n        chunk_text: chunkText,\n        filename: item.json.filename,\n        metadata: item.json.metadata,\n        document_hash: item.json.document_hash,\n        total_chunks: Math.ceil(text.length / (CHUNK_SIZE - OVERLAP))\n      }\n    });\n    \n    chunkIndex++;\n    if (end === text.length) break;\n    start = end - OVERLAP;\n  }\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -96,19 +171,43 @@ def create_complete_rag_ingestion_workflow():
                 "name": "✂️ Dividir en Chunks"
             },
             
-            # 7. Mensaje de éxito (agregador)
+            # 7. Embeber e indexar los chunks
             {
                 "parameters": {
-                    "jsCode": "// Agregar información de todos los chunks procesados\nconst items = $input.all();\n\nif (items.length === 0) {\n  return [{ json: { success: false, message: 'No se generaron chunks' } }];\n}\n\nconst documentId = items[0].json.document_id;\nconst filename = items[0].json.filename;\nconst totalChunks = items.length;\n\nreturn [{\n  json: {\n    success: true,\n    message: 'Documento procesado exitosamente',\n    document_id: documentId,\n    filename: filename,\n    chunks_generated: totalChunks,\n    status: 'ready_for_embedding',\n    timestamp: new Date().toISOString()\n  }\n}];"
+                    "jsCode": "// Embeber los chunks con Azure OpenAI (lotes de 16 textos) y subirlos al índice\n// con POST docs/index (lotes de 1.000 acciones). Si algo falla la ejecución se\n// detiene antes de registrar la metadata. Con EMBEDDING_PROXY_URL los embeddings\n// pasan por el caché de scripts/embedding_scheduler.py --serve\nconst EMBEDDING_BATCH = 16;\nconst INDEX_BATCH = 1000;\nconst items = $input.all();\n\nlet openaiEndpoint = null;\nlet openaiKey = null;\nlet deployment = 'text-embedding-ada-002';\nlet apiVersion = '2023-05-15';\nlet searchEndpoint = null;\nlet searchKey = null;\nlet indexName = 'rag-documents';\ntry {\n  openaiEndpoint = $env.EMBEDDING_PROXY_URL || $env.AZURE_OPENAI_ENDPOINT;\n  openaiKey = $env.AZURE_OPENAI_KEY;\n  deployment = $env.AZURE_OPENAI_EMBEDDING_DEPLOYMENT || deployment;\n  apiVersion = $env.AZURE_OPENAI_API_VERSION || apiVersion;\n  searchEndpoint = $env.AZURE_SEARCH_ENDPOINT;\n  searchKey = $env.AZURE_SEARCH_KEY;\n  indexName = $env.AZURE_SEARCH_INDEX || indexName;\n} catch (e) {\n  // Acceso a variables de entorno bloqueado\n}\n\nconst chunks = items.filter(item => item.json.chunk_id);\nif (chunks.length === 0) return items;\nif (!openaiEndpoint || !openaiKey || !searchEndpoint || !searchKey) {\n  throw new Error('AZURE_OPENAI_ENDPOINT/KEY y AZURE_SEARCH_ENDPOINT/KEY son requeridos para indexar');\n}\n\nconst vectors = [];\nfor (let i = 0; i < chunks.length; i += EMBEDDING_BATCH) {\n  const response = await this.helpers.httpRequest({\n    method: 'POST',\n    url: `${openaiEndpoint.replace(/\\/$/, '')}/openai/deployments/${deployment}/embeddings?api-version=${apiVersion}`,\n    headers: { 'api-key': openaiKey },\n    body: { input: chunks.slice(i, i + EMBEDDING_BATCH).map(item => item.json.chunk_text) },\n    json: true\n  });\n  const rows = [...response.data].sort((a, b) => a.index - b.index);\n  if (rows.length !== Math.min(EMBEDDING_BATCH, chunks.length - i)) {\n    throw new Error(`Azure OpenAI devolvió ${rows.length} embeddings para un lote de ${Math.min(EMBEDDING_BATCH, chunks.length - i)}`);\n  }\n  vectors.push(...rows.map(row => row.embedding));\n}\n\nconst indexedAt = new Date().toISOString();\nconst actions = chunks.map((item, position) => ({\n  '@search.action': 'mergeOrUpload',\n  chunk_id: item.json.chunk_id,\n  document_id: item.json.document_id,\n  filename: item.json.filename,\n  chunk_index: item.json.chunk_index,\n  content: item.json.chunk_text,\n  content_vector: vectors[position],\n  metadata: JSON.stringify(item.json.metadata || {}),\n  is_deleted: false,\n  created_at: indexedAt\n}));\nfor (let i = 0; i < actions.length; i += INDEX_BATCH) {\n  const response = await this.helpers.httpRequest({\n    method: 'POST',\n    url: `${searchEndpoint.replace(/\\/$/, '')}/indexes/${indexName}/docs/index?api-version=2023-11-01`,\n    headers: { 'api-key': searchKey },\n    body: { value: actions.slice(i, i + INDEX_BATCH) },\n    json: true\n  });\n  const failed = (response.value || []).filter(result => !result.status);\n  if (failed.length > 0) {\n    throw new Error(`${failed.length} chunks no se indexaron: ${failed[0].errorMessage || failed[0].statusCode}`);\n  }\n}\n\nreturn items.map(item => ({ json: item.json.chunk_id ? { ...item.json, indexed_at: indexedAt } : item.json }));"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
                 "position": [1560, 400],
+                "id": "embed-index",
+                "name": "🧮 Embeber e Indexar"
+            },
+            
+            # 8. Registrar metadata (solo después de indexar)
+            {
+                "parameters": {
+                    "jsCode": COSMOS_METADATA_JS + "// Registrar la metadata solo después de indexar: document_hash (duplicados),\n// chunk_ids (eliminación sin recorrer el índice) y status 'indexed'\nconst items = $input.all();\n\nconst byDocument = {};\nfor (const item of items) {\n  if (!item.json.chunk_id) continue;\n  (byDocument[item.json.document_id] = byDocument[item.json.document_id] || []).push(item.json);\n}\n\nfor (const [documentId, chunks] of Object.entries(byDocument)) {\n  const first = chunks[0];\n  await cosmosRequest(this.helpers, 'POST', null, {\n    id: documentId,\n    document_id: documentId,\n    filename: first.filename,\n    document_hash: first.document_hash,\n    metadata: first.metadata,\n    status: 'indexed',\n    chunk_ids: chunks.map(chunk => chunk.chunk_id),\n    chunk_count: chunks.length,\n    indexed_at: first.indexed_at\n  }, {\n    'x-ms-documentdb-is-upsert': 'True',\n    'x-ms-documentdb-partitionkey': JSON.stringify([documentId])\n  });\n}\n\nreturn items;"
+                },
+                "type": "n8n-nodes-base.code",
+                "typeVersion": 2,
+                "position": [1780, 400],
+                "id": "register-metadata",
+                "name": "💾 Registrar Metadata"
+            },
+            
+            # 9. Mensaje de éxito (agregador)
+            {
+                "parameters": {
+                    "jsCode": "// Agregar información de todos los chunks procesados\nconst items = $input.all();\n\nif (items.length === 0) {\n  return [{ json: { success: false, message: 'No se generaron chunks' } }];\n}\n\nif (items[0].json.is_duplicate) {\n  return [{\n    json: {\n      success: true,\n      message: 'Documento ya ingerido previamente',\n      document_id: items[0].json.document_id,\n      duplicate_of: items[0].json.duplicate_of,\n      filename: items[0].json.filename,\n      chunks_generated: 0,\n      status: 'duplicate',\n      timestamp: new Date().toISOString()\n    }\n  }];\n}\n\nconst documentId = items[0].json.document_id;\nconst filename = items[0].json.filename;\nconst totalChunks = items.length;\n\nreturn [{\n  json: {\n    success: true,\n    message: 'Documento indexado exitosamente',\n    document_id: documentId,\n    filename: filename,\n    chunks_generated: totalChunks,\n    status: 'indexed',\n    timestamp: new Date().toISOString()\n  }\n}];"
+                },
+                "type": "n8n-nodes-base.code",
+                "typeVersion": 2,
+                "position": [2000, 400],
                 "id": "aggregate-result",
                 "name": "📊 Agregar Resultado"
             },
             
-            # 8. Responder al webhook
+            # 10. Responder al webhook
             {
                 "parameters": {
                     "respondWith": "json",
@@ -116,7 +215,7 @@ def create_complete_rag_ingestion_workflow():
                 },
                 "type": "n8n-nodes-base.respondToWebhook",
                 "typeVersion": 1,
-                "position": [1780, 400],
+                "position": [2220, 400],
                 "id": "respond",
                 "name": "✅ Responder"
             }
@@ -138,6 +237,12 @@ def create_complete_rag_ingestion_workflow():
                 "main": [[{"node": "✂️ Dividir en Chunks", "type": "main", "index": 0}]]
             },
             "✂️ Dividir en Chunks": {
+                "main": [[{"node": "🧮 Embeber e Indexar", "type": "main", "index": 0}]]
+            },
+            "🧮 Embeber e Indexar": {
+                "main": [[{"node": "💾 Registrar Metadata", "type": "main", "index": 0}]]
+            },
+            "💾 Registrar Metadata": {
                 "main": [[{"node": "📊 Agregar Resultado", "type": "main", "index": 0}]]
             },
             "📊 Agregar Resultado": {
@@ -146,7 +251,8 @@ def create_complete_rag_ingestion_workflow():
         },
         "active": False,
         "settings": {
-            "executionOrder": "v1"
+            "executionOrder": "v1",
+            "executionTimeout": 300
         }
     }
 
@@ -171,7 +277,7 @@ def create_rag_delete_workflow():
             },
             {
                 "parameters": {
-                    "jsCode": "// Validar que se proporcione document_id\nconst items = $input.all();\n\nfor (const item of items) {\n  if (!item.json.document_id) {\n    throw new Error('document_id es requerido');\n  }\n}\n\nreturn items;"
+                    "jsCode": "// Validar que se proporcione document_id (o document_ids para eliminación masiva)\nconst items = $input.all();\n\nfor (const item of items) {\n  const body = item.json.body || item.json;\n  const ids = body.document_ids || (body.document_id ? [body.document_id] : []);\n  if (!Array.isArray(ids) || ids.length === 0) {\n    throw new Error('document_id o document_ids es requerido');\n  }\n}\n\nreturn items.map(item => {\n  const body = item.json.body || item.json;\n  return {\n    json: {\n      ...item.json,\n      document_ids: body.document_ids || [body.document_id],\n      soft_delete: Boolean(body.soft_delete)\n    }\n  };\n});"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -181,7 +287,7 @@ def create_rag_delete_workflow():
             },
             {
                 "parameters": {
-                    "jsCode": "// Placeholder para obtener metadata del documento\n// En producción, consultar Cosmos DB\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  // Simular metadata del documento\n  const metadata = {\n    document_id: item.json.document_id,\n    filename: 'documento_ejemplo.pdf',\n    chunk_ids: [\n      `${item.json.document_id}_chunk_0`,\n      `${item.json.document_id}_chunk_1`,\n      `${item.json.document_id}_chunk_2`\n    ],\n    blob_url: `https://storage.azure.com/raw-documents/${item.json.document_id}.pdf`\n  };\n  \n  output.push({\n    json: {\n      ...item.json,\n      metadata: metadata,\n      chunks_to_delete: metadata.chunk_ids.length\n    }\n  });\n}\n\nreturn output;"
+                    "jsCode": COSMOS_METADATA_JS + "// Resolver los chunk_ids de cada documento desde su registro de metadata en\n// Cosmos DB (escrito por la ingesta al terminar de indexar): una sola consulta\n// por lote en vez de recorrer el índice con filtros paginados\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  const records = await cosmosRecords(this.helpers, item.json.document_ids);\n  // Un documento ya eliminado (o cuya ingesta nunca terminó) no tiene chunks\n  const found = item.json.document_ids.filter(id => records[id] && records[id].status !== 'deleted');\n  const chunkIds = found.flatMap(id => records[id].chunk_ids || []);\n\n  output.push({\n    json: {\n      ...item.json,\n      document_id: item.json.document_ids.join(','),\n      found_documents: found,\n      unknown_documents: item.json.document_ids.filter(id => !found.includes(id)),\n      chunk_ids: chunkIds,\n      chunks_to_delete: chunkIds.length\n    }\n  });\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -191,7 +297,7 @@ def create_rag_delete_workflow():
             },
             {
                 "parameters": {
-                    "jsCode": "// Simular eliminación de chunks del índice de búsqueda\n// En producción, usar Azure AI Search API\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  output.push({\n    json: {\n      ...item.json,\n      deleted_from_index: true,\n      chunks_deleted: item.json.metadata.chunk_ids.length,\n      deletion_timestamp: new Date().toISOString()\n    }\n  });\n}\n\nreturn output;"
+                    "jsCode": "// Eliminar (o marcar is_deleted) todos los chunks en lotes de 1.000 acciones\n// contra POST docs/index de Azure AI Search\nconst BATCH_SIZE = 1000;\nconst items = $input.all();\nconst output = [];\n\nconst endpoint = $env.AZURE_SEARCH_ENDPOINT;\nconst apiKey = $env.AZURE_SEARCH_KEY;\nconst indexName = $env.AZURE_SEARCH_INDEX || 'rag-documents';\n\nfor (const item of items) {\n  const started = Date.now();\n  const deletedAt = new Date().toISOString();\n  const actions = item.json.chunk_ids.map(chunkId => item.json.soft_delete\n    ? { '@search.action': 'merge', chunk_id: chunkId, is_deleted: true, deleted_at: deletedAt }\n    : { '@search.action': 'delete', chunk_id: chunkId });\n\n  let batches = 0;\n  for (let i = 0; i < actions.length; i += BATCH_SIZE) {\n    await this.helpers.httpRequest({\n      method: 'POST',\n      url: `${endpoint.replace(/\\/$/, '')}/indexes/${indexName}/docs/index?api-version=2023-11-01`,\n      headers: { 'api-key': apiKey },\n      body: { value: actions.slice(i, i + BATCH_SIZE) },\n      json: true\n    });\n    batches++;\n  }\n\n  // Si ninguno de los documentos existe en el índice no hubo eliminación\n  const deleted = item.json.found_documents.length > 0;\n  const elapsedMs = Math.max(Date.now() - started, 1);\n  output.push({\n    json: {\n      ...item.json,\n      success: deleted,\n      status: deleted ? (item.json.soft_delete ? 'soft_deleted' : 'deleted') : 'not_found',\n      message: deleted ? 'Documento eliminado exitosamente' : 'Ningún document_id existe en el índice',\n      deleted_from_index: deleted,\n      documents_deleted: item.json.found_documents.length,\n      chunks_deleted: actions.length,\n      batches: batches,\n      chunks_per_second: Math.round(actions.length / elapsedMs * 1000),\n      deletion_timestamp: deletedAt\n    }\n  });\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -199,14 +305,27 @@ def create_rag_delete_workflow():
                 "id": "delete-from-index",
                 "name": "🗑️ Eliminar del Índice"
             },
+            {
+                "parameters": {
+                    "jsCode": COSMOS_METADATA_JS + "// Reflejar la eliminación en el registro de metadata con lectura-modificación-\n// escritura (If-Match sobre _etag): se conservan filename, document_hash y\n// metadata; una eliminación definitiva vacía chunk_ids, una lógica los conserva\n// para poder restaurar\nconst MAX_ATTEMPTS = 3;\nconst items = $input.all();\n\nfor (const item of items) {\n  for (const documentId of item.json.found_documents) {\n    for (let attempt = 1; attempt <= MAX_ATTEMPTS; attempt++) {\n      const current = await cosmosRequest(this.helpers, 'GET', documentId);\n      if (current.statusCode === 404) break;\n      const record = {\n        ...current.body,\n        status: item.json.soft_delete ? 'soft_deleted' : 'deleted',\n        deleted_at: item.json.deletion_timestamp\n      };\n      if (!item.json.soft_delete) {\n        record.chunk_ids = [];\n        record.chunk_count = 0;\n      }\n      const saved = await cosmosRequest(this.helpers, 'PUT', documentId, record, {\n        'If-Match': current.body._etag\n      });\n      // 412: otro proceso escribió el registro entre la lectura y la escritura\n      if (saved.statusCode !== 412) break;\n      if (attempt === MAX_ATTEMPTS) {\n        throw new Error(`Registro de metadata ${documentId} modificado concurrentemente`);\n      }\n    }\n  }\n}\n\nreturn items;"
+                },
+                "type": "n8n-nodes-base.code",
+                "typeVersion": 2,
+                "position": [1120, 300],
+                "id": "update-metadata",
+                "name": "💾 Actualizar Metadata"
+            },
             {
                 "parameters": {
                     "respondWith": "json",
-                    "responseBody": "={{ { \"success\": true, \"document_id\": $json.document_id, \"message\": \"Documento eliminado exitosamente\", \"chunks_deleted\": $json.chunks_deleted } }}"
+                    "responseBody": "={{ { \"success\": $json.success, \"status\": $json.status, \"document_id\": $json.document_id, \"message\": $json.message, \"chunks_deleted\": $json.chunks_deleted, \"documents_deleted\": $json.documents_deleted, \"soft_delete\": $json.soft_delete, \"unknown_documents\": $json.unknown_documents } }}",
+                    "options": {
+                        "responseCode": "={{ $json.success ? 200 : 404 }}"
+                    }
                 },
                 "type": "n8n-nodes-base.respondToWebhook",
                 "typeVersion": 1,
-                "position": [1120, 300],
+                "position": [1340, 300],
                 "id": "respond-deleted",
                 "name": "✅ Confirmar Eliminación"
             }
@@ -222,12 +341,16 @@ def create_rag_delete_workflow():
                 "main": [[{"node": "🗑️ Eliminar del Índice", "type": "main", "index": 0}]]
             },
             "🗑️ Eliminar del Índice": {
+                "main": [[{"node": "💾 Actualizar Metadata", "type": "main", "index": 0}]]
+            },
+            "💾 Actualizar Metadata": {
                 "main": [[{"node": "✅ Confirmar Eliminación", "type": "main", "index": 0}]]
             }
         },
         "active": False,
         "settings": {
-            "executionOrder": "v1"
+            "executionOrder": "v1",
+            "executionTimeout": 120
         }
     }
 
@@ -267,7 +390,7 @@ def create_complete_rag_query_workflow():
             # 3. Generar embedding (placeholder)
             {
                 "parameters": {
-                    "jsCode": "// Placeholder para generar embedding\n// En producción: llamar a Azure OpenAI Embeddings API\nconst items = $input.all();\n\nreturn items.map(item => ({\n  json: {\n    ...item.json,\n    query_embedding: [0.1, 0.2, 0.3], // Embedding simulado\n    embedding_model: 'text-embedding-ada-002',\n    embedding_generated: true\n  }\n}));"
+                    "jsCode": "// Embeddings de las consultas con Azure OpenAI: una sola petición para todos\n// los items (mismo deployment que la ingesta, para que los vectores sean comparables).\n// Con EMBEDDING_PROXY_URL una pregunta repetida se responde desde el caché\nconst items = $input.all();\n\nlet endpoint = null;\nlet apiKey = null;\nlet deployment = 'text-embedding-ada-002';\nlet apiVersion = '2023-05-15';\ntry {\n  endpoint = $env.EMBEDDING_PROXY_URL || $env.AZURE_OPENAI_ENDPOINT;\n  apiKey = $env.AZURE_OPENAI_KEY;\n  deployment = $env.AZURE_OPENAI_EMBEDDING_DEPLOYMENT || deployment;\n  apiVersion = $env.AZURE_OPENAI_API_VERSION || apiVersion;\n} catch (e) {\n  // Acceso a variables de entorno bloqueado\n}\nif (!endpoint || !apiKey) {\n  throw new Error('AZURE_OPENAI_ENDPOINT y AZURE_OPENAI_KEY son requeridos para embeber la consulta');\n}\n\nconst response = await this.helpers.httpRequest({\n  method: 'POST',\n  url: `${endpoint.replace(/\\/$/, '')}/openai/deployments/${deployment}/embeddings?api-version=${apiVersion}`,\n  headers: { 'api-key': apiKey },\n  body: { input: items.map(item => item.json.query) },\n  json: true\n});\nconst rows = [...response.data].sort((a, b) => a.index - b.index);\nif (rows.length !== items.length) {\n  throw new Error(`Azure OpenAI devolvió ${rows.length} embeddings para ${items.length} consultas`);\n}\n\nreturn items.map((item, position) => ({\n  json: {\n    ...item.json,\n    query_embedding: rows[position].embedding,\n    embedding_model: deployment,\n    embedding_generated: true\n  }\n}));"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -279,7 +402,7 @@ def create_complete_rag_query_workflow():
             # 4. Búsqueda vectorial (placeholder)
             {
                 "parameters": {
-                    "jsCode": "// Placeholder para búsqueda vectorial\n// En producción: llamar a Azure AI Search\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  // Simular resultados de búsqueda\n  const searchResults = [\n    {\n      chunk_id: 'doc_123_chunk_0',\n      content: 'El Banco Caja Social ofrece diversos productos financieros incluyendo cuentas de ahorro, créditos de consumo y tarjetas de crédito.',\n      document_id: 'doc_123',\n      filename: 'productos_banco.pdf',\n      score: 0.92,\n      metadata: { department: 'productos', document_type: 'catalog' }\n    },\n    {\n      chunk_id: 'doc_456_chunk_2',\n      content: 'Los clientes pueden acceder a sus cuentas a través de la banca en línea, aplicación móvil o en nuestras oficinas físicas.',\n      document_id: 'doc_456',\n      filename: 'canales_atencion.pdf',\n      score: 0.87,\n      metadata: { department: 'servicio_cliente', document_type: 'manual' }\n    },\n    {\n      chunk_id: 'doc_789_chunk_1',\n      content: 'El proceso de apertura de cuenta requiere documento de identidad, comprobante de domicilio y firma del contrato de vinculación.',\n      document_id: 'doc_789',\n      filename: 'requisitos_apertura.pdf',\n      score: 0.84,\n      metadata: { department: 'legal', document_type: 'requirements' }\n    }\n  ];\n  \n  output.push({\n    json: {\n      ...item.json,\n      search_results: searchResults,\n      results_count: searchResults.length,\n      search_completed: true\n    }\n  });\n}\n\nreturn output;"
+                    "jsCode": "// Búsqueda vectorial en Azure AI Search. El filtro excluye los chunks con\n// soft-delete (is_deleted ne true también deja pasar los que no tienen el campo).\n// Con mmr_lambda < 1 (options.mmr_lambda de AdvancedRAGClient.query) se traen\n// más candidatos con su vector y se elige un top_k diverso con MMR, como\n// similarity_engine.mmr_select\nconst DEFAULT_TOP_K = 5;\nconst MAX_TOP_K = 50;\nconst MMR_CANDIDATES_PER_RESULT = 4;\nconst NOT_DELETED_FILTER = 'is_deleted ne true';\nconst SELECT = 'chunk_id,document_id,filename,chunk_index,content,metadata';\nconst items = $input.all();\n\nlet endpoint = null;\nlet apiKey = null;\nlet indexName = 'rag-documents';\ntry {\n  endpoint = $env.AZURE_SEARCH_ENDPOINT;\n  apiKey = $env.AZURE_SEARCH_KEY;\n  indexName = $env.AZURE_SEARCH_INDEX || indexName;\n} catch (e) {\n  // Acceso a variables de entorno bloqueado\n}\nif (!endpoint || !apiKey) {\n  throw new Error('AZURE_SEARCH_ENDPOINT y AZURE_SEARCH_KEY son requeridos para la búsqueda');\n}\nconst url = `${endpoint.replace(/\\/$/, '')}/indexes/${indexName}/docs/search?api-version=2023-11-01`;\n\n// docs/search acepta un solo vector de consulta por petición\nasync function searchIndex(helpers, vector, top, withVectors) {\n  const response = await helpers.httpRequest({\n    method: 'POST',\n    url: url,\n    headers: { 'api-key': apiKey },\n    body: {\n      vectorQueries: [{ kind: 'vector', vector: vector, fields: 'content_vector', k: top }],\n      filter: NOT_DELETED_FILTER,\n      select: withVectors ? `${SELECT},content_vector` : SELECT,\n      top: top\n    },\n    json: true\n  });\n  return response.value || [];\n}\n\nconst normalize = v => {\n  const norm = Math.sqrt(v.reduce((sum, x) => sum + x * x, 0)) || 1;\n  return v.map(x => x / norm);\n};\nconst dot = (a, b) => {\n  let sum = 0;\n  for (let i = 0; i < a.length; i++) sum += a[i] * b[i];\n  return sum;\n};\n\n// λ·sim(q, c) - (1-λ)·max sim(c, seleccionados), con el máximo actualizado\n// de forma incremental: O(N·k) productos punto\nfunction mmrSelect(queryVector, candidateVectors, k, lambda) {\n  const vectors = candidateVectors.map(normalize);\n  const query = normalize(queryVector);\n  const relevance = vectors.map(v => dot(v, query));\n  const redundancy = vectors.map(() => -Infinity);\n  const available = new Set(vectors.keys());\n  const selected = [];\n  for (let step = 0; step < Math.min(k, vectors.length); step++) {\n    let best = -1;\n    let bestScore = -Infinity;\n    for (const i of available) {\n      const score = step === 0 ? relevance[i] : lambda * relevance[i] - (1 - lambda) * redundancy[i];\n      if (score > bestScore) {\n        bestScore = score;\n        best = i;\n      }\n    }\n    selected.push(best);\n    available.delete(best);\n    for (const i of available) redundancy[i] = Math.max(redundancy[i], dot(vectors[i], vectors[best]));\n  }\n  return selected;\n}\n\nconst output = [];\nfor (const item of items) {\n  const top = Math.min(parseInt(item.json.top_k, 10) || DEFAULT_TOP_K, MAX_TOP_K);\n  const lambda = parseFloat(item.json.mmr_lambda ?? (item.json.options || {}).mmr_lambda);\n  const diverse = lambda >= 0 && lambda < 1;\n  let hits = await searchIndex(\n    this.helpers, item.json.query_embedding,\n    diverse ? Math.min(top * MMR_CANDIDATES_PER_RESULT, MAX_TOP_K) : top, diverse\n  );\n  if (diverse) {\n    const candidates = hits.filter(hit => Array.isArray(hit.content_vector));\n    hits = mmrSelect(item.json.query_embedding, candidates.map(hit => hit.content_vector), top, lambda)\n      .map(i => candidates[i]);\n  }\n  const searchResults = hits.map(hit => {\n    let metadata = hit.metadata;\n    try {\n      metadata = typeof metadata === 'string' ? JSON.parse(metadata) : (metadata || {});\n    } catch (e) {\n      // metadata que no es JSON: se entrega tal cual\n    }\n    return {\n      chunk_id: hit.chunk_id,\n      document_id: hit.document_id,\n      filename: hit.filename,\n      chunk_index: hit.chunk_index,\n      content: hit.content,\n      score: hit['@search.score'],\n      metadata: metadata\n    };\n  });\n\n  output.push({\n    json: {\n      ...item.json,\n      search_results: searchResults,\n      results_count: searchResults.length,\n      mmr_lambda: diverse ? lambda : null,\n      search_completed: true\n    }\n  });\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -291,7 +414,7 @@ def create_complete_rag_query_workflow():
             # 5. Construir contexto
             {
                 "parameters": {
-                    "jsCode": "const items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  const results = item.json.search_results;\n  \n  // Construir contexto a partir de los resultados\n  const contextParts = results.map((result, index) => \n    `[Fuente ${index + 1}: ${result.filename}]\\n${result.content}`\n  );\n  \n  const context = contextParts.join('\\n\\n---\\n\\n');\n  \n  // Extraer fuentes únicas\n  const sources = results.map(r => ({\n    document_id: r.document_id,\n    filename: r.filename,\n    score: r.score\n  }));\n  \n  output.push({\n    json: {\n      ...item.json,\n      context: context,\n      sources: sources,\n      context_length: context.length\n    }\n  });\n}\n\nreturn output;"
+                    "jsCode": "// Construir contexto con presupuesto de tokens (ver scripts/context_builder.py):\n// une chunks consecutivos del mismo documento quitando el solapamiento,\n// descarta tramos repetidos y empaca por relevancia hasta el presupuesto\n// Mismas variables que config_template.env y context_builder.py\nlet CONTEXT_WINDOW = 8192;     // gpt-4\nlet MAX_TOKENS = 800;          // tokens de la respuesta\ntry {\n  CONTEXT_WINDOW = parseInt($env.CONTEXT_WINDOW_TOKENS, 10) || CONTEXT_WINDOW;\n  MAX_TOKENS = parseInt($env.MAX_TOKENS, 10) || MAX_TOKENS;\n} catch (e) {\n  // Acceso a variables de entorno bloqueado: usar los valores por defecto\n}\nconst RESERVED = 600;          // prompt de sistema + pregunta\nconst BUDGET = CONTEXT_WINDOW - MAX_TOKENS - RESERVED;\nconst CHUNK_OVERLAP = 50;\nconst MIN_OVERLAP = 10;      // coincidencias más cortas son casuales\nconst estimateTokens = text => Math.max(1, Math.ceil(text.length / 4));\nconst position = r => r.chunk_index ?? (/_chunk_(\\d+)$/.exec(r.chunk_id || '') || [])[1];\n\nfunction overlapLength(left, right) {\n  if (left.endsWith(right.substring(0, CHUNK_OVERLAP))) return CHUNK_OVERLAP;\n  for (let size = Math.min(left.length, right.length, 200); size >= MIN_OVERLAP; size--) {\n    if (left.endsWith(right.substring(0, size))) return size;\n  }\n  return 0;\n}\n\nconst items = $input.all();\nconst output = [];\n\nfor (const item of items) {\n  const results = item.json.search_results || [];\n\n  // Agrupar por documento y unir chunks consecutivos\n  const byDocument = {};\n  for (const r of results) {\n    const key = r.document_id || r.filename;\n    (byDocument[key] = byDocument[key] || []).push({ ...r, position: position(r) === undefined ? null : Number(position(r)) });\n  }\n  let passages = [];\n  for (const docResults of Object.values(byDocument)) {\n    docResults.sort((a, b) => (a.position ?? Infinity) - (b.position ?? Infinity));\n    let current = null;\n    for (const r of docResults) {\n      if (current && r.position !== null && current.last !== null) {\n        if (r.position === current.last) { current.score = Math.max(current.score, r.score); continue; }\n        if (r.position === current.last + 1) {\n          const cut = overlapLength(current.content, r.content);\n          current.content += cut ? r.content.substring(cut) : '\\n' + r.content;\n          current.last = r.position;\n          current.score = Math.max(current.score, r.score);\n          continue;\n        }\n      }\n      if (current) passages.push(current);\n      current = { document_id: r.document_id, filename: r.filename, content: r.content, score: r.score, last: r.position };\n    }\n    if (current) passages.push(current);\n  }\n\n  // Quitar tramos repetidos y empacar por relevancia\n  passages.sort((a, b) => b.score - a.score || b.content.length - a.content.length);\n  const kept = [];\n  const normalize = text => text.toLowerCase().split(/\\s+/).join(' ');\n  for (const p of passages) {\n    const n = normalize(p.content);\n    if (kept.some(k => normalize(k.content).includes(n))) continue;\n    kept.push(p);\n  }\n\n  const contextParts = [];\n  const sources = [];\n  let used = 0;\n  for (const p of kept) {\n    const header = `[Fuente ${contextParts.length + 1}: ${p.filename}]\\n`;\n    const remaining = BUDGET - used - estimateTokens(header + '\\n\\n---\\n\\n');\n    if (remaining < 40) break;\n    let content = p.content;\n    if (estimateTokens(content) > remaining) content = content.substring(0, remaining * 4) + ' …';\n    contextParts.push(header + content);\n    used += estimateTokens(header + content + '\\n\\n---\\n\\n');\n    sources.push({ document_id: p.document_id, filename: p.filename, score: p.score });\n  }\n\n  const context = contextParts.join('\\n\\n---\\n\\n');\n  const naiveLength = results.reduce((sum, r) => sum + r.content.length + r.filename.length + 20, 0);\n\n  output.push({\n    json: {\n      ...item.json,\n      context: context,\n      sources: sources,\n      context_length: context.length,\n      context_tokens: estimateTokens(context),\n      context_tokens_saved: Math.max(0, Math.ceil(naiveLength / 4) - estimateTokens(context))\n    }\n  });\n}\n\nreturn output;"
                 },
                 "type": "n8n-nodes-base.code",
                 "typeVersion": 2,
@@ -347,11 +470,21 @@ def create_complete_rag_query_workflow():
         },
         "active": False,
         "settings": {
-            "executionOrder": "v1"
+            "executionOrder": "v1",
+            "executionTimeout": 60
         }
     }
 
 
+def get_rag_workflow_definitions():
+    """Definiciones de todos los workflows RAG que se despliegan"""
+    return [
+        create_complete_rag_ingestion_workflow(),
+        create_complete_rag_query_workflow(),
+        create_rag_delete_workflow()
+    ]
+
+
 def main():
     """Función principal"""
     print("\n" + "="*80)
@@ -373,33 +506,35 @@ def main():
     print("   └─ Elimina documentos del índice de búsqueda")
     print("\n" + "="*80)
     
-    print("\n¿Deseas crear los workflows? (s/n): ", end="")
+    engine = WorkflowSync(manager)
+    definitions = get_rag_workflow_definitions()
+    
+    try:
+        # Plan de cambios contra el estado actual del servidor (no crea duplicados)
+        plan = engine.sync(definitions, dry_run=True)
+    except Exception as e:
+        print(f"\n❌ Error consultando n8n: {e}")
+        return
+    print_sync_summary(plan, dry_run=True)
+    if not plan['actions']:
+        print("\n✅ Los workflows ya están sincronizados")
+        print("\n" + "="*80 + "\n")
+        return
+    
+    print("\n¿Deseas aplicar los cambios? (s/n): ", end="")
     response = input().strip().lower()
     
     if response == 's':
-        print("\n🔨 Creando workflows...")
+        print("\n🔨 Sincronizando workflows...")
         
         try:
-            # Crear workflow de ingesta
-            print("\n1️⃣  Creando workflow de ingesta...", end="")
-            ingestion_wf = create_complete_rag_ingestion_workflow()
-            result1 = manager.create_workflow(ingestion_wf)
-            print(f" ✅ Creado - ID: {result1['id']}")
-            
-            # Crear workflow de consultas
-            print("2️⃣  Creando workflow de consultas...", end="")
-            query_wf = create_complete_rag_query_workflow()
-            result2 = manager.create_workflow(query_wf)
-            print(f" ✅ Creado - ID: {result2['id']}")
-            
-            # Crear workflow de eliminación
-            print("3️⃣  Creando workflow de eliminación...", end="")
-            delete_wf = create_rag_delete_workflow()
-            result3 = manager.create_workflow(delete_wf)
-            print(f" ✅ Creado - ID: {result3['id']}")
+            summary = engine.sync(definitions)
+            print_sync_summary(summary)
+            if summary['errors']:
+                raise RuntimeError(f"{summary['errors']} cambios fallidos")
             
             print("\n" + "="*80)
-            print("✅ WORKFLOWS CREADOS EXITOSAMENTE")
+            print("✅ WORKFLOWS SINCRONIZADOS EXITOSAMENTE")
             print("="*80)
             print("\n📌 Próximos pasos:")
             print("\n1. Accede a tu n8n: http://159.203.149.247:5678")
@@ -0,0 +1,322 @@
+"""
+Similarity Engine - Similitud vectorizada contra chunks de documentos temporales
+Reemplaza el paso 7 de docs/RAG_CON_DOCUMENTOS_TEMPORALES.md (coseno chunk por
+chunk en JavaScript) y fusiona el resultado con el corpus indexado en un único
+ranking para las consultas con use_indexed_docs
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_vector_index import normalize_rows, top_k_indices
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings,
+    k: int = 5,
+    lambda_: float = 0.7,
+    relevance: Optional[np.ndarray] = None
+) -> List[int]:
+    """
+    Maximal Marginal Relevance sobre N candidatos
+
+    En cada paso elige el candidato que maximiza
+    λ·sim(q, c) - (1-λ)·max sim(c, seleccionados). La matriz de similitud
+    entre candidatos (N×N) se calcula una vez y el máximo contra lo ya
+    seleccionado se actualiza de forma incremental, O(N·k).
+
+    Args:
+        query_embedding: Embedding de la consulta
+        candidate_embeddings: Matriz (N × dim) de los candidatos
+        k: Candidatos a seleccionar
+        lambda_: 1.0 = solo relevancia, 0.0 = solo diversidad
+        relevance: Similitud consulta-candidato ya calculada (opcional)
+
+    Returns:
+        Índices de los candidatos elegidos, en orden de selección
+    """
+    matrix = normalize_rows(candidate_embeddings)
+    n = len(matrix)
+    if n == 0 or k <= 0:
+        return []
+    if relevance is None:
+        relevance = matrix @ normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+    relevance = np.asarray(relevance, dtype=np.float32)
+    pairwise = matrix @ matrix.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    for _ in range(min(k, n) - 1):
+        marginal = lambda_ * relevance - (1.0 - lambda_) * redundancy
+        marginal[~available] = -np.inf
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
+
+
+def mmr_rerank(
+    results: Sequence[Dict],
+    query_embedding: Sequence[float],
+    k: int = 5,
+    lambda_: float = 0.7,
+    embedding_field: str = "content_vector",
+    embeddings=None
+) -> List[Dict]:
+    """
+    Seleccionar un top-k diverso de resultados ya recuperados
+
+    Sirve para resultados indexados (con content_vector en el select) y
+    temporales (con embedding); los que no tengan vector se descartan.
+
+    Args:
+        results: Top-N candidatos de la búsqueda
+        query_embedding: Embedding de la consulta
+        k: Resultados finales (max_sources)
+        lambda_: Balance relevancia/diversidad
+        embedding_field: Campo del vector en cada resultado
+        embeddings: Matriz (N × dim) si los vectores no vienen en los resultados
+    """
+    if embeddings is None:
+        results = [r for r in results if r.get(embedding_field) is not None]
+        embeddings = [r[embedding_field] for r in results]
+    if not len(results):
+        return []
+    order = mmr_select(query_embedding, np.asarray(embeddings, dtype=np.float32), k=k, lambda_=lambda_)
+    return [
+        {field: value for field, value in results[i].items() if field != embedding_field}
+        for i in order
+    ]
+
+
+def search_score_to_cosine(score: np.ndarray) -> np.ndarray:
+    """Inversa de cosine_to_search_score: @search.score de Azure AI Search → coseno"""
+    return 2.0 - 1.0 / np.asarray(score, dtype=np.float64)
+
+
+class TemporaryChunkMatrix:
+    """
+    Chunks de un documento temporal con sus embeddings en una matriz
+    (n_chunks × dim) normalizada una sola vez
+
+    Cada consulta posterior es un producto matriz-vector más argpartition.
+    """
+
+    def __init__(self, chunks: Sequence[Dict], embeddings=None, embedding_field: str = "embedding"):
+        """
+        Args:
+            chunks: Chunks del documento (content, chunk_index, filename, ...)
+            embeddings: Matriz de embeddings; si es None se toma de chunk[embedding_field]
+            embedding_field: Campo del embedding dentro de cada chunk
+        """
+        if embeddings is None:
+            embeddings = [chunk[embedding_field] for chunk in chunks]
+        self.embedding_field = embedding_field
+        # Los chunks se guardan sin el embedding para no devolverlo en cada resultado
+        self.chunks = [{k: v for k, v in chunk.items() if k != embedding_field} for chunk in chunks]
+        self.matrix = normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(self.chunks), -1))
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def scores(self, query_embedding: Sequence[float]) -> np.ndarray:
+        """Similitud coseno de la consulta contra todos los chunks"""
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        return self.matrix @ query
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        k: int = 3,
+        min_similarity: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Top-k chunks por similitud coseno
+
+        Returns:
+            Copias de los chunks con "similarity", de mayor a menor
+        """
+        if not self.chunks:
+            return []
+        scores = self.scores(query_embedding)
+        results = []
+        for row in top_k_indices(scores, k):
+            similarity = float(scores[row])
+            if min_similarity is not None and similarity < min_similarity:
+                break
+            results.append({**self.chunks[row], 'similarity': similarity})
+        return results
+
+    def search_diverse(
+        self,
+        query_embedding: Sequence[float],
+        k: int = 3,
+        candidates: int = 30,
+        lambda_: float = 0.7
+    ) -> List[Dict]:
+        """
+        Top-k diverso con MMR sobre los `candidates` chunks más similares
+
+        Evita que los k chunks sean vecinos casi idénticos del mismo pasaje.
+        """
+        if not self.chunks:
+            return []
+        scores = self.scores(query_embedding)
+        rows = top_k_indices(scores, max(k, candidates))
+        order = mmr_select(None, self.matrix[rows], k=k, lambda_=lambda_, relevance=scores[rows])
+        return [{**self.chunks[rows[i]], 'similarity': float(scores[rows[i]])} for i in order]
+
+
+def rank_chunks(query_embedding: Sequence[float], embeddings, k: int = 3):
+    """
+    Top-k sobre una matriz de embeddings sin envolverla en TemporaryChunkMatrix
+
+    Returns:
+        (índices, similitudes) de mayor a menor
+    """
+    matrix = normalize_rows(embeddings)
+    scores = matrix @ normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+    rows = top_k_indices(scores, k)
+    return rows, scores[rows]
+
+
+def merge_results(
+    temp_results: Sequence[Dict],
+    indexed_results: Sequence[Dict],
+    top: int = 5,
+    temp_weight: float = 1.0,
+    indexed_weight: float = 1.0,
+    indexed_score_field: str = "@search.score"
+) -> List[Dict]:
+    """
+    Fusionar chunks temporales e indexados en un único ranking
+
+    Ambos lados se llevan a similitud coseno (el @search.score de Azure AI
+    Search es 1/(2 - coseno)) y se ponderan, así un puntaje es comparable
+    sin importar de dónde venga el chunk.
+
+    Args:
+        temp_results: Salida de TemporaryChunkMatrix.search (con "similarity")
+        indexed_results: Elementos "value" de la búsqueda vectorial del índice
+        top: Resultados finales
+        temp_weight: Peso del documento temporal (>1 lo prioriza)
+        indexed_weight: Peso del corpus indexado
+        indexed_score_field: Campo con el puntaje de los resultados indexados
+
+    Returns:
+        Chunks con "score" (unificado), "similarity" y "source"
+        ('temporal' o 'indexado'), de mayor a menor
+    """
+    merged = []
+    for chunk in temp_results:
+        similarity = float(chunk['similarity'])
+        merged.append({**chunk, 'similarity': similarity,
+                       'score': temp_weight * similarity, 'source': 'temporal'})
+
+    seen = set()
+    if indexed_results:
+        raw = np.array([float(r.get(indexed_score_field, 0.0)) for r in indexed_results])
+        if indexed_score_field == '@search.score':
+            raw = search_score_to_cosine(raw)
+        for result, similarity in zip(indexed_results, raw.tolist()):
+            key = result.get('chunk_id')
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append({**result, 'similarity': similarity,
+                           'score': indexed_weight * similarity, 'source': 'indexado'})
+
+    merged.sort(key=lambda item: -item['score'])
+    return merged[:top]
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark(n_chunks: int = 10_000, dimensions: int = 1536, n_queries: int = 200, k: int = 3) -> Dict:
+    """Latencia por consulta: bucle chunk a chunk vs matriz vectorizada"""
+    rng = np.random.default_rng(11)
+    embeddings = rng.standard_normal((n_chunks, dimensions)).astype(np.float32)
+    chunks = [{'chunk_index': i, 'content': f'chunk {i}', 'embedding': embeddings[i]} for i in range(n_chunks)]
+    queries = rng.standard_normal((n_queries, dimensions)).astype(np.float32)
+
+    start = time.perf_counter()
+    matrix = TemporaryChunkMatrix(chunks)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for query in queries:
+        matrix.search(query, k=k)
+    vectorized_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    # Referencia: una similitud por chunk y ordenamiento completo, como en el workflow
+    loop_queries = queries[:max(1, n_queries // 20)]
+    start = time.perf_counter()
+    for query in loop_queries:
+        query_norm = np.linalg.norm(query)
+        ranked = sorted(
+            ((float(np.dot(query, vec) / (query_norm * np.linalg.norm(vec))), i)
+             for i, vec in enumerate(embeddings)),
+            reverse=True
+        )[:k]
+    loop_ms = (time.perf_counter() - start) / len(loop_queries) * 1000
+
+    start = time.perf_counter()
+    for query in queries:
+        matrix.search_diverse(query, k=5, candidates=50)
+    mmr_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    indexed = [{'chunk_id': f'idx_{i}', '@search.score': 0.6 + i / 100} for i in range(10)]
+    start = time.perf_counter()
+    for query in queries:
+        merge_results(matrix.search(query, k=k), indexed, top=5)
+    merged_ms = (time.perf_counter() - start) / n_queries * 1000
+
+    return {
+        'n_chunks': n_chunks,
+        'dimensions': dimensions,
+        'matrix_mb': matrix.nbytes() / 1024 / 1024,
+        'build_ms': build_ms,
+        'loop_ms': loop_ms,
+        'vectorized_ms': vectorized_ms,
+        'merged_ms': merged_ms,
+        'mmr_ms': mmr_ms
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+        results = benchmark(n_chunks=n)
+        print("\n" + "="*80)
+        print(f"📊 BENCHMARK SIMILITUD DOCUMENTO TEMPORAL ({results['n_chunks']:,} chunks × {results['dimensions']})")
+        print("="*80)
+        print(f"\n📦 Matriz normalizada: {results['matrix_mb']:.1f} MB ({results['build_ms']:.1f} ms)")
+        print(f"🐢 Chunk por chunk: {results['loop_ms']:.2f} ms/consulta")
+        print(f"⚡ Vectorizado (matriz + argpartition): {results['vectorized_ms']:.2f} ms/consulta")
+        print(f"🔀 Con fusión de resultados indexados: {results['merged_ms']:.2f} ms/consulta")
+        print(f"   └─ Aceleración: {results['loop_ms'] / results['vectorized_ms']:.0f}x")
+        print(f"🎯 Top-5 diverso (MMR sobre 50 candidatos): {results['mmr_ms']:.2f} ms/consulta")
+        print("\n" + "="*80 + "\n")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/similarity_engine.py --benchmark [n_chunks]\n")
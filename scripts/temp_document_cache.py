@@ -0,0 +1,512 @@
+"""
+Temp Document Cache - Caché de documentos temporales procesados
+Guarda texto extraído, chunks y embeddings por hash del documento para que las
+preguntas de seguimiento sobre el mismo archivo vayan directo a la recuperación
+(optimización "Caché de Documentos Temporales" de RAG_CON_DOCUMENTOS_TEMPORALES.md)
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parallel_extractor import chunk_stream
+from similarity_engine import TemporaryChunkMatrix
+
+
+def document_hash(content: bytes) -> str:
+    """SHA-256 del contenido del documento (el mismo que calcula el workflow)"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class CachedDocument:
+    """Documento temporal ya procesado, listo para consultas"""
+
+    __slots__ = ('document_hash', 'text', 'matrix', 'created_at', 'expires_at', 'nbytes')
+
+    def __init__(self, document_hash: str, text: str, matrix: TemporaryChunkMatrix, ttl: float):
+        self.document_hash = document_hash
+        self.text = text
+        self.matrix = matrix
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+        self.nbytes = (
+            len(text.encode('utf-8'))
+            + sum(len(str(chunk.get('content', ''))) for chunk in matrix.chunks)
+            + matrix.nbytes()
+        )
+
+    @property
+    def chunks(self) -> List[Dict]:
+        return self.matrix.chunks
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+
+class TempDocumentCache:
+    """
+    Caché en memoria con TTL y desalojo LRU bajo un presupuesto de bytes
+
+    Al desalojar por memoria, la entrada puede bajarse a disco (spill_dir)
+    y se vuelve a subir a memoria en el siguiente acceso mientras no expire.
+    Los documentos concurrentes con el mismo hash se procesan una sola vez.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        max_disk_bytes: int = 2 * 1024 * 1024 * 1024
+    ):
+        """
+        Inicializar el caché
+
+        Args:
+            ttl: Segundos que vive un documento procesado (10 min por defecto)
+            max_bytes: Presupuesto de memoria para texto, chunks y embeddings
+            spill_dir: Directorio para bajar a disco lo desalojado (None = descartar)
+            max_disk_bytes: Presupuesto del directorio de spill
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._entries: 'OrderedDict[str, CachedDocument]' = OrderedDict()
+        self._size = 0
+        self._disk: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+        self._stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expirations': 0,
+            'evictions': 0,
+            'spills': 0,
+            'processing_s_saved': 0.0
+        }
+        self._processing_s: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'TempDocumentCache':
+        """Crear el caché a partir de las variables de config_template.env"""
+        options = {
+            'ttl': float(os.getenv('TEMP_DOC_CACHE_TTL', '600')),
+            'max_bytes': int(os.getenv('TEMP_DOC_CACHE_MAX_MB', '256')) * 1024 * 1024,
+            'spill_dir': os.getenv('TEMP_DOC_CACHE_SPILL_DIR') or None
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    # ------------------------------------------------------------------
+    # Disco
+    # ------------------------------------------------------------------
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pkl")
+
+    def _spill(self, entry: CachedDocument):
+        if not self.spill_dir or entry.expired() or entry.nbytes > self.max_disk_bytes:
+            return
+        payload = {
+            'text': entry.text,
+            'chunks': entry.matrix.chunks,
+            'matrix': entry.matrix.matrix,
+            'created_at': entry.created_at,
+            'expires_at': entry.expires_at
+        }
+        path = self._spill_path(entry.document_hash)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._drop_disk(entry.document_hash)
+        self._disk[entry.document_hash] = (entry.nbytes, entry.expires_at)
+        self._disk_size += entry.nbytes
+        self._stats['spills'] += 1
+        while self._disk_size > self.max_disk_bytes and self._disk:
+            self._drop_disk(next(iter(self._disk)))
+
+    def _drop_disk(self, key: str):
+        meta = self._disk.pop(key, None)
+        if meta is None:
+            return
+        self._disk_size -= meta[0]
+        try:
+            os.remove(self._spill_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _load_from_disk(self, key: str) -> Optional[CachedDocument]:
+        meta = self._disk.get(key)
+        if meta is None:
+            return None
+        if time.time() >= meta[1]:
+            self._drop_disk(key)
+            self._stats['expirations'] += 1
+            return None
+        try:
+            with open(self._spill_path(key), 'rb') as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self._drop_disk(key)
+            return None
+        self._drop_disk(key)
+        matrix = TemporaryChunkMatrix(payload['chunks'], payload['matrix'])
+        entry = CachedDocument(key, payload['text'], matrix, 0)
+        entry.created_at = payload['created_at']
+        entry.expires_at = payload['expires_at']
+        return entry
+
+    # ------------------------------------------------------------------
+    # Memoria
+    # ------------------------------------------------------------------
+
+    def _insert(self, entry: CachedDocument):
+        previous = self._entries.pop(entry.document_hash, None)
+        if previous is not None:
+            self._size -= previous.nbytes
+        self._entries[entry.document_hash] = entry
+        self._size += entry.nbytes
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        # Primero lo expirado, luego el menos usado recientemente
+        for key in [k for k, e in self._entries.items() if e.expired(now)]:
+            self._size -= self._entries.pop(key).nbytes
+            self._stats['expirations'] += 1
+        while self._size > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._size -= entry.nbytes
+            self._stats['evictions'] += 1
+            self._spill(entry)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        """Buscar un documento procesado por su hash (None si no está o expiró)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expired():
+                    self._size -= self._entries.pop(key).nbytes
+                    self._stats['expirations'] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['processing_s_saved'] += self._processing_s.get(key, 0.0)
+                    return entry
+            entry = self._load_from_disk(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._stats['processing_s_saved'] += self._processing_s.get(key, 0.0)
+            self._insert(entry)
+            return entry
+
+    def put(
+        self,
+        key: str,
+        text: str,
+        chunks: Sequence[Dict],
+        embeddings=None,
+        ttl: Optional[float] = None
+    ) -> CachedDocument:
+        """
+        Guardar un documento procesado
+
+        Args:
+            key: Hash SHA-256 del documento
+            text: Texto extraído
+            chunks: Chunks (con "embedding" si no se pasa embeddings)
+            embeddings: Matriz (n_chunks × dim) de embeddings
+            ttl: TTL propio de esta entrada
+        """
+        matrix = TemporaryChunkMatrix(chunks, embeddings)
+        entry = CachedDocument(key, text, matrix, self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._drop_disk(key)
+            self._insert(entry)
+        return entry
+
+    def get_or_process(
+        self,
+        key: str,
+        process: Callable[[], Tuple[str, Sequence[Dict], Optional[np.ndarray]]]
+    ) -> CachedDocument:
+        """
+        Devolver el documento del caché o procesarlo y guardarlo
+
+        Args:
+            key: Hash SHA-256 del documento
+            process: Función sin argumentos que extrae, divide y embebe;
+                devuelve (texto, chunks, embeddings)
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Otro hilo pudo terminar de procesarlo mientras esperábamos
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and not entry.expired():
+                return entry
+            start = time.perf_counter()
+            text, chunks, embeddings = process()
+            entry = self.put(key, text, chunks, embeddings)
+            with self._lock:
+                self._processing_s[key] = time.perf_counter() - start
+                self._key_locks.pop(key, None)
+            return entry
+
+    def invalidate(self, key: str) -> bool:
+        """Eliminar un documento del caché (memoria y disco)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.nbytes
+            on_disk = key in self._disk
+            self._drop_disk(key)
+            self._processing_s.pop(key, None)
+            return entry is not None or on_disk
+
+    def purge_expired(self) -> int:
+        """Eliminar lo expirado en memoria y disco; devuelve cuántas entradas"""
+        now = time.time()
+        with self._lock:
+            before = self._stats['expirations']
+            self._evict()
+            for key in [k for k, (_, expires_at) in self._disk.items() if now >= expires_at]:
+                self._drop_disk(key)
+                self._stats['expirations'] += 1
+            return self._stats['expirations'] - before
+
+    def clear(self):
+        """Vaciar el caché"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            for key in list(self._disk):
+                self._drop_disk(key)
+            self._processing_s.clear()
+
+    def get_stats(self) -> Dict:
+        """Hit rate, ocupación en memoria/disco y tiempo de procesamiento ahorrado"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['size_bytes'] = self._size
+            stats['disk_entries'] = len(self._disk)
+            stats['disk_bytes'] = self._disk_size
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def print_stats(self):
+        """Imprimir resumen del caché"""
+        stats = self.get_stats()
+        print(f"\n📦 Caché de documentos temporales (TTL {self.ttl:.0f}s)")
+        print(f"   └─ En memoria: {stats['entries']:,} ({stats['size_bytes']/1024/1024:.1f} MB)")
+        print(f"   └─ En disco: {stats['disk_entries']:,} ({stats['disk_bytes']/1024/1024:.1f} MB)")
+        print(f"   └─ Hit rate: {stats['hit_rate']*100:.1f}% "
+              f"({stats['hits']:,} memoria / {stats['disk_hits']:,} disco / {stats['misses']:,} misses)")
+        print(f"   └─ Expirados: {stats['expirations']:,} | Desalojados: {stats['evictions']:,}")
+        print(f"   └─ Procesamiento ahorrado: {stats['processing_s_saved']:.1f}s")
+
+
+# ============================================================================
+# SERVICIO PARA LOS WORKFLOWS
+# ============================================================================
+
+TEXT_EXTENSIONS = ('.txt', '.md', '.csv', '.json', '.html', '.xml')
+
+
+def extract_text(filename: str, content: bytes) -> str:
+    """Texto de un documento temporal (PDF con PyPDF2, texto plano decodificado)"""
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == '.pdf':
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(io.BytesIO(content))
+        return '\n'.join((page.extract_text() or '') for page in reader.pages)
+    if extension in TEXT_EXTENSIONS:
+        return content.decode('utf-8', errors='replace')
+    raise ValueError(f"Tipo de documento no soportado: {extension or filename}")
+
+
+def document_processor(
+    filename: str,
+    content: bytes,
+    embed: Callable[[List[str]], List[List[float]]],
+    chunk_size: int = 500,
+    overlap: int = 50
+) -> Callable[[], Tuple[str, List[Dict], np.ndarray]]:
+    """
+    Función `process` de get_or_process: extraer, dividir (mismo tamaño y
+    solapamiento que la ingesta) y embeber los chunks en una sola llamada
+    """
+    def process():
+        text = extract_text(filename, content)
+        contents = [chunk for chunk in chunk_stream(iter([text]), chunk_size, overlap) if chunk.strip()]
+        if not contents:
+            raise ValueError(f"{filename} no tiene texto extraíble")
+        chunks = [{'content': chunk, 'chunk_index': i, 'filename': filename} for i, chunk in enumerate(contents)]
+        return text, chunks, np.asarray(embed(contents), dtype=np.float32)
+    return process
+
+
+def serve(cache: TempDocumentCache, scheduler, host: str = "127.0.0.1", port: int = 8767) -> ThreadingHTTPServer:
+    """
+    Exponer el caché a los workflows de documentos temporales
+
+    - POST /temp-documents/search: {"query", "document": {"filename", "file_base64"}
+      o {"document_hash"}, "top_k", "mmr_lambda"} → chunks más relevantes del documento
+    - GET /stats: hit rate del caché de documentos y del de embeddings
+
+    Reemplaza los pasos 2-4 y 7 de RAG_CON_DOCUMENTOS_TEMPORALES.md: la primera
+    pregunta extrae, divide y embebe el documento (get_or_process); las de
+    seguimiento sobre el mismo archivo van directo a la similitud. Con solo
+    document_hash responde 404 si el documento ya no está (hay que reenviarlo).
+
+    Args:
+        cache: Caché de documentos procesados
+        scheduler: EmbeddingScheduler (con su EmbeddingCache) para chunks y preguntas
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: Dict):
+            raw = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path != '/stats':
+                self._reply(404, {'error': {'message': 'Ruta no encontrada'}})
+                return
+            stats = {'documents': cache.get_stats(), 'embeddings': scheduler.get_stats()}
+            if scheduler.cache is not None:
+                stats['embedding_cache'] = scheduler.cache.get_stats()
+            self._reply(200, stats)
+
+        def do_POST(self):
+            if self.path != '/temp-documents/search':
+                self._reply(404, {'error': {'message': 'Ruta no encontrada'}})
+                return
+            start = time.perf_counter()
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+                document = body.get('document') or {}
+                if not body.get('query'):
+                    raise ValueError('query es requerido')
+                if document.get('file_base64'):
+                    content = base64.b64decode(document['file_base64'])
+                    key = document_hash(content)
+                    processor = document_processor(document.get('filename', 'documento.txt'), content, scheduler.embed)
+                    processed = []
+
+                    def process():
+                        processed.append(True)
+                        return processor()
+                    entry = cache.get_or_process(key, process)
+                    hit = not processed
+                elif document.get('document_hash'):
+                    key = document['document_hash']
+                    entry = cache.get(key)
+                    hit = True
+                    if entry is None:
+                        self._reply(404, {'error': {'message': 'Documento no disponible en caché; reenvía file_base64'},
+                                          'document_hash': key})
+                        return
+                else:
+                    raise ValueError('document.file_base64 o document.document_hash es requerido')
+
+                query_embedding = scheduler.embed([body['query']])[0]
+                top_k = int(body.get('top_k') or 3)
+                mmr_lambda = body.get('mmr_lambda')
+                if mmr_lambda is None or float(mmr_lambda) >= 1.0:
+                    chunks = entry.matrix.search(query_embedding, k=top_k)
+                else:
+                    chunks = entry.matrix.search_diverse(query_embedding, k=top_k, lambda_=float(mmr_lambda))
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {'error': {'message': str(e)}})
+                return
+            except ImportError as e:
+                self._reply(501, {'error': {'message': f"Dependencia faltante: {e}"}})
+                return
+            except Exception as e:
+                self._reply(502, {'error': {'message': str(e)[:500]}})
+                return
+            self._reply(200, {
+                'document_hash': key,
+                'cache_hit': hit,
+                'total_chunks': len(entry.chunks),
+                'chunks': chunks,
+                'processing_ms': round((time.perf_counter() - start) * 1000, 1)
+            })
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        from embedding_scheduler import EmbeddingScheduler
+
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8767
+        host = os.getenv('TEMP_DOC_SERVICE_HOST', '127.0.0.1')
+        os.environ.setdefault('EMBEDDING_CACHE_PATH', '.cache/embeddings.sqlite')
+        cache = TempDocumentCache.from_env()
+        scheduler = EmbeddingScheduler.from_env()
+        srv = serve(cache, scheduler, host=host, port=port)
+        print(f"📄 Servicio de documentos temporales en http://{host}:{port}")
+        print(f"   TTL {cache.ttl:.0f}s, {cache.max_bytes/1024/1024:.0f} MB en memoria"
+              f"{', spill en ' + cache.spill_dir if cache.spill_dir else ''}")
+        print("   Apunta TEMP_DOC_SERVICE_URL a esa URL. Ctrl-C para salir.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.shutdown()
+            scheduler.close()
+            cache.print_stats()
+            scheduler.cache.print_stats()
+            print()
+    else:
+        print("\nUso:")
+        print("  python3 scripts/temp_document_cache.py --serve [puerto]\n")
@@ -4,6 +4,7 @@ Script para probar consultas RAG con documentos proporcionados en tiempo real
 """
 
 import base64
+import hashlib
 import requests
 import sys
 import os
@@ -64,7 +65,8 @@ def query_with_document(
     
     try:
         with open(document_path, 'rb') as f:
-            file_content = base64.b64encode(f.read()).decode('utf-8')
+            content = f.read()
+        file_content = base64.b64encode(content).decode('utf-8')
     except Exception as e:
         print(f"❌ Error leyendo archivo: {e}")
         return None
@@ -75,6 +77,8 @@ def query_with_document(
         "document": {
             "filename": os.path.basename(document_path),
             "file_base64": file_content,
+            # Llave del caché de documentos procesados (temp_document_cache.py --serve)
+            "document_hash": hashlib.sha256(content).hexdigest(),
             "use_indexed_docs": use_indexed,
             "top_k_indexed": top_k_indexed
         }
@@ -0,0 +1,398 @@
+"""
+Workflow Backup - Respaldo y restauración de todos los workflows de n8n
+Cada respaldo es un manifiesto (snapshot) que apunta a objetos direccionados
+por contenido: un workflow que no cambió (mismo versionId) no se vuelve a
+descargar ni a escribir. La restauración corre en paralelo respetando las
+dependencias entre workflows (nodos "Execute Workflow")
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from n8n_manager import N8nManager, WRITABLE_WORKFLOW_FIELDS
+
+EXECUTE_WORKFLOW_NODE = 'n8n-nodes-base.executeWorkflow'
+
+# 20261019T020000.123456Z.json; también los nombres anteriores 20261019T020000Z(-N).json
+_SNAPSHOT_NAME = re.compile(r'^(\d{8}T\d{6})(?:\.(\d{6}))?Z(?:-(\d+))?\.json$')
+
+
+def workflow_hash(workflow: Dict) -> str:
+    """SHA-256 del workflow serializado en forma canónica"""
+    canonical = json.dumps(workflow, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _referenced_id(node: Dict) -> Optional[str]:
+    """ID del sub-workflow de un nodo Execute Workflow ("123" o {"__rl": true, "value": "123"})"""
+    value = (node.get('parameters') or {}).get('workflowId')
+    if isinstance(value, dict):
+        value = value.get('value')
+    return str(value) if value not in (None, '') else None
+
+
+def workflow_dependencies(workflow: Dict) -> Set[str]:
+    """IDs de los workflows que este workflow ejecuta"""
+    return {
+        workflow_id
+        for node in workflow.get('nodes', [])
+        if node.get('type') == EXECUTE_WORKFLOW_NODE
+        for workflow_id in [_referenced_id(node)]
+        if workflow_id
+    }
+
+
+def restore_levels(dependencies: Dict[str, Set[str]]) -> List[List[str]]:
+    """
+    Agrupar los workflows en niveles: cada nivel solo depende de los anteriores
+
+    Los sub-workflows se restauran antes que quienes los llaman para poder
+    reescribir las referencias con los IDs nuevos. Los ciclos (raros, pero
+    posibles) quedan juntos en el último nivel.
+    """
+    pending = {workflow_id: set(deps) & set(dependencies) for workflow_id, deps in dependencies.items()}
+    levels: List[List[str]] = []
+    done: Set[str] = set()
+    while pending:
+        ready = sorted(workflow_id for workflow_id, deps in pending.items() if deps <= done)
+        if not ready:
+            levels.append(sorted(pending))
+            break
+        levels.append(ready)
+        done.update(ready)
+        for workflow_id in ready:
+            del pending[workflow_id]
+    return levels
+
+
+class WorkflowBackup:
+    """
+    Respaldos incrementales en un directorio
+
+    Estructura:
+        objects/ab/abcdef....json.z   workflow completo (zlib), nombre = SHA-256
+        snapshots/20261019T020000.123456Z.json   manifiesto: id, nombre, versionId, objeto
+    """
+
+    def __init__(self, manager: N8nManager, root: str = "backups/workflows", max_workers: int = 8):
+        """
+        Args:
+            manager: Cliente de n8n
+            root: Directorio de respaldos
+            max_workers: Descargas/restauraciones en paralelo
+        """
+        self.manager = manager
+        self.root = root
+        self.max_workers = max_workers
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'snapshots'), exist_ok=True)
+
+    @classmethod
+    def from_env(cls, manager: N8nManager, **overrides) -> 'WorkflowBackup':
+        """Crear el respaldo a partir de las variables de config_template.env"""
+        options = {'root': os.getenv('WORKFLOW_BACKUP_DIR', 'backups/workflows')}
+        options.update(overrides)
+        return cls(manager, **options)
+
+    # ------------------------------------------------------------------
+    # Objetos y manifiestos
+    # ------------------------------------------------------------------
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.json.z")
+
+    def _write_object(self, workflow: Dict) -> Tuple[str, bool]:
+        digest = workflow_hash(workflow)
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        raw = json.dumps(workflow, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(zlib.compress(raw, 6))
+        os.replace(tmp, path)
+        return digest, True
+
+    def load_object(self, digest: str) -> Dict:
+        with open(self._object_path(digest), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+
+    @staticmethod
+    def _snapshot_order(name: str) -> Tuple:
+        match = _SNAPSHOT_NAME.match(name)
+        if not match:
+            return (name, '', 0)
+        return (match.group(1), match.group(2) or '000000', int(match.group(3) or 0))
+
+    def list_snapshots(self) -> List[str]:
+        """Rutas de los manifiestos, del más antiguo al más reciente"""
+        directory = os.path.join(self.root, 'snapshots')
+        names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), key=self._snapshot_order)
+        return [os.path.join(directory, name) for name in names]
+
+    def load_snapshot(self, path: Optional[str] = None) -> Dict:
+        """Leer un manifiesto (por defecto, el más reciente)"""
+        if path is None:
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                raise FileNotFoundError(f"No hay respaldos en {self.root}")
+            path = snapshots[-1]
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # ------------------------------------------------------------------
+    # Respaldo
+    # ------------------------------------------------------------------
+
+    def backup(self) -> Dict:
+        """
+        Respaldar todos los workflows
+
+        El listado paginado trae el versionId de cada workflow; solo los que
+        cambiaron desde el último respaldo se descargan (en paralelo).
+
+        Returns:
+            {"snapshot", "workflows", "fetched", "skipped", "objects_written",
+             "list_s", "fetch_s", "elapsed_s"}
+        """
+        start = time.perf_counter()
+        try:
+            previous = {entry['id']: entry for entry in self.load_snapshot()['workflows']}
+        except FileNotFoundError:
+            previous = {}
+
+        listed = list(self.manager.iter_workflows())
+        list_s = time.perf_counter() - start
+
+        entries: Dict[str, Dict] = {}
+        to_fetch: List[Dict] = []
+        for workflow in listed:
+            before = previous.get(workflow['id'])
+            unchanged = (
+                before is not None
+                and workflow.get('versionId')
+                and before.get('versionId') == workflow.get('versionId')
+                and os.path.exists(self._object_path(before['object']))
+            )
+            if unchanged:
+                entries[workflow['id']] = {**before, 'active': workflow.get('active', False)}
+            else:
+                to_fetch.append(workflow)
+
+        def fetch(summary: Dict) -> Dict:
+            workflow = self.manager.get_workflow(summary['id'])
+            digest, written = self._write_object(workflow)
+            return {
+                'entry': {
+                    'id': workflow['id'],
+                    'name': workflow.get('name'),
+                    'active': workflow.get('active', False),
+                    'versionId': workflow.get('versionId'),
+                    'updatedAt': workflow.get('updatedAt'),
+                    'object': digest,
+                    'depends_on': sorted(workflow_dependencies(workflow))
+                },
+                'written': written
+            }
+
+        fetch_start = time.perf_counter()
+        written = 0
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_fetch))) as executor:
+                for result in executor.map(fetch, to_fetch):
+                    entries[result['entry']['id']] = result['entry']
+                    written += result['written']
+        fetch_s = time.perf_counter() - fetch_start
+
+        # Microsegundos en el nombre: dos respaldos en el mismo segundo siguen
+        # ordenándose cronológicamente (load_snapshot toma el último)
+        while True:
+            created_at = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')
+            snapshot_path = os.path.join(self.root, 'snapshots', f"{created_at}.json")
+            if not os.path.exists(snapshot_path):
+                break
+        with open(snapshot_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': created_at,
+                'base_url': self.manager.base_url,
+                'workflows': sorted(entries.values(), key=lambda entry: str(entry['name']))
+            }, f, indent=2, ensure_ascii=False)
+
+        return {
+            'snapshot': snapshot_path,
+            'workflows': len(entries),
+            'fetched': len(to_fetch),
+            'skipped': len(listed) - len(to_fetch),
+            'objects_written': written,
+            'list_s': list_s,
+            'fetch_s': fetch_s,
+            'elapsed_s': time.perf_counter() - start
+        }
+
+    # ------------------------------------------------------------------
+    # Restauración
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _remap(workflow: Dict, id_map: Dict[str, str]) -> Dict:
+        """Reescribir las referencias a sub-workflows con los IDs del servidor destino"""
+        if not id_map:
+            return workflow
+        nodes = []
+        for node in workflow.get('nodes', []):
+            old_id = _referenced_id(node) if node.get('type') == EXECUTE_WORKFLOW_NODE else None
+            if old_id in id_map:
+                parameters = dict(node['parameters'])
+                if isinstance(parameters['workflowId'], dict):
+                    parameters['workflowId'] = {**parameters['workflowId'], 'value': id_map[old_id]}
+                else:
+                    parameters['workflowId'] = id_map[old_id]
+                node = {**node, 'parameters': parameters}
+            nodes.append(node)
+        return {**workflow, 'nodes': nodes}
+
+    def restore(
+        self,
+        snapshot_path: Optional[str] = None,
+        names: Optional[Sequence[str]] = None,
+        activate: bool = True
+    ) -> Dict:
+        """
+        Restaurar un respaldo
+
+        Un workflow cuyo ID existe en el servidor se actualiza; si no existe se
+        crea (con un ID nuevo) y las referencias de quienes lo llaman se
+        reescriben. Los workflows de un mismo nivel de dependencias se
+        restauran en paralelo y la activación va al final, cuando ya existen
+        todos los sub-workflows.
+
+        Args:
+            snapshot_path: Manifiesto (por defecto, el más reciente)
+            names: Restaurar solo estos workflows (por nombre)
+            activate: Reactivar los que estaban activos al respaldar
+
+        Returns:
+            {"created", "updated", "activated", "levels", "errors": [...], "elapsed_s"}
+        """
+        start = time.perf_counter()
+        snapshot = self.load_snapshot(snapshot_path)
+        entries = {
+            entry['id']: entry for entry in snapshot['workflows']
+            if names is None or entry['name'] in names
+        }
+        existing = {workflow['id'] for workflow in self.manager.iter_workflows()}
+        levels = restore_levels({
+            workflow_id: set(entry.get('depends_on', [])) for workflow_id, entry in entries.items()
+        })
+
+        id_map: Dict[str, str] = {}
+        counts = {'created': 0, 'updated': 0, 'activated': 0}
+        errors: List[Dict] = []
+
+        def restore_one(workflow_id: str) -> Dict:
+            entry = entries[workflow_id]
+            try:
+                workflow = self._remap(self.load_object(entry['object']), id_map)
+                payload = {k: v for k, v in workflow.items() if k in WRITABLE_WORKFLOW_FIELDS}
+                if workflow_id in existing:
+                    self.manager.update_workflow(workflow_id, payload)
+                    return {'id': workflow_id, 'new_id': workflow_id, 'kind': 'updated'}
+                created = self.manager.create_workflow(payload)
+                return {'id': workflow_id, 'new_id': created['id'], 'kind': 'created'}
+            except Exception as e:
+                return {'id': workflow_id, 'name': entry['name'], 'error': str(e)[:300]}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for level in levels:
+                for result in executor.map(restore_one, level):
+                    if 'error' in result:
+                        errors.append(result)
+                        continue
+                    counts[result['kind']] += 1
+                    if result['new_id'] != result['id']:
+                        id_map[result['id']] = result['new_id']
+
+            if activate:
+                failed = {error['id'] for error in errors}
+                to_activate = [
+                    id_map.get(workflow_id, workflow_id)
+                    for workflow_id, entry in entries.items()
+                    if entry.get('active') and workflow_id not in failed
+                ]
+
+                def activate_one(workflow_id: str) -> Optional[Dict]:
+                    try:
+                        self.manager.activate_workflow(workflow_id)
+                        return None
+                    except Exception as e:
+                        return {'id': workflow_id, 'error': f"activación: {str(e)[:300]}"}
+
+                for error in executor.map(activate_one, to_activate):
+                    if error:
+                        errors.append(error)
+                    else:
+                        counts['activated'] += 1
+
+        return {
+            **counts,
+            'levels': len(levels),
+            'id_map': id_map,
+            'errors': errors,
+            'elapsed_s': time.perf_counter() - start
+        }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ('--backup', '--restore', '--list'):
+        print("\nUso:")
+        print("  python3 scripts/workflow_backup.py --backup")
+        print("  python3 scripts/workflow_backup.py --list")
+        print("  python3 scripts/workflow_backup.py --restore [snapshot.json] [--no-activate]\n")
+        sys.exit(1)
+
+    n8n_url = os.getenv('N8N_URL', "http://159.203.149.247:5678")
+    api_key = os.getenv('N8N_API_KEY', '')
+    if not api_key and args[0] != '--list':
+        print("\n❌ Define N8N_API_KEY (y opcionalmente N8N_URL)\n")
+        sys.exit(1)
+
+    backups = WorkflowBackup.from_env(N8nManager(n8n_url, api_key))
+    if args[0] == '--list':
+        print(f"\n🗂️  Respaldos en {backups.root}:")
+        for path in backups.list_snapshots():
+            with open(path, 'r', encoding='utf-8') as f:
+                count = len(json.load(f)['workflows'])
+            print(f"   └─ {os.path.basename(path)} ({count} workflows)")
+    elif args[0] == '--backup':
+        result = backups.backup()
+        print(f"\n💾 {result['workflows']} workflows respaldados en {result['elapsed_s']:.2f}s")
+        print(f"   └─ Descargados: {result['fetched']} | Sin cambios: {result['skipped']} | "
+              f"Objetos nuevos: {result['objects_written']}")
+        print(f"   └─ Listado: {result['list_s']:.2f}s | Descarga: {result['fetch_s']:.2f}s")
+        print(f"   └─ Manifiesto: {result['snapshot']}")
+    else:
+        snapshot = next((arg for arg in args[1:] if not arg.startswith('--')), None)
+        result = backups.restore(snapshot, activate='--no-activate' not in args)
+        print(f"\n♻️  Restauración en {result['elapsed_s']:.2f}s ({result['levels']} niveles de dependencias)")
+        print(f"   └─ Creados: {result['created']} | Actualizados: {result['updated']} | "
+              f"Activados: {result['activated']}")
+        for error in result['errors']:
+            print(f"   ❌ {error.get('name', error['id'])}: {error['error']}")
+    print()
@@ -0,0 +1,431 @@
+"""
+Workflow Linter - Revisión estática de rendimiento de los workflows de n8n
+Analiza las definiciones (nodos, conexiones y el jsCode embebido) y reporta
+loops sin terminación garantizada, copias del payload completo, llamadas HTTP
+por item que podrían ir en lote, webhooks sin timeout y binarios que viajan
+por nodos que no los usan. Sale con código 1 si hay errores (para CI)
+"""
+
+import json
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SEVERITIES = ('error', 'warning', 'info')
+
+_LINE_COMMENT_RE = re.compile(r"(^|\s)//[^\n]*")
+_LOOP_RE = re.compile(r"\b(for|while)\s*\(")
+_CALLBACK_RE = re.compile(r"\.(map|forEach|flatMap)\s*\(")
+_HTTP_CALL_RE = re.compile(r"(this\.helpers\.(httpRequest|request)\w*|\$http\.\w+|\bfetch)\s*\(")
+_ITEMS_LOOP_RE = re.compile(r"\bof\s+(items|\$input\.all\(\))|^(items|\$input\.all\(\))$")
+_SPREAD_JSON_RE = re.compile(r"\.\.\.\s*(item\.json|\$json|\$input\.item\.json)\b")
+_FORWARD_BINARY_RE = re.compile(r"\bbinary\s*:\s*item\.binary\b")
+_READ_BINARY_RE = re.compile(r"\.binary\s*(\.|\?\.|\[|&&|\)|\?\?)")
+_BLOB_FIELD = 'file_base64'
+_OMIT_BLOB_RE = re.compile(r"\{\s*[^}]*\bfile_base64\b[^}]*\.\.\.\s*\w+\s*\}\s*=|file_base64\s*:\s*undefined|delete\s+[\w$.]+\.file_base64")
+
+
+class LintIssue:
+    """Hallazgo del linter"""
+
+    __slots__ = ('rule', 'severity', 'workflow', 'node', 'message')
+
+    def __init__(self, rule: str, severity: str, workflow: str, node: Optional[str], message: str):
+        self.rule = rule
+        self.severity = severity
+        self.workflow = workflow
+        self.node = node
+        self.message = message
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"LintIssue({self.severity}, {self.rule}, {self.node!r})"
+
+
+# ============================================================================
+# ANÁLISIS DE JAVASCRIPT
+# ============================================================================
+
+def strip_comments(code: str) -> str:
+    """Quitar comentarios // (se conservan los saltos de línea)"""
+    return _LINE_COMMENT_RE.sub(lambda m: m.group(1), code)
+
+
+def _matching(code: str, start: int, open_char: str, close_char: str) -> int:
+    """Índice del cierre que corresponde a code[start] (o len(code))"""
+    depth = 0
+    for i in range(start, len(code)):
+        if code[i] == open_char:
+            depth += 1
+        elif code[i] == close_char:
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(code)
+
+
+def loop_spans(code: str) -> List[Tuple[str, str, int, int]]:
+    """
+    Loops del código
+
+    Returns:
+        [(tipo, cabecera, inicio del cuerpo, fin del cuerpo)] con tipo
+        'for', 'while' o el nombre del callback ('map', 'forEach', ...)
+    """
+    spans = []
+    for match in _LOOP_RE.finditer(code):
+        paren = match.end() - 1
+        close = _matching(code, paren, '(', ')')
+        header = code[paren + 1:close]
+        body_start = close + 1
+        while body_start < len(code) and code[body_start].isspace():
+            body_start += 1
+        if body_start < len(code) and code[body_start] == '{':
+            body_end = _matching(code, body_start, '{', '}')
+        else:
+            body_end = code.find(';', body_start)
+            body_end = len(code) if body_end < 0 else body_end
+        spans.append((match.group(1), header.strip(), body_start, body_end))
+    for match in _CALLBACK_RE.finditer(code):
+        paren = match.end() - 1
+        close = _matching(code, paren, '(', ')')
+        # La "cabecera" de un callback es la expresión sobre la que se itera
+        receiver = re.search(r"([\w$.()]+)$", code[:match.start()])
+        spans.append((match.group(1), receiver.group(1) if receiver else '', paren + 1, close))
+    return sorted(spans, key=lambda span: span[2])
+
+
+def _enclosing(spans: Sequence[Tuple[str, str, int, int]], position: int) -> List[Tuple[str, str, int, int]]:
+    return [span for span in spans if span[2] <= position <= span[3]]
+
+
+def _iterates_items(span: Tuple[str, str, int, int]) -> bool:
+    return bool(_ITEMS_LOOP_RE.search(span[1]))
+
+
+def unbounded_while_loops(code: str) -> List[str]:
+    """
+    Loops while que pueden no terminar
+
+    Se marca un `while (v < límite)` cuyo cuerpo no tiene break/return y
+    reasigna `v` restando (p. ej. `start = end - OVERLAP`): cuando `end` llega
+    al límite, `v` deja de avanzar. También `while (true)` sin salida y loops
+    que nunca modifican su variable de control.
+    """
+    problems = []
+    for kind, header, body_start, body_end in loop_spans(code):
+        if kind != 'while':
+            continue
+        body = code[body_start:body_end + 1]
+        exits = re.search(r"\b(break|return|throw)\b", body)
+        if header in ('true', '1', '!0'):
+            if not exits:
+                problems.append(f"while ({header}) sin break/return")
+            continue
+        match = re.match(r"([\w$]+)\s*(<=?|!==?|>=?)", header)
+        if not match or exits:
+            continue
+        var = match.group(1)
+        assignments = re.findall(rf"(?<![\w$.]){re.escape(var)}\s*([-+*/]?=(?!=)|\+\+|--)\s*([^;\n]*)", body)
+        if not assignments:
+            problems.append(f"while ({header}): el cuerpo nunca modifica '{var}'")
+            continue
+        for operator, value in assignments:
+            if operator == '=' and re.search(r"-\s*[\w$]", value) and var not in value:
+                problems.append(
+                    f"while ({header}): '{var} = {value.strip()}' puede dejar de avanzar al llegar al final "
+                    f"(agrega un break cuando se alcance el límite)"
+                )
+                break
+    return problems
+
+
+def per_item_http_calls(code: str) -> int:
+    """Llamadas HTTP dentro de un loop sobre los items que no avanza por lotes"""
+    spans = loop_spans(code)
+    count = 0
+    for match in _HTTP_CALL_RE.finditer(code):
+        enclosing = _enclosing(spans, match.start())
+        if not any(_iterates_items(span) for span in enclosing):
+            continue
+        # Un loop interno con paso (i += BATCH_SIZE) indica que ya se envía en lotes
+        if any('+=' in span[1] for span in enclosing):
+            continue
+        count += 1
+    return count
+
+
+def fans_out(code: str) -> bool:
+    """El nodo genera varios items por cada item de entrada (push dentro de loops anidados)"""
+    spans = loop_spans(code)
+    for match in re.finditer(r"\boutput\.push\s*\(", code):
+        enclosing = _enclosing(spans, match.start())
+        if len(enclosing) >= 2 or any(span[0] == 'while' for span in enclosing):
+            return True
+    return False
+
+
+def spread_in_fan_out(code: str) -> bool:
+    """`...item.json` dentro del push de un loop que genera varios items por entrada"""
+    spans = loop_spans(code)
+    for match in _SPREAD_JSON_RE.finditer(code):
+        enclosing = _enclosing(spans, match.start())
+        if len(enclosing) >= 2 or any(span[0] == 'while' for span in enclosing):
+            return True
+    return False
+
+
+# ============================================================================
+# GRAFO DEL WORKFLOW
+# ============================================================================
+
+def _code(node: Dict) -> str:
+    return strip_comments((node.get('parameters') or {}).get('jsCode') or '')
+
+
+def _text(node: Dict) -> str:
+    """Todo lo que el nodo referencia: jsCode sin comentarios y expresiones de los parámetros"""
+    parameters = dict(node.get('parameters') or {})
+    code = strip_comments(parameters.pop('jsCode', '') or '')
+    return code + "\n" + json.dumps(parameters, ensure_ascii=False)
+
+
+def _successors(workflow: Dict) -> Dict[str, List[str]]:
+    successors: Dict[str, List[str]] = {node['name']: [] for node in workflow.get('nodes', [])}
+    for source, outputs in (workflow.get('connections') or {}).items():
+        for output in outputs.get('main') or []:
+            for target in output or []:
+                successors.setdefault(source, []).append(target['node'])
+    return successors
+
+
+def _downstream(successors: Dict[str, List[str]], name: str) -> Set[str]:
+    seen: Set[str] = set()
+    stack = list(successors.get(name, []))
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(successors.get(current, []))
+    return seen
+
+
+def _topological(successors: Dict[str, List[str]]) -> List[str]:
+    indegree = {name: 0 for name in successors}
+    for targets in successors.values():
+        for target in targets:
+            indegree[target] = indegree.get(target, 0) + 1
+    queue = [name for name, degree in indegree.items() if degree == 0]
+    order = []
+    while queue:
+        current = queue.pop(0)
+        order.append(current)
+        for target in successors.get(current, []):
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    return order
+
+
+def _predecessors(successors: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    predecessors: Dict[str, List[str]] = {name: [] for name in successors}
+    for source, targets in successors.items():
+        for target in targets:
+            predecessors.setdefault(target, []).append(source)
+    return predecessors
+
+
+def _propagation(
+    workflow: Dict,
+    successors: Dict[str, List[str]],
+    origin: Callable[[Dict], bool],
+    keeps: Callable[[Dict], bool]
+) -> Dict[str, bool]:
+    """Para cada nodo, si el dato llega a su entrada"""
+    nodes = {node['name']: node for node in workflow.get('nodes', [])}
+    predecessors = _predecessors(successors)
+    carries_in: Dict[str, bool] = {}
+    carries_out: Dict[str, bool] = {}
+    for name in _topological(successors):
+        node = nodes.get(name, {})
+        incoming = any(carries_out.get(p) for p in predecessors.get(name, []))
+        carries_in[name] = incoming
+        carries_out[name] = origin(node) or (incoming and keeps(node))
+    return carries_in
+
+
+# ============================================================================
+# REGLAS
+# ============================================================================
+
+def rule_unbounded_loop(workflow: Dict) -> Iterator[LintIssue]:
+    for node in workflow.get('nodes', []):
+        for problem in unbounded_while_loops(_code(node)):
+            yield LintIssue('unbounded-loop', 'error', workflow['name'], node['name'], problem)
+
+
+def rule_per_item_http(workflow: Dict) -> Iterator[LintIssue]:
+    nodes = {node['name']: node for node in workflow.get('nodes', [])}
+    successors = _successors(workflow)
+    for node in nodes.values():
+        calls = per_item_http_calls(_code(node))
+        if calls:
+            yield LintIssue(
+                'per-item-http', 'warning', workflow['name'], node['name'],
+                f"{calls} llamada(s) HTTP por item dentro de un loop; agrúpalas en una petición por lote"
+            )
+    # Un nodo HTTP después de un nodo que multiplica items hace una petición por item
+    for name, node in nodes.items():
+        if not fans_out(_code(node)):
+            continue
+        for target in _downstream(successors, name):
+            target_node = nodes.get(target, {})
+            options = (target_node.get('parameters') or {}).get('options') or {}
+            if target_node.get('type') == 'n8n-nodes-base.httpRequest' and not options.get('batching'):
+                yield LintIssue(
+                    'per-item-http', 'warning', workflow['name'], target,
+                    f"se ejecuta una vez por cada item que genera '{name}'; "
+                    f"envía los items en un arreglo o configura options.batching"
+                )
+
+
+def rule_timeouts(workflow: Dict) -> Iterator[LintIssue]:
+    settings = workflow.get('settings') or {}
+    has_timeout = (settings.get('executionTimeout') or -1) > 0
+    for node in workflow.get('nodes', []):
+        parameters = node.get('parameters') or {}
+        if node.get('type') == 'n8n-nodes-base.webhook' and not has_timeout:
+            if parameters.get('responseMode') in ('responseNode', 'lastNode'):
+                yield LintIssue(
+                    'webhook-timeout', 'warning', workflow['name'], node['name'],
+                    f"responseMode '{parameters['responseMode']}' sin settings.executionTimeout: "
+                    f"la petición queda abierta si un nodo se cuelga"
+                )
+        if node.get('type') == 'n8n-nodes-base.httpRequest':
+            if not (parameters.get('options') or {}).get('timeout'):
+                yield LintIssue(
+                    'http-timeout', 'warning', workflow['name'], node['name'],
+                    "HTTP Request sin options.timeout (por defecto espera indefinidamente)"
+                )
+
+
+def rule_payload_copy(workflow: Dict) -> Iterator[LintIssue]:
+    nodes = {node['name']: node for node in workflow.get('nodes', [])}
+    successors = _successors(workflow)
+    for node in nodes.values():
+        if spread_in_fan_out(_code(node)):
+            yield LintIssue(
+                'payload-copy', 'warning', workflow['name'], node['name'],
+                "copia todo item.json en cada item generado dentro de un loop; incluye solo los campos necesarios"
+            )
+
+    # file_base64 llega en el webhook y cada `...item.json` lo vuelve a copiar
+    if not any(_BLOB_FIELD in _text(node) for node in nodes.values()):
+        return
+    blob_in = _propagation(
+        workflow, successors,
+        origin=lambda node: node.get('type') == 'n8n-nodes-base.webhook',
+        keeps=lambda node: node.get('type') == 'n8n-nodes-base.respondToWebhook' or (
+            bool(_SPREAD_JSON_RE.search(_code(node))) and not _OMIT_BLOB_RE.search(_code(node))
+        )
+    )
+    for name, node in nodes.items():
+        code = _code(node)
+        if not blob_in.get(name) or not _SPREAD_JSON_RE.search(code) or _OMIT_BLOB_RE.search(code):
+            continue
+        if not any(_BLOB_FIELD in _text(nodes[d]) for d in _downstream(successors, name) if d in nodes):
+            yield LintIssue(
+                'payload-copy', 'warning', workflow['name'], name,
+                f"`...item.json` reenvía '{_BLOB_FIELD}' y ningún nodo posterior lo usa; descártalo aquí"
+            )
+
+
+def rule_binary_propagation(workflow: Dict) -> Iterator[LintIssue]:
+    nodes = {node['name']: node for node in workflow.get('nodes', [])}
+    successors = _successors(workflow)
+    for name, node in nodes.items():
+        if not _FORWARD_BINARY_RE.search(_code(node)):
+            continue
+        readers = [
+            d for d in _downstream(successors, name)
+            if d in nodes and (_READ_BINARY_RE.search(_code(nodes[d])) or
+                               nodes[d].get('type') not in ('n8n-nodes-base.code', 'n8n-nodes-base.respondToWebhook'))
+        ]
+        if not readers:
+            yield LintIssue(
+                'binary-propagation', 'warning', workflow['name'], name,
+                "reenvía item.binary y ningún nodo posterior lo lee; el archivo se serializa en cada paso"
+            )
+
+
+RULES: List[Callable[[Dict], Iterator[LintIssue]]] = [
+    rule_unbounded_loop,
+    rule_per_item_http,
+    rule_timeouts,
+    rule_payload_copy,
+    rule_binary_propagation
+]
+
+
+def lint_workflow(workflow: Dict) -> List[LintIssue]:
+    """Aplicar todas las reglas a un workflow"""
+    issues = [issue for rule in RULES for issue in rule(workflow)]
+    return sorted(issues, key=lambda issue: SEVERITIES.index(issue.severity))
+
+
+def lint_workflows(workflows: Sequence[Dict]) -> List[LintIssue]:
+    return [issue for workflow in workflows for issue in lint_workflow(workflow)]
+
+
+def print_lint_report(issues: Sequence[LintIssue], workflows: Sequence[Dict]):
+    """Imprimir los hallazgos agrupados por workflow"""
+    icons = {'error': '❌', 'warning': '⚠️ ', 'info': 'ℹ️ '}
+    print("\n" + "="*80)
+    print(f"🔎 LINT DE WORKFLOWS ({len(workflows)} workflows)")
+    print("="*80)
+    for workflow in workflows:
+        found = [issue for issue in issues if issue.workflow == workflow['name']]
+        print(f"\n{'✅' if not found else '📋'} {workflow['name']}")
+        for issue in found:
+            print(f"   {icons[issue.severity]} [{issue.rule}] {issue.node}: {issue.message}")
+    counts = {severity: sum(1 for issue in issues if issue.severity == severity) for severity in SEVERITIES}
+    print(f"\n📊 {counts['error']} errores, {counts['warning']} advertencias, {counts['info']} informativos")
+
+
+def default_definitions() -> List[Dict]:
+    """Workflows que construyen setup_rag_workflows.py y n8n_manager.py"""
+    from n8n_manager import create_rag_ingestion_workflow, create_rag_query_workflow
+    from setup_rag_workflows import get_rag_workflow_definitions
+
+    return get_rag_workflow_definitions() + [create_rag_ingestion_workflow(), create_rag_query_workflow()]
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    files = [arg for arg in args if not arg.startswith('--')]
+    if files:
+        workflows = []
+        for path in files:
+            with open(path, 'r', encoding='utf-8') as f:
+                workflows.append(json.load(f))
+    else:
+        workflows = default_definitions()
+
+    issues = lint_workflows(workflows)
+    if '--json' in args:
+        print(json.dumps([issue.to_dict() for issue in issues], indent=2, ensure_ascii=False))
+    else:
+        print_lint_report(issues, workflows)
+        print()
+
+    failing = ('error', 'warning') if '--strict' in args else ('error',)
+    sys.exit(1 if any(issue.severity in failing for issue in issues) else 0)
@@ -0,0 +1,640 @@
+"""
+Workflow Simulator - Ejecución local de los workflows de n8n sin desplegarlos
+Recorre las conexiones del workflow en orden topológico y ejecuta cada nodo con
+una implementación Python registrada (validar, hash, chunking, embedding falso,
+búsqueda en LocalVectorIndex, contexto, respuesta), pasando los items entre
+nodos como lo hace n8n. Registra tiempo, memoria pico e items por nodo
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from context_builder import build_context
+from embedding_scheduler import fake_embedding
+from local_vector_index import NOT_DELETED_FILTER, LocalVectorIndex
+from similarity_engine import mmr_rerank
+
+Item = Dict
+NodeImplementation = Callable[[List[Item], Dict, 'SimulationContext'], List[Item]]
+
+# Implementaciones por id de nodo, nombre o tipo (en ese orden de prioridad)
+IMPLEMENTATIONS: Dict[str, NodeImplementation] = {}
+
+
+def implementation(*keys: str):
+    """Registrar una implementación Python para los nodos con estos ids, nombres o tipos"""
+    def decorator(function: NodeImplementation) -> NodeImplementation:
+        for key in keys:
+            IMPLEMENTATIONS[key] = function
+        return function
+    return decorator
+
+
+def js_constant(node: Dict, name: str, default: int) -> int:
+    """Leer una constante numérica (`const NAME = 500;`) del jsCode del nodo"""
+    match = re.search(rf"\bconst\s+{name}\s*=\s*(\d+)", (node.get('parameters') or {}).get('jsCode') or '')
+    return int(match.group(1)) if match else default
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class SimulationContext:
+    """
+    Estado compartido entre nodos y ejecuciones
+
+    - static_data: $getWorkflowStaticData('global') de cada workflow, por nombre
+      (n8n no lo comparte entre workflows)
+    - workflow_static_data: el static data del workflow en ejecución, que es
+      lo que ven las implementaciones de nodos
+    - index: LocalVectorIndex en lugar de Azure AI Search
+    - metadata: registros por document_id en lugar del contenedor
+      documents_metadata de Cosmos DB
+    - embed: función texto → vector (por defecto fake_embedding)
+    - extract: función item.json → texto (por defecto, el campo "text" o el placeholder del workflow)
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 256,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        extract: Optional[Callable[[Dict], str]] = None
+    ):
+        self.dimensions = dimensions
+        self.static_data: Dict[str, Dict] = {}
+        self.workflow_static_data: Dict = {}
+        self.index = LocalVectorIndex(dimensions=dimensions)
+        self.metadata: Dict[str, Dict] = {}
+        self.embed = embed or (lambda text: fake_embedding(text, dimensions))
+        self.extract = extract or _placeholder_extract
+        self.response: Optional[Dict] = None
+
+    def index_chunks(self, chunk_items: Sequence[Item]) -> int:
+        """Embeber e indexar los chunks que produce el workflow de ingesta (nodo "🧮 Embeber e Indexar")"""
+        documents = [
+            {
+                'chunk_id': item['json']['chunk_id'],
+                'document_id': item['json']['document_id'],
+                'filename': item['json'].get('filename', ''),
+                'chunk_index': item['json'].get('chunk_index'),
+                'content': item['json']['chunk_text'],
+                'content_vector': self.embed(item['json']['chunk_text']),
+                'is_deleted': False
+            }
+            for item in chunk_items if 'chunk_id' in item['json']
+        ]
+        if documents:
+            self.index.upload_documents(documents)
+        return len(documents)
+
+
+def _placeholder_extract(fields: Dict) -> str:
+    if fields.get('text'):
+        return fields['text']
+    return (f"Texto extraído del documento {fields.get('filename')}.\n\nEste es un contenido de ejemplo "
+            f"que en producción vendría de Azure Document Intelligence (Form Recognizer) o de una librería "
+            f"de procesamiento de PDFs.\n\nEl documento contiene información importante que será indexada "
+            f"en el sistema RAG.")
+
+
+# ============================================================================
+# IMPLEMENTACIONES DE NODOS
+# ============================================================================
+
+@implementation('n8n-nodes-base.webhook')
+def _webhook(items, node, context):
+    return items
+
+
+@implementation('n8n-nodes-base.respondToWebhook')
+def _respond(items, node, context):
+    context.response = items[0]['json'] if items else None
+    return items
+
+
+@implementation('validate-input')
+def _validate_input(items, node, context):
+    output = []
+    for item in items:
+        data = item['json']
+        errors = []
+        if not data.get('filename'):
+            errors.append('filename requerido')
+        if not data.get('file_base64') and not item.get('binary'):
+            errors.append('archivo requerido')
+        if errors:
+            raise ValueError('Validación fallida: ' + ', '.join(errors))
+        metadata = {
+            'department': data.get('department') or 'general',
+            'document_type': data.get('document_type') or 'unknown',
+            'tags': data.get('tags') or [],
+            'uploaded_by': data.get('uploaded_by') or 'system'
+        }
+        output.append({'json': {**data, 'metadata': metadata, 'received_at': _now()}, 'binary': item.get('binary')})
+    return output
+
+
+@implementation('calc-hash')
+def _calc_hash(items, node, context):
+    output = []
+    for item in items:
+        binary = (item.get('binary') or {}).get('data')
+        if binary:
+            buffer = binary['data'] if isinstance(binary['data'], bytes) else base64.b64decode(binary['data'])
+        elif item['json'].get('file_base64'):
+            buffer = base64.b64decode(item['json']['file_base64'])
+        else:
+            raise ValueError('No se encontró el archivo')
+        digest = hashlib.sha256(buffer).hexdigest()
+        output.append({
+            'json': {**item['json'], 'document_hash': digest, 'document_id': f"doc_{digest[:16]}",
+                     'file_size': len(buffer)},
+            'binary': item.get('binary')
+        })
+    return output
+
+
+@implementation('check-duplicates')
+def _check_duplicates(items, node, context):
+    output = []
+    for item in items:
+        data = item['json']
+        record = context.metadata.get(data['document_id'])
+        is_duplicate = (
+            record is not None and record.get('status') == 'indexed'
+            and record.get('document_hash') == data['document_hash'] and not data.get('force_reprocess')
+        )
+        output.append({
+            'json': {**data, 'is_duplicate': is_duplicate, 'duplicate_of': record['id'] if is_duplicate else None,
+                     'checked_duplicates': True},
+            'binary': item.get('binary')
+        })
+    return output
+
+
+@implementation('extract-text')
+def _extract_text(items, node, context):
+    output = []
+    for item in items:
+        fields = {k: v for k, v in item['json'].items() if k != 'file_base64'}
+        if fields.get('is_duplicate'):
+            output.append({'json': {**fields, 'extracted_text': '', 'extraction_method': 'skipped_duplicate'}})
+            continue
+        text = context.extract(fields)
+        output.append({'json': {**fields, 'extracted_text': text, 'extraction_method': 'placeholder',
+                                'extraction_timestamp': _now(), 'char_count': len(text)}})
+    return output
+
+
+@implementation('split-chunks')
+def _split_chunks(items, node, context):
+    chunk_size = js_constant(node, 'CHUNK_SIZE', 500)
+    overlap = js_constant(node, 'OVERLAP', 50)
+    output = []
+    for item in items:
+        data = item['json']
+        if data.get('is_duplicate'):
+            output.append({'json': {'document_id': data['document_id'], 'filename': data.get('filename'),
+                                    'is_duplicate': True, 'duplicate_of': data.get('duplicate_of')}})
+            continue
+        text = data['extracted_text']
+        start = chunk_index = 0
+        while start < len(text):
+            end = min(start + chunk_size, len(text))
+            output.append({'json': {
+                'document_id': data['document_id'],
+                'chunk_id': f"{data['document_id']}_chunk_{chunk_index}",
+                'chunk_index': chunk_index,
+                'chunk_text': text[start:end],
+                'filename': data.get('filename'),
+                'metadata': data.get('metadata'),
+                'document_hash': data.get('document_hash'),
+                'total_chunks': -(-len(text) // (chunk_size - overlap))
+            }})
+            chunk_index += 1
+            if end == len(text):
+                break
+            start = end - overlap
+    return output
+
+
+@implementation('embed-index')
+def _embed_index(items, node, context):
+    context.index_chunks(items)
+    indexed_at = _now()
+    return [{'json': {**item['json'], 'indexed_at': indexed_at} if 'chunk_id' in item['json'] else item['json']}
+            for item in items]
+
+
+@implementation('register-metadata')
+def _register_metadata(items, node, context):
+    by_document: Dict[str, List[Dict]] = {}
+    for item in items:
+        if 'chunk_id' in item['json']:
+            by_document.setdefault(item['json']['document_id'], []).append(item['json'])
+    for document_id, chunks in by_document.items():
+        first = chunks[0]
+        context.metadata[document_id] = {
+            'id': document_id, 'document_id': document_id, 'filename': first.get('filename'),
+            'document_hash': first.get('document_hash'), 'metadata': first.get('metadata'), 'status': 'indexed',
+            'chunk_ids': [chunk['chunk_id'] for chunk in chunks], 'chunk_count': len(chunks),
+            'indexed_at': first.get('indexed_at')
+        }
+    return items
+
+
+@implementation('aggregate-result')
+def _aggregate_result(items, node, context):
+    if not items:
+        return [{'json': {'success': False, 'message': 'No se generaron chunks'}}]
+    first = items[0]['json']
+    if first.get('is_duplicate'):
+        return [{'json': {'success': True, 'message': 'Documento ya ingerido previamente',
+                          'document_id': first['document_id'], 'duplicate_of': first.get('duplicate_of'),
+                          'filename': first.get('filename'), 'chunks_generated': 0, 'status': 'duplicate',
+                          'timestamp': _now()}}]
+    return [{'json': {'success': True, 'message': 'Documento indexado exitosamente',
+                      'document_id': first['document_id'], 'filename': first.get('filename'),
+                      'chunks_generated': len(items), 'status': 'indexed', 'timestamp': _now()}}]
+
+
+@implementation('validate-query')
+def _validate_query(items, node, context):
+    output = []
+    for item in items:
+        query = (item['json'].get('query') or '').strip()
+        if not query:
+            raise ValueError('La consulta no puede estar vacía')
+        if len(item['json']['query']) > 1000:
+            raise ValueError('La consulta es demasiado larga (máximo 1000 caracteres)')
+        output.append({'json': {**item['json'], 'query': query, 'query_timestamp': _now(),
+                                'query_id': f"query_{int(time.time() * 1000)}"}})
+    return output
+
+
+@implementation('generate-embedding')
+def _generate_embedding(items, node, context):
+    return [
+        {'json': {**item['json'], 'query_embedding': context.embed(item['json']['query']),
+                  'embedding_model': 'fake', 'embedding_generated': True}}
+        for item in items
+    ]
+
+
+@implementation('vector-search')
+def _vector_search(items, node, context):
+    output = []
+    for item in items:
+        top = min(int(item['json'].get('top_k') or 5), 50)
+        lambda_ = item['json'].get('mmr_lambda', (item['json'].get('options') or {}).get('mmr_lambda'))
+        diverse = lambda_ is not None and 0 <= float(lambda_) < 1
+        candidates = min(top * 4, 50) if diverse else top
+        select = 'chunk_id,document_id,filename,chunk_index,content,metadata'
+        hits = context.index.search({
+            'vectorQueries': [{'kind': 'vector', 'vector': item['json']['query_embedding'],
+                               'fields': 'content_vector', 'k': candidates}],
+            'filter': NOT_DELETED_FILTER,
+            'select': select + ',content_vector' if diverse else select,
+            'top': candidates
+        })['value'] if len(context.index) else []
+        if diverse:
+            hits = mmr_rerank(hits, item['json']['query_embedding'], k=top, lambda_=float(lambda_))
+        results = [{**{k: v for k, v in hit.items() if k not in ('@search.score', 'content_vector')},
+                    'score': hit['@search.score']}
+                   for hit in hits]
+        output.append({'json': {**item['json'], 'search_results': results, 'results_count': len(results),
+                                'mmr_lambda': float(lambda_) if diverse else None,
+                                'search_completed': True}})
+    return output
+
+
+@implementation('build-context')
+def _build_context(items, node, context):
+    output = []
+    for item in items:
+        built = build_context(item['json'].get('search_results') or [])
+        output.append({'json': {**item['json'], 'context': built['context'], 'sources': built['sources'],
+                                'context_length': len(built['context']), 'context_tokens': built['context_tokens'],
+                                'context_tokens_saved': built['tokens_saved']}})
+    return output
+
+
+@implementation('generate-answer')
+def _generate_answer(items, node, context):
+    return [
+        {'json': {'query_id': item['json'].get('query_id'), 'query': item['json']['query'],
+                  'answer': f"Respuesta simulada basada en {len(item['json'].get('sources') or [])} fuentes.",
+                  'sources': item['json'].get('sources') or [], 'model': 'simulator', 'timestamp': _now()}}
+        for item in items
+    ]
+
+
+@implementation('validate-delete')
+def _validate_delete(items, node, context):
+    output = []
+    for item in items:
+        body = item['json'].get('body') or item['json']
+        ids = body.get('document_ids') or ([body['document_id']] if body.get('document_id') else [])
+        if not ids:
+            raise ValueError('document_id o document_ids es requerido')
+        output.append({'json': {**item['json'], 'document_ids': ids, 'soft_delete': bool(body.get('soft_delete'))}})
+    return output
+
+
+@implementation('get-metadata')
+def _get_metadata(items, node, context):
+    output = []
+    for item in items:
+        ids = item['json']['document_ids']
+        records = {d: context.metadata[d] for d in ids if d in context.metadata}
+        found = [d for d in ids if d in records and records[d].get('status') != 'deleted']
+        chunk_ids = [chunk_id for d in found for chunk_id in records[d].get('chunk_ids') or []]
+        output.append({'json': {**item['json'], 'document_id': ','.join(ids), 'found_documents': found,
+                                'unknown_documents': [d for d in ids if d not in found],
+                                'chunk_ids': chunk_ids, 'chunks_to_delete': len(chunk_ids)}})
+    return output
+
+
+@implementation('delete-from-index')
+def _delete_from_index(items, node, context):
+    batch_size = js_constant(node, 'BATCH_SIZE', 1000)
+    output = []
+    for item in items:
+        data = item['json']
+        if data['soft_delete']:
+            actions = [{'@search.action': 'merge', 'chunk_id': c, 'is_deleted': True} for c in data['chunk_ids']]
+        else:
+            actions = [{'@search.action': 'delete', 'chunk_id': c} for c in data['chunk_ids']]
+        batches = 0
+        for i in range(0, len(actions), batch_size):
+            context.index.index({'value': actions[i:i + batch_size]})
+            batches += 1
+        deleted = bool(data['found_documents'])
+        status = ('soft_deleted' if data['soft_delete'] else 'deleted') if deleted else 'not_found'
+        output.append({'json': {**data, 'success': deleted, 'status': status, 'deleted_from_index': deleted,
+                                'documents_deleted': len(data['found_documents']),
+                                'chunks_deleted': len(actions), 'batches': batches,
+                                'deletion_timestamp': _now()}})
+    return output
+
+
+@implementation('update-metadata')
+def _update_metadata(items, node, context):
+    for item in items:
+        data = item['json']
+        for document_id in data['found_documents']:
+            record = context.metadata.get(document_id)
+            if record is None:
+                continue
+            record.update(status='soft_deleted' if data['soft_delete'] else 'deleted',
+                          deleted_at=data['deletion_timestamp'])
+            if not data['soft_delete']:
+                record.update(chunk_ids=[], chunk_count=0)
+    return items
+
+
+# ============================================================================
+# SIMULADOR
+# ============================================================================
+
+def _payload_bytes(items: Sequence[Item]) -> int:
+    return len(json.dumps([item['json'] for item in items], ensure_ascii=False, default=str).encode('utf-8'))
+
+
+class WorkflowSimulator:
+    """
+    Ejecutor local de workflows
+
+    Cada nodo recibe todos los items de las salidas conectadas a su entrada y
+    se ejecuta una vez (como los nodos Code en modo "Run Once for All Items").
+    """
+
+    def __init__(
+        self,
+        context: Optional[SimulationContext] = None,
+        implementations: Optional[Dict[str, NodeImplementation]] = None,
+        trace_memory: bool = True
+    ):
+        """
+        Args:
+            context: Estado compartido (static data, índice, embeddings)
+            implementations: Implementaciones adicionales o que reemplazan las registradas
+            trace_memory: Medir la memoria pico por nodo con tracemalloc (agrega overhead)
+        """
+        self.context = context or SimulationContext()
+        self.implementations = {**IMPLEMENTATIONS, **(implementations or {})}
+        self.trace_memory = trace_memory
+
+    def _implementation(self, node: Dict) -> NodeImplementation:
+        for key in (node.get('id'), node.get('name'), node.get('type')):
+            if key in self.implementations:
+                return self.implementations[key]
+        raise ValueError(f"Sin implementación para el nodo '{node['name']}' ({node.get('type')})")
+
+    @staticmethod
+    def execution_order(workflow: Dict) -> List[str]:
+        """Orden topológico de los nodos alcanzables desde los que no tienen entradas"""
+        names = [node['name'] for node in workflow.get('nodes', [])]
+        successors: Dict[str, List[str]] = {name: [] for name in names}
+        indegree = {name: 0 for name in names}
+        for source, outputs in (workflow.get('connections') or {}).items():
+            for output in outputs.get('main') or []:
+                for target in output or []:
+                    successors[source].append(target['node'])
+                    indegree[target['node']] += 1
+        queue = [name for name in names if indegree[name] == 0]
+        order = []
+        while queue:
+            current = queue.pop(0)
+            order.append(current)
+            for target in successors[current]:
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    queue.append(target)
+        return order
+
+    def run(self, workflow: Dict, payloads: Sequence[Dict], keep_outputs: bool = False) -> Dict:
+        """
+        Ejecutar el workflow con los payloads del webhook
+
+        Args:
+            workflow: Definición (como las de setup_rag_workflows.py)
+            payloads: Cuerpos de las peticiones que recibe el webhook (un item por payload)
+            keep_outputs: Conservar los items de salida de cada nodo en el resultado
+
+        Returns:
+            {"workflow", "order", "nodes": {nombre: {"ms", "items_in", "items_out",
+             "peak_kb", "output_kb"}}, "total_ms", "response", "outputs"}
+        """
+        nodes = {node['name']: node for node in workflow.get('nodes', [])}
+        connections = workflow.get('connections') or {}
+        order = self.execution_order(workflow)
+        inputs: Dict[str, List[Item]] = {name: [] for name in nodes}
+        for name in order:
+            if not any(name == t['node'] for outs in connections.values()
+                       for output in outs.get('main') or [] for t in output or []):
+                inputs[name] = [{'json': dict(payload)} for payload in payloads]
+
+        self.context.response = None
+        self.context.workflow_static_data = self.context.static_data.setdefault(workflow.get('name', ''), {})
+        stats: Dict[str, Dict] = {}
+        outputs: Dict[str, List[Item]] = {}
+        start_total = time.perf_counter()
+        for name in order:
+            node = nodes[name]
+            function = self._implementation(node)
+            items = inputs[name]
+            # Si ya había un tracemalloc activo (p. ej. del llamador) no se detiene
+            was_tracing = tracemalloc.is_tracing()
+            baseline = 0
+            if self.trace_memory:
+                if was_tracing:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                else:
+                    tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                result = function(items, node, self.context)
+            except Exception as e:
+                raise RuntimeError(f"Nodo '{name}': {e}") from e
+            finally:
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1] - baseline if self.trace_memory else 0
+                if self.trace_memory and not was_tracing:
+                    tracemalloc.stop()
+
+            # Una lista de listas representa varias salidas (p. ej. un nodo IF)
+            branches = result if result and isinstance(result[0], list) else [result]
+            for index, targets in enumerate((connections.get(name) or {}).get('main') or []):
+                branch = branches[index] if index < len(branches) else []
+                for target in targets or []:
+                    inputs[target['node']].extend(branch)
+
+            produced = [item for branch in branches for item in branch]
+            stats[name] = {
+                'ms': elapsed * 1000,
+                'items_in': len(items),
+                'items_out': len(produced),
+                'peak_kb': peak / 1024,
+                'output_kb': _payload_bytes(produced) / 1024
+            }
+            if keep_outputs:
+                outputs[name] = produced
+
+        return {
+            'workflow': workflow.get('name'),
+            'order': order,
+            'nodes': stats,
+            'total_ms': (time.perf_counter() - start_total) * 1000,
+            'response': self.context.response,
+            'outputs': outputs
+        }
+
+
+def print_simulation(result: Dict):
+    """Tabla por nodo: tiempo, items de entrada/salida, memoria pico y tamaño de salida"""
+    print(f"\n🧪 {result['workflow']} ({result['total_ms']:.1f} ms)")
+    name_width = max(len(name) for name in result['nodes'])
+    print(f"   {'Nodo':<{name_width}} {'ms':>9} {'in':>6} {'out':>6} {'pico KB':>9} {'salida KB':>10}")
+    for name, node in result['nodes'].items():
+        print(f"   {name:<{name_width}} {node['ms']:>9.2f} {node['items_in']:>6} {node['items_out']:>6} "
+              f"{node['peak_kb']:>9.1f} {node['output_kb']:>10.1f}")
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark(document_kb: Sequence[int] = (10, 100, 1000), n_queries: int = 50) -> Dict:
+    """
+    Costo por nodo de la ingesta según el tamaño del documento (fan-out del
+    chunker) y de las consultas sobre lo ingerido, todo offline
+    """
+    import random
+
+    from setup_rag_workflows import (
+        create_complete_rag_ingestion_workflow,
+        create_complete_rag_query_workflow
+    )
+
+    rng = random.Random(7)
+    words = [f"palabra{i}" for i in range(5000)]
+    context = SimulationContext()
+    simulator = WorkflowSimulator(context)
+    ingestion = create_complete_rag_ingestion_workflow()
+    query_workflow = create_complete_rag_query_workflow()
+
+    ingest_runs = []
+    for size_kb in document_kb:
+        text = ''
+        while len(text) < size_kb * 1024:
+            text += ' '.join(rng.choice(words) for _ in range(200)) + '. '
+        payload = {
+            'filename': f'documento_{size_kb}kb.pdf',
+            'file_base64': base64.b64encode(text.encode('utf-8')).decode('ascii'),
+            'text': text
+        }
+        result = simulator.run(ingestion, [payload])
+        ingest_runs.append({'document_kb': size_kb, **result})
+
+    query_nodes: Dict[str, List[float]] = {}
+    for _ in range(n_queries):
+        query = ' '.join(rng.choice(words) for _ in range(8))
+        result = WorkflowSimulator(context, trace_memory=False).run(query_workflow, [{'query': query}])
+        for name, node in result['nodes'].items():
+            query_nodes.setdefault(name, []).append(node['ms'])
+
+    return {
+        'ingestion': ingest_runs,
+        'indexed_chunks': len(context.index),
+        'queries': n_queries,
+        'query_ms': {name: sum(values) / len(values) for name, values in query_nodes.items()}
+    }
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == '--benchmark':
+        results = benchmark()
+        print("\n" + "="*80)
+        print("📊 BENCHMARK SIMULADOR DE WORKFLOWS (offline)")
+        print("="*80)
+        for run in results['ingestion']:
+            print_simulation({**run, 'workflow': f"{run['workflow']} — documento de {run['document_kb']:,} KB"})
+        print(f"\n🔍 Consultas ({results['queries']} sobre {results['indexed_chunks']:,} chunks), ms promedio por nodo:")
+        for name, ms in results['query_ms'].items():
+            print(f"   └─ {name}: {ms:.2f} ms")
+        print("\n" + "="*80 + "\n")
+    elif args and args[0] == '--run':
+        from setup_rag_workflows import get_rag_workflow_definitions
+
+        definitions = {workflow['name']: workflow for workflow in get_rag_workflow_definitions()}
+        if len(args) < 3 or args[1] not in definitions:
+            print("\nWorkflows disponibles:")
+            for name in definitions:
+                print(f"   └─ {name}")
+            print("\nUso: python3 scripts/workflow_simulator.py --run \"<workflow>\" '<payload JSON>'\n")
+            sys.exit(1)
+        result = WorkflowSimulator().run(definitions[args[1]], [json.loads(args[2])])
+        print_simulation(result)
+        print(f"\n📤 Respuesta: {json.dumps(result['response'], ensure_ascii=False, default=str)[:500]}\n")
+    else:
+        print("\nUso:")
+        print("  python3 scripts/workflow_simulator.py --benchmark")
+        print("  python3 scripts/workflow_simulator.py --run \"<workflow>\" '<payload JSON>'\n")
@@ -0,0 +1,226 @@
+"""
+Workflow Sync - Sincronización declarativa de workflows con n8n
+Compara las definiciones locales con el estado del servidor (una sola pasada
+paginada) y aplica en paralelo solo lo necesario: crear, actualizar, activar
+o desactivar. Ejecutarlo dos veces seguidas no cambia nada
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from n8n_manager import N8nManager, WRITABLE_WORKFLOW_FIELDS
+
+# Campos de cada nodo que definen su comportamiento (id y webhookId los asigna n8n)
+NODE_FIELDS = ('name', 'type', 'typeVersion', 'position', 'parameters', 'credentials', 'disabled')
+
+
+def normalize_workflow(workflow: Dict) -> Dict:
+    """Forma canónica de un workflow para compararlo con otro"""
+    nodes = [
+        {field: node[field] for field in NODE_FIELDS if node.get(field) not in (None, {}, False)}
+        for node in workflow.get('nodes', [])
+    ]
+    return {
+        'name': workflow.get('name'),
+        'nodes': sorted(nodes, key=lambda node: node['name']),
+        'connections': workflow.get('connections') or {},
+        'settings': workflow.get('settings') or {}
+    }
+
+
+def fingerprint(workflow: Dict) -> str:
+    """Huella SHA-256 de la forma canónica"""
+    canonical = json.dumps(normalize_workflow(workflow), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SyncAction:
+    """Cambio a aplicar sobre un workflow"""
+
+    __slots__ = ('kind', 'name', 'workflow_id', 'definition', 'reason')
+
+    def __init__(self, kind: str, name: str, workflow_id: Optional[str] = None,
+                 definition: Optional[Dict] = None, reason: str = ""):
+        self.kind = kind              # create | update | activate | deactivate | delete
+        self.name = name
+        self.workflow_id = workflow_id
+        self.definition = definition
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return f"SyncAction({self.kind}, {self.name!r}, {self.workflow_id})"
+
+
+class WorkflowSync:
+    """
+    Motor de sincronización
+
+    Los workflows se emparejan por nombre. Las acciones de un mismo workflow
+    (p. ej. crear y luego activar) se ejecutan en orden; las de workflows
+    distintos, en paralelo.
+    """
+
+    def __init__(self, manager: N8nManager, max_workers: int = 8):
+        self.manager = manager
+        self.max_workers = max_workers
+
+    def plan(
+        self,
+        definitions: Sequence[Dict],
+        activate: Optional[bool] = None,
+        prune_duplicates: bool = False
+    ) -> List[SyncAction]:
+        """
+        Calcular los cambios mínimos
+
+        Args:
+            definitions: Definiciones locales
+            activate: Estado deseado para todos (por defecto, el campo "active" de cada definición)
+            prune_duplicates: Eliminar copias con el mismo nombre creadas por ejecuciones anteriores
+        """
+        by_name: Dict[str, List[Dict]] = {}
+        for workflow in self.manager.iter_workflows():
+            by_name.setdefault(workflow['name'], []).append(workflow)
+
+        actions: List[SyncAction] = []
+        for definition in definitions:
+            name = definition['name']
+            desired_active = definition.get('active', False) if activate is None else activate
+            existing = by_name.get(name, [])
+            if not existing:
+                actions.append(SyncAction('create', name, definition=definition, reason='no existe'))
+                if desired_active:
+                    actions.append(SyncAction('activate', name, reason='nuevo'))
+                continue
+
+            # Si hay duplicados se conserva el activo o, si no, el más reciente
+            existing.sort(key=lambda w: w.get('updatedAt') or '', reverse=True)
+            existing.sort(key=lambda w: not w.get('active'))
+            current = existing[0]
+            if prune_duplicates:
+                for duplicate in existing[1:]:
+                    actions.append(SyncAction('delete', name, duplicate['id'], reason='duplicado'))
+
+            if fingerprint(current) != fingerprint(definition):
+                actions.append(SyncAction('update', name, current['id'], definition, reason='definición distinta'))
+            if bool(current.get('active')) != bool(desired_active):
+                kind = 'activate' if desired_active else 'deactivate'
+                actions.append(SyncAction(kind, name, current['id'], reason='estado distinto'))
+        return actions
+
+    def _apply_chain(self, chain: List[SyncAction]) -> List[Dict]:
+        results = []
+        workflow_id = None
+        for action in chain:
+            workflow_id = action.workflow_id or workflow_id
+            start = time.perf_counter()
+            try:
+                if action.kind == 'create':
+                    payload = {k: v for k, v in action.definition.items() if k in WRITABLE_WORKFLOW_FIELDS}
+                    workflow_id = self.manager.create_workflow(payload)['id']
+                elif action.kind == 'update':
+                    self.manager.update_workflow(workflow_id, action.definition)
+                elif action.kind == 'activate':
+                    self.manager.activate_workflow(workflow_id)
+                elif action.kind == 'deactivate':
+                    self.manager.deactivate_workflow(workflow_id)
+                elif action.kind == 'delete':
+                    self.manager.delete_workflow(action.workflow_id)
+                error = None
+            except Exception as e:
+                error = str(e)[:300]
+            results.append({
+                'kind': action.kind,
+                'name': action.name,
+                'workflow_id': action.workflow_id if action.kind == 'delete' else workflow_id,
+                'elapsed_s': time.perf_counter() - start,
+                'error': error
+            })
+            if error:
+                # No tiene sentido activar un workflow que no se pudo crear/actualizar
+                break
+        return results
+
+    def apply(self, actions: Sequence[SyncAction]) -> List[Dict]:
+        """Aplicar las acciones: en orden por workflow, en paralelo entre workflows"""
+        chains: Dict[str, List[SyncAction]] = {}
+        for action in actions:
+            key = f"{action.name}:{action.workflow_id}" if action.kind == 'delete' else action.name
+            chains.setdefault(key, []).append(action)
+        if not chains:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chains))) as executor:
+            return [result for chain in executor.map(self._apply_chain, chains.values()) for result in chain]
+
+    def sync(
+        self,
+        definitions: Sequence[Dict],
+        activate: Optional[bool] = None,
+        prune_duplicates: bool = False,
+        dry_run: bool = False
+    ) -> Dict:
+        """
+        Planificar y aplicar
+
+        Returns:
+            {"actions": [...], "results": [...], "unchanged": n, "errors": n, "elapsed_s": s}
+        """
+        start = time.perf_counter()
+        actions = self.plan(definitions, activate=activate, prune_duplicates=prune_duplicates)
+        results = [] if dry_run else self.apply(actions)
+        touched = {action.name for action in actions}
+        return {
+            'actions': actions,
+            'results': results,
+            'unchanged': sum(1 for d in definitions if d['name'] not in touched),
+            'errors': sum(1 for r in results if r['error']),
+            'elapsed_s': time.perf_counter() - start
+        }
+
+
+def print_sync_summary(summary: Dict, dry_run: bool = False):
+    """Imprimir el plan o el resultado de una sincronización"""
+    icons = {'create': '🆕', 'update': '✏️ ', 'activate': '🟢', 'deactivate': '🔴', 'delete': '🗑️ '}
+    if dry_run:
+        print(f"\n📋 Plan ({len(summary['actions'])} cambios, {summary['unchanged']} sin cambios):")
+        for action in summary['actions']:
+            print(f"   {icons[action.kind]} {action.kind:<10} {action.name} ({action.reason})")
+        return
+    print(f"\n🔄 {len(summary['results'])} cambios aplicados en {summary['elapsed_s']:.2f}s "
+          f"({summary['unchanged']} workflows sin cambios)")
+    for result in summary['results']:
+        status = f"❌ {result['error']}" if result['error'] else f"✅ {result['workflow_id']}"
+        print(f"   {icons[result['kind']]} {result['kind']:<10} {result['name']} → {status}")
+
+
+# ============================================================================
+# SCRIPT PRINCIPAL
+# ============================================================================
+
+if __name__ == "__main__":
+    from setup_rag_workflows import get_rag_workflow_definitions
+
+    args = sys.argv[1:]
+    n8n_url = os.getenv('N8N_URL', "http://159.203.149.247:5678")
+    api_key = os.getenv('N8N_API_KEY', '')
+    if not api_key:
+        print("\n❌ Define N8N_API_KEY (y opcionalmente N8N_URL)\n")
+        sys.exit(1)
+
+    dry_run = '--dry-run' in args
+    engine = WorkflowSync(N8nManager(n8n_url, api_key))
+    summary = engine.sync(
+        get_rag_workflow_definitions(),
+        activate=True if '--activate' in args else None,
+        prune_duplicates='--prune-duplicates' in args,
+        dry_run=dry_run
+    )
+    print_sync_summary(summary, dry_run=dry_run)
+    print()